@@ -0,0 +1,101 @@
+# Tests/benchmark_quantization.py
+#
+# Recall vs memory of the quantized NumPy vector store: float16 and int8 codes, with and
+# without exact re-scoring, on the procedures corpus.
+# Queries are the sample questions plus every procedure title; the ground truth is the
+# exact float32 top-k of a flat scan, whatever --index-type the stores use.
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+import numpy as np
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmark_vector_stores import QUESTIONS
+from rwanda_trade_bot_2 import DATA_FILE, build_documents
+
+
+def directory_mb(path):
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path)) / 2**20
+
+
+def search_mb(store):
+    """Size of what every query scans: the codes and scales, a FAISS index, or the float32 matrix"""
+    if store.faiss_index is not None:
+        return os.path.getsize(store.index_file) / 2**20
+    if store.codes is not None:
+        return (store.codes.nbytes + (store.scales.nbytes if store.scales is not None else 0)) / 2**20
+    return store.embeddings.nbytes / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark quantized embedding storage")
+    parser.add_argument("--k", type=int, default=5, help="Results per query used for recall@k")
+    parser.add_argument("--index-type", default="flat", help="NumPy store index type (flat, ivf, hnsw)")
+    args = parser.parse_args()
+
+    from embedding_pipeline import EmbeddingPipeline
+    from vector_store import NumpyVectorStore, normalize_rows
+
+    with open(DATA_FILE, "r") as file:
+        data = json.load(file)
+    documents = build_documents(data)
+    queries = QUESTIONS + [entry["title"] for entry in data if entry.get("title")]
+
+    embedder = EmbeddingPipeline(verbose=False)
+    query_embeddings = embedder.encode(queries)
+
+    configurations = [("float32", 1), ("float16", 1), ("float16", 4), ("int8", 1), ("int8", 4)]
+    truth = None
+    results = []
+    directories = []
+    try:
+        for quantization, rescore_factor in configurations:
+            directory = tempfile.mkdtemp(prefix=f"bench_{quantization}_")
+            directories.append(directory)
+            # Reuse the first store's vectors so every configuration indexes identical embeddings
+            if directories[1:]:
+                shutil.copytree(directories[0], directory, dirs_exist_ok=True)
+            store = NumpyVectorStore(directory, embedder, index_type=args.index_type,
+                                     quantization=quantization, rescore_factor=rescore_factor)
+            store.sync(documents)
+            if truth is None:
+                # Exact scores over the float32 matrix, so an approximate index is measured too
+                exact = normalize_rows(query_embeddings) @ np.asarray(store.embeddings).T
+                truth = [{store.ids[row] for row in np.argsort(-scores)[:args.k]} for scores in exact]
+
+            latencies = []
+            retrieved = []
+            for embedding in query_embeddings:
+                start = time.perf_counter()
+                hits = store.query(embedding, n_results=args.k)
+                latencies.append((time.perf_counter() - start) * 1000)
+                retrieved.append({hit["id"] for hit in hits})
+            recall = statistics.mean(len(r & t) / len(t) for r, t in zip(retrieved, truth) if t)
+
+            results.append({
+                "config": f"{quantization} x{rescore_factor}",
+                "recall": recall,
+                "search_mb": search_mb(store),
+                "disk_mb": directory_mb(directory),
+                "p50_ms": statistics.median(latencies),
+            })
+    finally:
+        for directory in directories:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    print(f"\n📊 Quantization benchmark ({len(documents)} documents, {len(queries)} queries, index {args.index_type})")
+    header = f"{'storage x rescore':<20}{'recall@' + str(args.k):>10}{'scan MB':>10}{'disk MB':>10}{'p50 ms':>10}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(f"{r['config']:<20}{r['recall']:>10.3f}{r['search_mb']:>10.2f}{r['disk_mb']:>10.2f}{r['p50_ms']:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
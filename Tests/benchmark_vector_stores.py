@@ -0,0 +1,118 @@
+# Tests/benchmark_vector_stores.py
+#
+# Compares the Chroma and NumPy/FAISS vector backends of the vector-search model:
+# cold build time (embedding + indexing), warm open time, query latency and RSS.
+# Each backend runs in its own process so memory numbers don't bleed into each other.
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+import multiprocessing
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from rwanda_trade_bot_2 import DATA_FILE, build_documents
+
+QUESTIONS = [
+    "What are the requirements to export roasted coffee?",
+    "How do I import electrical appliances to Rwanda?",
+    "Do I need a certificate to export goods to China?",
+    "What is required to import fertilizers into Rwanda?",
+    "Is there a fee to export goods through Gatuna border?",
+    "What permits do I need to import a car from Tanzania?",
+    "How do I register my agrochemical business?",
+    "Do I need a special license to import food items?",
+]
+
+
+def current_rss_mb():
+    """Resident set size of this process in MB"""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_backend(backend, store_options, repeats, queue):
+    from embedding_pipeline import EmbeddingPipeline
+    from vector_store import create_vector_store
+
+    embedder = EmbeddingPipeline(verbose=False)
+    with open(DATA_FILE, "r") as file:
+        documents = build_documents(json.load(file))
+    query_embeddings = embedder.encode(QUESTIONS)
+    baseline_rss = current_rss_mb()
+
+    directory = tempfile.mkdtemp(prefix=f"bench_{backend}_")
+    try:
+        start = time.perf_counter()
+        store = create_vector_store(backend, directory, embedder, **store_options)
+        store.sync(documents)
+        build_time = time.perf_counter() - start
+        del store
+
+        start = time.perf_counter()
+        store = create_vector_store(backend, directory, embedder, **store_options)
+        store.sync(documents)
+        open_time = time.perf_counter() - start
+
+        latencies = []
+        for _ in range(repeats):
+            for embedding in query_embeddings:
+                start = time.perf_counter()
+                store.query(embedding, n_results=5)
+                latencies.append((time.perf_counter() - start) * 1000)
+        latencies.sort()
+
+        queue.put({
+            "backend": backend + (f" ({store_options['index_type']})" if store_options else ""),
+            "documents": store.count(),
+            "build_s": build_time,
+            "open_s": open_time,
+            "query_p50_ms": statistics.median(latencies),
+            "query_p95_ms": latencies[int(len(latencies) * 0.95) - 1],
+            "rss_delta_mb": current_rss_mb() - baseline_rss,
+        })
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the vector store backends")
+    parser.add_argument("--repeats", type=int, default=50, help="Times to run each sample question")
+    args = parser.parse_args()
+
+    configurations = [("chroma", {}), ("numpy", {"index_type": "flat"})]
+    try:
+        import faiss  # noqa: F401
+        configurations += [("numpy", {"index_type": "ivf"}), ("numpy", {"index_type": "hnsw"})]
+    except ImportError:
+        print("faiss-cpu not installed; skipping the IVF and HNSW configurations")
+
+    context = multiprocessing.get_context("spawn")
+    results = []
+    for backend, options in configurations:
+        queue = context.Queue()
+        process = context.Process(target=run_backend, args=(backend, options, args.repeats, queue))
+        process.start()
+        results.append(queue.get())
+        process.join()
+
+    print("\n📊 Vector store benchmark")
+    header = f"{'backend':<20}{'docs':>6}{'build s':>10}{'open s':>10}{'p50 ms':>10}{'p95 ms':>10}{'RSS +MB':>10}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(f"{r['backend']:<20}{r['documents']:>6}{r['build_s']:>10.2f}{r['open_s']:>10.3f}"
+              f"{r['query_p50_ms']:>10.3f}{r['query_p95_ms']:>10.3f}{r['rss_delta_mb']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
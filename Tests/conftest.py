@@ -0,0 +1,45 @@
+import os
+import sys
+
+import numpy as np
+
+# Modules live at the repository root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from trade_facets import facet_metadata
+
+# Evaluation scripts that call the OpenAI API; run them directly, not under pytest
+collect_ignore = ["test_bot_1.py", "test_bot_2.py"]
+
+# Shared by the vector store tests: from conftest import FakeEmbedder, documents
+VECTORS = {
+    "coffee export": [1.0, 0.0, 0.0],
+    "tea export": [0.8, 0.6, 0.0],
+    "car import": [0.0, 0.0, 1.0],
+}
+
+
+class FakeEmbedder:
+    """Looks vectors up in VECTORS, recording the texts it had to encode"""
+
+    def __init__(self):
+        self.encoded = []
+
+    def embed_documents(self, documents, known_vectors=None):
+        known_vectors = known_vectors or {}
+        vectors = {}
+        for doc_id, (text, metadata) in documents.items():
+            stored = known_vectors.get(metadata["content_hash"])
+            if stored is None:
+                self.encoded.append(text)
+                stored = VECTORS[text]
+            vectors[doc_id] = np.asarray(stored, dtype=np.float32)
+        return vectors
+
+
+def documents(*texts):
+    """Documents doc_0, doc_1, ... of VECTORS texts, tagged with the direction each text names"""
+    return {
+        f"doc_{i}": (text, {"content_hash": text, **facet_metadata({"direction": [text.split()[1]]})})
+        for i, text in enumerate(texts)
+    }
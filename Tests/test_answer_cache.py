@@ -0,0 +1,88 @@
+import json
+import os
+
+from answer_cache import AnswerCache, conversation_key, cosine_similarity, lexical_embedding, normalize_question
+from trade_index import TradeIndex
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def test_normalize_question_ignores_case_punctuation_and_spacing():
+    assert normalize_question("  What are the FEES?? ") == "what are the fees"
+
+
+def test_exact_tier_hits_on_normalized_question():
+    cache = AnswerCache()
+    cache.put("How do I export coffee?", "Get a NAEB license.", ["https://rwandatrade.rw/procedure/1"])
+    cached = cache.get("how do i export coffee")
+    assert cached.answer == "Get a NAEB license."
+    assert cache.hits["exact"] == 1
+
+
+def test_follow_up_answers_do_not_leak_across_conversations():
+    cache = AnswerCache()
+    coffee = [
+        {"role": "user", "content": "How do I export coffee?"},
+        {"role": "assistant", "content": "You need a NAEB export license."},
+    ]
+    cache.put("What are the fees?", "Coffee export fees are ...", context=conversation_key(coffee))
+
+    car = [
+        {"role": "user", "content": "How do I import a car?"},
+        {"role": "assistant", "content": "Register it with RRA."},
+    ]
+    assert cache.get("What are the fees?", conversation_key(car)) is None
+    assert cache.get("What are the fees?") is None
+    assert cache.get("What are the fees?", conversation_key(coffee)).answer == "Coffee export fees are ..."
+
+
+def test_conversation_key_is_empty_without_history():
+    assert conversation_key([]) == ""
+    assert conversation_key([{"role": "user", "content": "Hi"}]) != ""
+
+
+def test_similarity_tier_requires_same_procedures_and_context():
+    cache = AnswerCache(similarity_threshold=0.5)
+    embedding = lexical_embedding("export coffee license")
+    cache.put("What license do I need to export coffee?", "A NAEB license.", procedure_ids=["1", "2"], embedding=embedding)
+
+    paraphrase = lexical_embedding("coffee export license")
+    assert cache.get_similar(paraphrase, ["1", "2"]).answer == "A NAEB license."
+    assert cache.get_similar(paraphrase, ["2", "3"]) is None
+    assert cache.get_similar(paraphrase, ["1", "2"], context="other") is None
+
+
+def test_unseen_terms_keep_different_questions_apart():
+    with open(os.path.join(ROOT, "rwanda_trade_data", "rwanda_trade_procedures.json"), encoding="utf-8") as f:
+        idf = TradeIndex(json.load(f)).idf
+    assert "gorilla" not in idf and "snake" not in idf
+    gorillas = lexical_embedding("license to export gorillas", idf)
+    snakes = lexical_embedding("license to export snakes", idf)
+    assert cosine_similarity(gorillas, snakes) < 0.9
+
+    cache = AnswerCache()
+    cache.put("license to export gorillas", "An RDB permit.", procedure_ids=["7"], embedding=gorillas)
+    assert cache.get_similar(snakes, ["7"]) is None
+
+
+def test_lru_eviction_and_corpus_invalidation():
+    cache = AnswerCache(max_entries=2, corpus_version="v1")
+    cache.put("a", "1")
+    cache.put("b", "2")
+    cache.get("a")
+    cache.put("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+
+    cache.set_corpus_version("v2")
+    assert len(cache) == 0
+
+
+def test_ttl_expiry(monkeypatch):
+    import answer_cache
+    now = [1000.0]
+    monkeypatch.setattr(answer_cache.time, "monotonic", lambda: now[0])
+    cache = AnswerCache(ttl=60)
+    cache.put("a", "1")
+    now[0] += 61
+    assert cache.get("a") is None
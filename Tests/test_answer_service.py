@@ -0,0 +1,147 @@
+import json
+import asyncio
+
+import pytest
+
+import answer_service
+import engine_registry
+from answer_service import AnswerService, ConcurrencyLimiter, Overloaded
+from answer_stream import AsyncAnswerStream
+
+
+class FakeEngine:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = []
+
+    def warmup(self):
+        return self
+
+    async def astream_query(self, question, session_id="default"):
+        self.calls.append((question, session_id))
+        await asyncio.sleep(self.delay)
+        return AsyncAnswerStream.from_text(f"Answer to {question}", sources=["https://rwandatrade.rw/procedure/1"])
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    engine = FakeEngine()
+    monkeypatch.setitem(engine_registry._engines, "keyword", engine)
+    return engine
+
+
+async def request(port, method, path, body=None):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    payload = json.dumps(body).encode() if body is not None else b""
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: test\r\nContent-Length: {len(payload)}\r\n\r\n".encode() + payload)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, body = response.partition(b"\r\n\r\n")
+    return int(head.split()[1]), body.decode()
+
+
+def serve(service, scenario):
+    async def main():
+        service.limiter = ConcurrencyLimiter(service.max_concurrency, service.max_queue, service.queue_timeout)
+        server = await asyncio.start_server(service.handle, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            return await scenario(port)
+    return asyncio.run(main())
+
+
+def test_ask_and_stream(engine):
+    service = AnswerService()
+    service.ready = True
+
+    async def scenario(port):
+        status, body = await request(port, "POST", "/ask", {"question": "coffee", "session_id": "s1"})
+        assert status == 200
+        assert json.loads(body) == {
+            "answer": "Answer to coffee",
+            "sources": ["https://rwandatrade.rw/procedure/1"],
+            "model": "keyword",
+            "session_id": "s1",
+        }
+
+        status, body = await request(port, "POST", "/ask/stream", {"question": "tea"})
+        assert status == 200
+        events = [block.split("\n") for block in body.strip().split("\n\n")]
+        assert [lines[0] for lines in events][-1] == "event: done"
+        deltas = "".join(json.loads(lines[1][len("data: "):])["text"] for lines in events if lines[0] == "event: delta")
+        assert deltas == "Answer to tea"
+        done = json.loads(events[-1][1][len("data: "):])
+        status, body = await request(port, "POST", "/ask", {"question": "rice"})
+        return done["session_id"], json.loads(body)["session_id"]
+
+    streamed, asked = serve(service, scenario)
+    # Requests without a session_id each start their own session instead of sharing one
+    assert streamed != asked
+    assert engine.calls == [("coffee", "s1"), ("tea", streamed), ("rice", asked)]
+
+
+def test_errors(engine):
+    service = AnswerService()
+
+    async def scenario(port):
+        assert (await request(port, "GET", "/ready"))[0] == 503
+        assert (await request(port, "GET", "/health"))[0] == 200
+        assert (await request(port, "GET", "/missing"))[0] == 404
+        assert (await request(port, "GET", "/ask"))[0] == 405
+        assert (await request(port, "POST", "/ask", {"question": " "}))[0] == 400
+        assert (await request(port, "POST", "/ask", {"question": "q", "model": "nope"}))[0] == 400
+
+    serve(service, scenario)
+
+
+def test_overload_is_rejected_with_503(engine):
+    engine.delay = 0.2
+    service = AnswerService(max_concurrency=1, max_queue=1)
+
+    async def scenario(port):
+        results = await asyncio.gather(*(
+            request(port, "POST", "/ask", {"question": f"q{n}"}) for n in range(4)
+        ))
+        return sorted(status for status, _ in results)
+
+    assert serve(service, scenario) == [200, 200, 503, 503]
+
+
+def test_limiter_times_out_queued_requests():
+    async def scenario():
+        limiter = ConcurrencyLimiter(max_concurrency=1, max_queue=4, queue_timeout=0.05)
+        async with limiter.slot():
+            with pytest.raises(Overloaded):
+                async with limiter.slot():
+                    pass
+        assert limiter.active == 0 and limiter.waiting == 0
+
+    asyncio.run(scenario())
+
+
+def test_multiple_workers_share_sessions_through_sqlite(monkeypatch):
+    started = []
+
+    class FakeProcess:
+        def __init__(self, target, args):
+            started.append(args)
+
+        def start(self):
+            pass
+
+        def join(self):
+            pass
+
+    class FakeContext:
+        Process = FakeProcess
+
+    # main() sets SESSION_DB; a copy of the environment keeps it from leaking into later tests
+    environ = {name: value for name, value in answer_service.os.environ.items() if name != "SESSION_DB"}
+    monkeypatch.setattr(answer_service.os, "environ", environ)
+    monkeypatch.setattr(answer_service.multiprocessing, "get_context", lambda method: FakeContext)
+    monkeypatch.setattr("sys.argv", ["answer_service.py", "--workers", "2"])
+    answer_service.main()
+
+    assert len(started) == 2
+    assert answer_service.os.environ["SESSION_DB"] == answer_service.SESSION_DB_FILE
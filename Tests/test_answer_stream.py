@@ -0,0 +1,33 @@
+from types import SimpleNamespace
+
+from answer_stream import AnswerStream, completion_deltas
+
+
+def chunk(content=None, choices=True):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content))] if choices else [])
+
+
+def test_completion_deltas_skip_empty_chunks():
+    completion = [chunk("Hello"), chunk(None), chunk(choices=False), chunk(" world")]
+    assert list(completion_deltas(completion)) == ["Hello", " world"]
+
+
+def test_stream_appends_citations_and_reports_completion():
+    completed = []
+    stream = AnswerStream(
+        ["You need ", "", "a permit."],
+        sources=["https://rwandatrade.rw/procedure/1"],
+        finalize=lambda text: "\n\nSources: [1]" if "permit" in text else "",
+        on_complete=completed.append,
+    )
+    assert list(stream) == ["You need ", "a permit.", "\n\nSources: [1]"]
+    assert stream.text == completed[0] == "You need a permit.\n\nSources: [1]"
+    # A consumed stream yields nothing more and does not complete twice
+    assert list(stream) == [] and stream.read() == stream.text
+    assert len(completed) == 1
+
+
+def test_read_and_from_text():
+    stream = AnswerStream.from_text("No matching procedure.", sources=[])
+    assert stream.read() == "No matching procedure."
+    assert stream.done and stream.sources == []
@@ -0,0 +1,34 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from answer_stream import AsyncAnswerStream, async_completion_deltas
+
+
+async def completion(*contents):
+    for content in contents:
+        yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content))])
+
+
+async def collect(stream):
+    return [delta async for delta in stream]
+
+
+def test_async_stream_appends_citations_and_completes_once():
+    completed = []
+    stream = AsyncAnswerStream(
+        async_completion_deltas(completion("You need ", None, "a permit.")),
+        finalize=lambda text: " [1]",
+        on_complete=completed.append,
+    )
+    assert asyncio.run(collect(stream)) == ["You need ", "a permit.", " [1]"]
+    assert asyncio.run(stream.read()) == "You need a permit. [1]"
+    assert completed == ["You need a permit. [1]"]
+
+
+def test_async_from_text_and_sync_iteration_is_rejected():
+    stream = AsyncAnswerStream.from_text("No matching procedure.")
+    with pytest.raises(TypeError):
+        iter(stream)
+    assert asyncio.run(stream.read()) == "No matching procedure."
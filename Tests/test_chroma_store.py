@@ -0,0 +1,26 @@
+import pytest
+
+pytest.importorskip("chromadb")
+
+from conftest import FakeEmbedder, documents
+from vector_store import ChromaVectorStore
+
+
+def test_sync_only_embeds_new_or_changed_documents(tmp_path):
+    store = ChromaVectorStore(str(tmp_path), FakeEmbedder(), collection_name="test")
+    assert store.sync(documents("coffee export", "car import")) == (["doc_0", "doc_1"], [])
+    assert store.sync(documents("coffee export", "car import")) == ([], [])
+
+    reopened = ChromaVectorStore(str(tmp_path), FakeEmbedder(), collection_name="test")
+    assert reopened.sync(documents("coffee export", "tea export")) == (["doc_1"], [])
+    assert reopened.embedder.encoded == ["tea export"]
+    assert reopened.sync(documents("coffee export")) == ([], ["doc_1"])
+    assert reopened.count() == 1
+
+
+def test_query_applies_facet_filters(tmp_path):
+    store = ChromaVectorStore(str(tmp_path), FakeEmbedder(), collection_name="test")
+    store.sync(documents("coffee export", "car import"))
+    hits = store.query([0.0, 0.0, 1.0], n_results=2)
+    assert hits[0]["id"] == "doc_1" and hits[0]["score"] == pytest.approx(1.0, abs=1e-5)
+    assert [hit["id"] for hit in store.query([0.0, 0.0, 1.0], facets={"direction": ["export"]})] == ["doc_0"]
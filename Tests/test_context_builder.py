@@ -0,0 +1,46 @@
+import pytest
+
+pytest.importorskip("tiktoken")
+
+import context_builder
+from context_builder import ContextBuilder
+
+
+@pytest.fixture
+def builder(monkeypatch):
+    # Without an encoding the counter uses its offline estimate of 4 characters per token
+    def unavailable(name):
+        raise KeyError(name)
+
+    monkeypatch.setattr(context_builder.tiktoken, "encoding_for_model", unavailable)
+    monkeypatch.setattr(context_builder.tiktoken, "get_encoding", unavailable)
+    return ContextBuilder(context_budget=60, history_budget=40, older_turn_tokens=5, recent_turns=1,
+                          min_block_tokens=10)
+
+
+def procedure(n, description):
+    return {"title": f"Procedure {n}", "url": f"https://rwandatrade.rw/procedure/{n}", "description": description}
+
+
+def test_procedures_are_packed_until_the_budget_runs_out(builder):
+    procedures = [procedure(1, "short"), procedure(2, "word " * 100), procedure(3, "never reached")]
+    context, sources = builder.pack_procedures(procedures)
+    assert sources == ["https://rwandatrade.rw/procedure/1", "https://rwandatrade.rw/procedure/2"]
+    assert context.rstrip().endswith("...")
+    assert builder.counter.count(context) <= builder.context_budget
+
+
+def test_history_keeps_recent_turns_and_trims_older_ones(builder):
+    history = [
+        {"role": "user", "content": "What do I need to export coffee?"},
+        {"role": "assistant", "content": "A certificate of origin.\n\nSources:\n1. https://rwandatrade.rw/procedure/1"},
+        {"role": "user", "content": "And the fees?"},
+    ]
+    packed = builder.pack_history(history)
+    assert packed == (
+        "Human: What do I need t ...\n\n"
+        "Assistant: A certificate of ...\n\n"
+        "Human: And the fees?\n\n"
+    )
+    builder.history_budget = 12
+    assert builder.pack_history(history) == "Human: And the fees?\n\n"
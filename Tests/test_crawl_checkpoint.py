@@ -0,0 +1,84 @@
+import csv
+import json
+import os
+import stat
+import sys
+
+import pytest
+
+from atomic_files import atomic_write
+from crawl_checkpoint import Checkpoint, ProcedureLog
+
+
+def test_torn_line_is_dropped_on_reopen(tmp_path):
+    path = tmp_path / "procedures.jsonl"
+    log = ProcedureLog(str(path)).open()
+    log.append({"url": "a", "title": "First"})
+    log.append({"url": "b", "title": "Second"})
+    log.close()
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"url": "c", "ti')
+
+    log = ProcedureLog(str(path)).open()
+    log.append({"url": "c", "title": "Third"})
+    log.close()
+    assert [p["url"] for p in log.records()] == ["a", "b", "c"]
+
+
+def test_records_skip_repeated_urls_and_compact(tmp_path):
+    log = ProcedureLog(str(tmp_path / "procedures.jsonl")).open(fresh=True)
+    log.append({"url": "a", "title": "First"})
+    log.append({"url": "a", "title": "Again"})
+    log.append({"url": "b", "title": "Second", "procedure_id": "7"})
+    log.close()
+
+    json_path, csv_path = str(tmp_path / "out.json"), str(tmp_path / "out.csv")
+    assert log.compact(json_path, csv_path) == 2
+    with open(json_path, encoding="utf-8") as f:
+        assert json.load(f) == [{"url": "a", "title": "First"}, {"url": "b", "title": "Second", "procedure_id": "7"}]
+    with open(csv_path, encoding="utf-8", newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert rows[0] == {"url": "a", "title": "First", "procedure_id": ""}
+    assert log.completed_urls() == {"a", "b"}
+
+
+def test_checkpoint_round_trip_and_version(tmp_path):
+    checkpoint = Checkpoint(str(tmp_path / "crawl" / "checkpoint.json"))
+    assert checkpoint.load() is None
+    checkpoint.save(links=["a", "b"], max_pages=3)
+    assert checkpoint.load() == {"version": Checkpoint.VERSION, "links": ["a", "b"], "max_pages": 3}
+
+    with open(checkpoint.path, "w", encoding="utf-8") as f:
+        json.dump({"version": Checkpoint.VERSION + 1}, f)
+    assert checkpoint.load() is None
+    checkpoint.clear()
+    assert not os.path.exists(checkpoint.path)
+
+
+def test_atomic_write_keeps_old_file_on_error(tmp_path):
+    path = str(tmp_path / "data.json")
+    atomic_write(path, lambda f: f.write("old"), binary=False)
+
+    def fail(f):
+        f.write("partial")
+        raise RuntimeError("disk full")
+
+    with pytest.raises(RuntimeError):
+        atomic_write(path, fail, binary=False)
+    with open(path, encoding="utf-8") as f:
+        assert f.read() == "old"
+    assert os.listdir(tmp_path) == ["data.json"]
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="POSIX permissions")
+def test_published_files_get_the_permissions_of_a_plain_open(tmp_path):
+    plain = tmp_path / "plain.json"
+    plain.write_text("[]", encoding="utf-8")
+    log = ProcedureLog(str(tmp_path / "procedures.jsonl")).open()
+    log.append({"url": "a"})
+    log.close()
+
+    json_path, csv_path = str(tmp_path / "out.json"), str(tmp_path / "out.csv")
+    log.compact(json_path, csv_path)
+    for path in (json_path, csv_path):
+        assert stat.S_IMODE(os.stat(path).st_mode) == stat.S_IMODE(os.stat(plain).st_mode)
@@ -0,0 +1,53 @@
+import pytest
+
+import crawl_limits
+from crawl_limits import RateLimiter, WebDriverPool
+
+
+def test_rate_limiter_spaces_requests_per_host_and_globally(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(crawl_limits.time, "monotonic", lambda: 100.0)
+    monkeypatch.setattr(crawl_limits.time, "sleep", sleeps.append)
+
+    limiter = RateLimiter(global_rate=4.0, per_host_rate=1.0)
+    for url in ("https://a.rw/1", "https://a.rw/2", "https://b.rw/1"):
+        limiter.wait(url)
+    # a.rw waits a full second for its host; b.rw only for the global slot after it
+    assert sleeps == [1.0, 1.25]
+
+    unlimited = RateLimiter(global_rate=None, per_host_rate=0)
+    sleeps.clear()
+    unlimited.wait("https://a.rw/1")
+    unlimited.wait("https://a.rw/2")
+    assert sleeps == []
+
+
+class FakeDriver:
+    def __init__(self):
+        self.quit_called = False
+
+    def quit(self):
+        self.quit_called = True
+
+
+def test_pool_reuses_drivers_and_replaces_failed_ones():
+    created = []
+    pool = WebDriverPool(lambda: created.append(FakeDriver()) or created[-1], size=2)
+
+    with pool.acquire() as first:
+        with pool.acquire() as second:
+            assert first is not second
+    with pool.acquire() as driver:
+        assert driver in (first, second)
+    assert len(created) == 2
+
+    with pytest.raises(RuntimeError):
+        with pool.acquire() as broken:
+            raise RuntimeError("page crashed")
+    assert broken.quit_called
+
+    with pool.acquire() as a, pool.acquire() as b:
+        assert broken not in (a, b)
+    assert len(created) == 3
+    pool.close()
+    assert all(driver.quit_called for driver in created)
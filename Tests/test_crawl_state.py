@@ -0,0 +1,70 @@
+from crawl_state import CrawlState
+
+
+def procedure(title, description, tier="static", procedure_id="1"):
+    return {"title": title, "description": description, "fetch_tier": tier, "procedure_id": procedure_id}
+
+
+def test_change_set_reports_added_changed_and_removed(tmp_path):
+    path = str(tmp_path / "state.json")
+    state = CrawlState.load(path)
+    state.record_procedure("u1", {"etag": '"a"'}, procedure("A", "one", procedure_id="1"))
+    state.record_procedure("u2", {}, procedure("B", "two", procedure_id="2"))
+    assert [entry["url"] for entry in state.change_set()["added"]] == ["u1", "u2"]
+    state.save()
+
+    state = CrawlState.load(path)
+    state.record_procedure("u1", {}, procedure("A", "one, amended", procedure_id="1"))
+    state.record_procedure("u3", {}, procedure("C", "three", procedure_id="3"))
+    changes = state.change_set()
+    assert [entry["url"] for entry in changes["added"]] == ["u3"]
+    assert [entry["url"] for entry in changes["changed"]] == ["u1"]
+    assert [entry["url"] for entry in changes["removed"]] == ["u2"]
+    assert changes["unchanged"] == 0
+    # Validators not resent with a response are kept
+    assert state.procedures["u1"]["etag"] == '"a"'
+
+
+def test_incomplete_crawl_does_not_report_removals(tmp_path):
+    state = CrawlState(str(tmp_path / "state.json"))
+    state.record_procedure("u1", {}, procedure("A", "one"))
+    state.previous = {"u1": state.procedures["u1"]["content_hash"], "u2": "old"}
+    state.procedures["u2"] = {"content_hash": "old", "title": "B"}
+    changes = state.change_set(complete=False)
+    assert changes["removed"] == []
+    assert changes["unchanged"] == 1
+    assert "u2" in state.procedures
+
+
+def test_only_static_descriptions_are_requested_conditionally(tmp_path):
+    state = CrawlState(str(tmp_path / "state.json"))
+    state.record_procedure("static", {"etag": '"s"'}, procedure("A", "text"))
+    state.record_procedure("rendered", {"etag": '"r"'}, procedure("B", "text", tier="selenium"))
+    state.record_procedure("empty", {"etag": '"e"'}, procedure("C", "", tier="none"))
+
+    assert state.conditional_headers("static") == {"If-None-Match": '"s"'}
+    assert state.conditional_headers("rendered") == {}
+    assert state.conditional_headers("empty") == {}
+    assert state.reusable_procedure("rendered") is None
+
+
+def test_cached_page_keeps_its_original_tier(tmp_path):
+    state = CrawlState(str(tmp_path / "state.json"))
+    state.record_procedure("u1", {"last_modified": "Mon, 01 Jan 2024 00:00:00 GMT"}, procedure("A", "text"))
+    state.record_procedure("u1", {}, procedure("A", "text", tier="cached"))
+    assert state.procedures["u1"]["fetch_tier"] == "static"
+    assert state.conditional_headers("u1") == {"If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT"}
+
+
+def test_listing_pages_are_cached_with_their_links(tmp_path):
+    path = str(tmp_path / "state.json")
+    state = CrawlState.load(path)
+    state.record_page("page1", {"etag": '"p"'}, [{"url": "u1"}])
+    state.save()
+
+    state = CrawlState.load(path)
+    assert state.conditional_headers("page1") == {"If-None-Match": '"p"'}
+    links = state.cached_page("page1")
+    links[0]["description"] = "mutated"
+    assert state.cached_page("page1") == [{"url": "u1"}]
+    assert state.cached_page("page2") is None
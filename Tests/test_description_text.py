@@ -0,0 +1,18 @@
+from crawl_state import content_hash, normalize_text
+
+
+def test_static_and_rendered_text_normalize_the_same():
+    static = "Export permit\nIssued by\nNAEB"
+    rendered = "Export permit Issued by NAEB\n"
+    assert normalize_text(static) == normalize_text(rendered) == "Export permit Issued by NAEB"
+
+
+def test_normalize_text_handles_empty_values():
+    assert normalize_text(None) == ""
+    assert normalize_text(" \n\t ") == ""
+
+
+def test_hash_is_stable_across_tiers_once_normalized():
+    static = {"title": "Coffee export", "description": normalize_text("Get a\nlicense.")}
+    rendered = {"title": "Coffee export", "description": normalize_text("Get a  license.")}
+    assert content_hash(static) == content_hash(rendered)
@@ -0,0 +1,41 @@
+import numpy as np
+
+from embedding_cache import QueryEmbeddingCache
+
+
+def test_lookup_is_normalized_and_counted():
+    cache = QueryEmbeddingCache()
+    calls = []
+    encode = lambda question: calls.append(question) or [1.0, 2.0]
+    cache.get_or_compute("How do I export coffee?", encode)
+    vector = cache.get_or_compute("how do i export   coffee", encode)
+    assert calls == ["How do I export coffee?"]
+    assert vector.tolist() == [1.0, 2.0] and vector.dtype == np.float32 and not vector.flags.writeable
+    assert cache.stats["hits"] == 1 and cache.stats["misses"] == 1
+
+
+def test_eviction_by_entries_and_bytes():
+    cache = QueryEmbeddingCache(max_entries=2)
+    for question in ("a", "b", "c"):
+        cache.put(question, [0.0, 1.0])
+    assert cache.get("a") is None and len(cache) == 2
+
+    cache = QueryEmbeddingCache(max_bytes=16)
+    cache.put("a", np.zeros(2))
+    cache.put("b", np.zeros(2))
+    cache.get("a")
+    cache.put("c", np.zeros(2))
+    assert cache.get("b") is None and cache.get("a") is not None
+    assert cache.nbytes == 16
+
+
+def test_persisted_cache_keeps_recency_and_checks_the_model(tmp_path):
+    path = str(tmp_path / "query_embeddings.npz")
+    cache = QueryEmbeddingCache(path=path, model_name="mini")
+    cache.put("old", [1.0])
+    cache.put("new", [2.0])
+    cache.save()
+
+    reloaded = QueryEmbeddingCache(max_entries=1, path=path, model_name="mini")
+    assert reloaded.get("new").tolist() == [2.0] and reloaded.get("old") is None
+    assert len(QueryEmbeddingCache(path=path, model_name="other")) == 0
@@ -0,0 +1,52 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+from embedding_pipeline import EmbeddingPipeline
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+class CountingModel:
+    """Encodes a text as [len(text), 1], recording the batches it was given"""
+
+    def __init__(self):
+        self.batches = []
+
+    def encode(self, texts, **options):
+        self.batches.append(list(texts))
+        return np.array([[len(text), 1.0] for text in texts])
+
+
+def pipeline(batch_size=2):
+    embedder = EmbeddingPipeline(batch_size=batch_size, workers=1, verbose=False)
+    embedder._model = CountingModel()
+    return embedder
+
+
+def test_encode_batches_and_keeps_order():
+    embedder = pipeline(batch_size=2)
+    vectors = embedder.encode(["a", "bb", "ccc"])
+    assert vectors.dtype == np.float32
+    assert vectors[:, 0].tolist() == [1, 2, 3]
+    assert embedder._model.batches == [["a", "bb"], ["ccc"]]
+
+
+def test_embed_documents_reuses_known_vectors():
+    embedder = pipeline()
+    documents = {
+        "d1": ("first", {"content_hash": "h1"}),
+        "d2": ("second", {"content_hash": "h2"}),
+    }
+    vectors = embedder.embed_documents(documents, known_vectors={"h1": [9.0, 9.0]})
+    assert vectors["d1"].tolist() == [9.0, 9.0]
+    assert vectors["d2"].tolist() == [6.0, 1.0]
+    assert embedder._model.batches == [["second"]]
+    assert embedder.last_stats["embedded"] == 1 and embedder.last_stats["skipped"] == 1
+
+
+def test_importing_the_module_does_not_import_numpy():
+    code = "import sys, embedding_pipeline; sys.exit('numpy' in sys.modules)"
+    assert subprocess.run([sys.executable, "-c", code], cwd=ROOT).returncode == 0
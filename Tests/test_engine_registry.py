@@ -0,0 +1,54 @@
+import threading
+
+import pytest
+
+import engine_registry
+
+
+class FakeEngine:
+    def __init__(self, name):
+        self.name = name
+        self.warmed = False
+
+    def warmup(self):
+        self.warmed = True
+        return self
+
+
+@pytest.fixture
+def created(monkeypatch):
+    created = []
+
+    def create(name, **options):
+        created.append(name)
+        return FakeEngine(name)
+
+    monkeypatch.setattr(engine_registry, "_engines", {})
+    monkeypatch.setattr(engine_registry, "_create_engine", create)
+    return created
+
+
+def test_one_engine_per_process(created):
+    engines = []
+    threads = [threading.Thread(target=lambda: engines.append(engine_registry.get_engine("hybrid"))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert created == ["hybrid"]
+    assert all(engine is engines[0] for engine in engines)
+
+
+def test_unknown_engine_is_rejected(created):
+    with pytest.raises(ValueError):
+        engine_registry.get_engine("semantic")
+    assert created == []
+
+
+def test_warmup_reads_engine_list_from_environment(created, monkeypatch):
+    monkeypatch.setenv("WARMUP_ENGINES", " keyword, ,vector ")
+    engines = engine_registry.warmup()
+    assert [engine.name for engine in engines] == ["keyword", "vector"]
+    assert all(engine.warmed for engine in engines)
+    monkeypatch.delenv("WARMUP_ENGINES")
+    assert engine_registry.warmup() == []
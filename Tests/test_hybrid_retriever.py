@@ -0,0 +1,51 @@
+import time
+import threading
+
+from hybrid_retriever import HybridRetriever, procedure_key, reciprocal_rank_fusion
+
+
+def proc(procedure_id, title=""):
+    return {"procedure_id": procedure_id, "url": f"https://rwandatrade.rw/procedure/{procedure_id}", "title": title}
+
+
+def test_procedure_key_falls_back_to_url():
+    assert procedure_key(proc("7")) == "proc_7"
+    assert procedure_key({"procedure_id": "N/A", "url": "https://x"}) == "https://x"
+
+
+def test_rrf_prefers_keys_ranked_by_several_lists():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "d"]], k=60)
+    assert [key for key, _ in fused] == ["b", "a", "d", "c"]
+    assert fused[0][1] == 1 / 62 + 1 / 61
+
+
+def test_rrf_counts_repeated_keys_once_and_applies_weights():
+    fused = dict(reciprocal_rank_fusion([["a", "a"], ["b"]], k=0, weights=[1.0, 2.0]))
+    assert fused == {"a": 1.0, "b": 2.0}
+
+
+def test_hybrid_fuses_and_records_ranks():
+    retriever = HybridRetriever({
+        "vector": lambda question, n: [proc("1", "from vector"), proc("2")],
+        "lexical": lambda question, n: [proc("2"), proc("3"), proc("1", "from lexical")],
+    })
+    results = retriever.retrieve("coffee", n_results=2)
+    assert [r["procedure_id"] for r in results] == ["2", "1"]
+    assert results[0]["retrieval"]["ranks"] == {"vector": 2, "lexical": 1}
+    # The first retriever to return a procedure supplies its record
+    assert results[1]["title"] == "from vector"
+
+
+def test_concurrent_requests_do_not_queue_behind_each_other():
+    def slow(question, n):
+        time.sleep(0.2)
+        return [proc(question)]
+
+    retriever = HybridRetriever({"vector": slow, "lexical": slow}, max_concurrency=4)
+    threads = [threading.Thread(target=retriever.retrieve, args=(str(n),)) for n in range(4)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert time.perf_counter() - start < 0.6
@@ -0,0 +1,78 @@
+import pytest
+
+import session_store
+from session_store import InMemorySessionStore, SQLiteSessionStore
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(session_store.time, "time", lambda: now[0])
+    monkeypatch.setattr(session_store.time, "monotonic", lambda: now[0])
+    return now
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_store(request, tmp_path):
+    stores = []
+
+    def make(**options):
+        if request.param == "memory":
+            store = InMemorySessionStore(**options)
+        else:
+            store = SQLiteSessionStore(str(tmp_path / "sessions.sqlite3"), **options)
+            stores.append(store)
+        return store
+
+    yield make
+    for store in stores:
+        store.close()
+
+
+def test_sessions_are_kept_apart(make_store):
+    store = make_store()
+    store.append("a", "user", "How do I export coffee?")
+    store.append("b", "user", "How do I import a car?")
+    assert store.get("a") == [{"role": "user", "content": "How do I export coffee?"}]
+    assert store.get("b") == [{"role": "user", "content": "How do I import a car?"}]
+    assert store.get("unknown") == []
+
+
+def test_only_the_newest_turns_are_kept(make_store):
+    store = make_store(max_turns=3)
+    for n in range(5):
+        store.append("a", "user", f"question {n}")
+    assert [turn["content"] for turn in store.get("a")] == ["question 2", "question 3", "question 4"]
+
+
+def test_expired_session_is_empty(make_store, clock):
+    store = make_store(ttl=60)
+    store.append("a", "user", "old question")
+    clock[0] += 61
+    assert store.get("a") == []
+
+
+def test_expired_session_starts_over_on_append(make_store, clock):
+    store = make_store(ttl=60)
+    store.append("a", "user", "old question")
+    store.append("a", "assistant", "old answer")
+    clock[0] += 61
+    store.append("a", "user", "new question")
+    assert store.get("a") == [{"role": "user", "content": "new question"}]
+
+
+def test_clear(make_store):
+    store = make_store()
+    store.append("a", "user", "question")
+    store.clear("a")
+    assert store.get("a") == []
+
+
+def test_in_memory_store_evicts_least_recently_used_sessions():
+    store = InMemorySessionStore(max_sessions=2)
+    store.append("a", "user", "1")
+    store.append("b", "user", "2")
+    store.append("a", "user", "3")
+    store.append("c", "user", "4")
+    assert store.get("b") == []
+    assert len(store.get("a")) == 2
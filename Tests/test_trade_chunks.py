@@ -0,0 +1,34 @@
+import pytest
+
+from trade_chunks import aggregate_chunk_hits, split_chunks
+
+
+def hit(doc_id, score, parent_id=None, chunk=0):
+    metadata = {"parent_id": parent_id, "chunk": chunk} if parent_id else {}
+    return {"id": doc_id, "score": score, "metadata": metadata}
+
+
+HITS = [hit("p1#2", 0.9, "p1", 2), hit("p2#0", 0.8, "p2", 0), hit("p1#0", 0.5, "p1", 0), hit("p3", 0.85)]
+
+
+def test_max_ranks_parents_by_their_best_chunk():
+    parents = aggregate_chunk_hits(HITS, "max")
+    assert [(parent_id, score) for parent_id, score, _ in parents] == [("p1", 0.9), ("p3", 0.85), ("p2", 0.8)]
+    # Each parent's chunks come back in document order
+    assert [h["id"] for h in parents[0][2]] == ["p1#0", "p1#2"]
+
+
+def test_sum_favours_parents_matching_in_several_places():
+    parents = aggregate_chunk_hits(HITS, "sum")
+    assert parents[0][0] == "p1" and parents[0][1] == pytest.approx(1.4)
+    with pytest.raises(ValueError):
+        aggregate_chunk_hits(HITS, "mean")
+
+
+def test_split_chunks_overlap_and_size():
+    pytest.importorskip("langchain_text_splitters")
+    text = " ".join(f"Sentence number {i} about export permits." for i in range(60))
+    chunks = split_chunks(text, chunk_size=200, chunk_overlap=50)
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 200 for chunk in chunks)
+    assert chunks[1].split()[0] in chunks[0]
@@ -0,0 +1,46 @@
+from trade_facets import FacetExtractor, FacetIndex, chroma_where, facet_metadata
+from trade_index import TradeIndex
+from trade_taxonomy import TaxonomyMatcher
+
+TAXONOMY = {
+    "document_types": {"export": ["exporting"], "import": ["importing"], "certificate": []},
+    "products": {"coffee": ["coffee beans"], "tea": []},
+    "border_posts": {"Rusumo": []},
+}
+
+PROCEDURES = [
+    {"title": "Exporting coffee", "facets": {"direction": ["export"], "product_categories": ["coffee"]}},
+    {"title": "Importing coffee", "facets": {"direction": ["import"], "product_categories": ["coffee"]}},
+    {"title": "Coffee certificate", "facets": {"product_categories": ["coffee"]}},
+    {"title": "Exporting tea", "facets": {"direction": ["export"], "product_categories": ["tea"]}},
+]
+
+
+def test_extract_keeps_only_trade_directions():
+    extractor = FacetExtractor(TaxonomyMatcher(TAXONOMY))
+    facets = extractor.extract("Certificate for exporting coffee beans via Rusumo")
+    assert facets == {"direction": ["export"], "product_categories": ["coffee"], "border_posts": ["Rusumo"]}
+
+
+def test_mask_lets_untagged_procedures_through():
+    index = FacetIndex(PROCEDURES)
+    assert index.mask({}) is None
+    assert index.mask({"direction": ["export"]}) == 0b1101
+    assert index.mask({"direction": ["export"], "product_categories": ["coffee"]}) == 0b0101
+
+
+def test_search_scores_only_allowed_procedures():
+    index = TradeIndex(PROCEDURES)
+    allowed = FacetIndex(PROCEDURES).mask({"direction": ["import"]})
+    titles = [proc["title"] for _, proc in index.search(["coffee"], limit=5, allowed=allowed)]
+    assert sorted(titles) == ["Coffee certificate", "Importing coffee"]
+    assert index.search(["coffee"], allowed=0) == []
+
+
+def test_metadata_and_chroma_where_agree():
+    metadata = facet_metadata({"direction": ["export"]})
+    assert metadata["has_direction"] is True and metadata["direction_export"] is True
+    assert metadata["has_agency"] is False
+    assert chroma_where({}) is None
+    assert chroma_where({"direction": ["export"]}) == {"$or": [{"has_direction": False}, {"direction_export": True}]}
+    assert "$and" in chroma_where({"direction": ["export"], "product_categories": ["tea"]})
@@ -0,0 +1,36 @@
+import pytest
+
+from trade_index import TradeIndex, normalize_token, tokenize
+
+PROCEDURES = [
+    {"title": "Export of coffee", "description": "Steps to export green coffee beans.", "keywords": ["coffee"]},
+    {"title": "Import of vehicles", "description": "Registration of imported cars and duties.", "keywords": []},
+    {"title": "Phytosanitary certificate", "description": "Required to export coffee and tea.", "keywords": []},
+]
+
+
+def test_tokenize_normalizes_plurals():
+    assert tokenize("Fertilizers, Duties & Glass!") == ["fertilizer", "duty", "glass"]
+    assert normalize_token("status") == "status"
+
+
+def test_title_and_keyword_matches_outrank_description_matches():
+    index = TradeIndex(PROCEDURES)
+    titles = [proc["title"] for _, proc in index.search(["coffee"], limit=3)]
+    assert titles == ["Export of coffee", "Phytosanitary certificate"]
+
+
+def test_scores_follow_bm25f():
+    index = TradeIndex(PROCEDURES)
+    scores = index.score(["coffee export"])
+    assert set(scores) == {0, 2}
+    # Postings hold the saturated term weight tf / (k1 + tf), below 1
+    assert all(0 < weight < 1 for _, weight in index.postings["coffee"])
+    assert scores[0] == pytest.approx(sum(
+        index.idf[term] * (index.k1 + 1) * dict(index.postings[term])[0] for term in ("coffee", "export")
+    ))
+
+
+def test_unknown_terms_and_empty_corpus():
+    assert TradeIndex(PROCEDURES).search(["zebra"]) == []
+    assert TradeIndex([]).search(["coffee"]) == []
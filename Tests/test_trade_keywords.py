@@ -0,0 +1,28 @@
+from trade_keywords import LocalKeywordExtractor
+from trade_taxonomy import TaxonomyMatcher
+
+PROCEDURES = [
+    {"title": "Certificate of origin for coffee export", "description": "Issued by the chamber of commerce."},
+    {"title": "Import permit for vehicles", "description": "Apply online before shipping."},
+]
+
+
+def test_longest_title_phrase_wins_over_unigrams():
+    extractor = LocalKeywordExtractor(PROCEDURES)
+    assert extractor.extract("How do I get a certificate of origin for coffee?") == ["certificate origin coffee"]
+    assert extractor.extract("Which permit do I need to import vehicles?") == ["permit", "import", "vehicle"]
+    assert extractor.extract("How long does an import permit for vehicles take?") == ["import permit vehicle"]
+
+
+def test_stopwords_and_unknown_words_are_skipped():
+    extractor = LocalKeywordExtractor(PROCEDURES)
+    assert extractor.extract("What do I need in Rwanda?") == []
+    assert extractor.extract("bananas shipping") == ["shipping"]
+
+
+def test_taxonomy_aliases_map_to_canonical_terms():
+    taxonomy = TaxonomyMatcher({"products": {"motor vehicle": ["car", "cars"]}})
+    extractor = LocalKeywordExtractor(PROCEDURES, taxonomy)
+    keywords = extractor.extract("Importing a car")
+    assert keywords[0] == "motor vehicle"
+    assert "car" in keywords
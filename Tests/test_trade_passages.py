@@ -0,0 +1,38 @@
+from trade_passages import PassageIndex, split_passages
+
+DESCRIPTION = (
+    "Exporters must register with the Rwanda Development Board before shipping.\n"
+    "The certificate of origin is issued by the Private Sector Federation within two days. "
+    "Coffee exports also need a quality certificate from NAEB. "
+    "Fees are paid online through Irembo."
+)
+
+PROCEDURE = {"url": "https://rwandatrade.rw/procedure/1", "description": DESCRIPTION}
+
+
+def test_split_at_sentences_and_line_breaks_merging_fragments():
+    passages = split_passages(DESCRIPTION)
+    assert len(passages) == 3
+    # The short sentence about coffee is merged with the next one
+    assert passages[2] == "Coffee exports also need a quality certificate from NAEB. Fees are paid online through Irembo."
+    assert split_passages("Step 1. Register. Then pay the fee at the border post.", min_chars=20) == [
+        "Step 1. Register. Then pay the fee at the border post."
+    ]
+    assert split_passages(None) == []
+
+
+def test_excerpt_keeps_best_passages_in_original_order():
+    index = PassageIndex([PROCEDURE])
+    excerpt = index.excerpt(PROCEDURE, ["certificate", "fees"])
+    assert excerpt == (
+        "The certificate of origin is issued by the Private Sector Federation within two days. "
+        "Coffee exports also need a quality certificate from NAEB. Fees are paid online through Irembo. ..."
+    )
+    assert index.excerpt(PROCEDURE, ["certificate"], max_passages=3) == DESCRIPTION.replace("\n", " ")
+
+
+def test_excerpt_falls_back_to_leading_passages():
+    index = PassageIndex([PROCEDURE])
+    assert index.excerpt(PROCEDURE, ["zebra"], max_passages=1).startswith("Exporters must register")
+    unknown = {"url": "https://rwandatrade.rw/procedure/2", "description": "Not indexed."}
+    assert index.excerpt_all([unknown], ["fees"])[0]["description"] == "Not indexed."
@@ -0,0 +1,47 @@
+import os
+
+import trade_snapshot
+from trade_snapshot import SNAPSHOT_VERSION, load_snapshot, save_snapshot
+
+
+def write(path, text, mtime=None):
+    path.write_text(text, encoding="utf-8")
+    if mtime is not None:
+        os.utime(path, ns=(mtime, mtime))
+
+
+def test_round_trip_and_content_change(tmp_path):
+    source, snapshot = tmp_path / "procedures.json", str(tmp_path / "snapshot.pkl")
+    write(source, "[1]")
+    assert load_snapshot(snapshot, source) is None
+    save_snapshot(snapshot, source, {"rows": 1})
+    assert load_snapshot(snapshot, source) == {"rows": 1}
+
+    write(source, "[2]")
+    assert load_snapshot(snapshot, [source]) is None
+
+
+def test_touched_source_is_hashed_once(tmp_path, monkeypatch):
+    source, snapshot = tmp_path / "procedures.json", str(tmp_path / "snapshot.pkl")
+    write(source, "[1]", mtime=1_000_000_000)
+    save_snapshot(snapshot, source, "payload")
+    write(source, "[1]", mtime=2_000_000_000)
+
+    hashed = []
+    real_sha256 = trade_snapshot.sources_sha256
+    monkeypatch.setattr(trade_snapshot, "sources_sha256", lambda paths: hashed.append(paths) or real_sha256(paths))
+    assert load_snapshot(snapshot, source) == "payload"
+    assert load_snapshot(snapshot, source) == "payload"
+    assert len(hashed) == 1
+
+
+def test_other_versions_and_unreadable_files_are_ignored(tmp_path, monkeypatch):
+    source, snapshot = tmp_path / "procedures.json", str(tmp_path / "snapshot.pkl")
+    write(source, "[1]")
+    save_snapshot(snapshot, source, "payload")
+    monkeypatch.setattr(trade_snapshot, "SNAPSHOT_VERSION", SNAPSHOT_VERSION + 1)
+    assert load_snapshot(snapshot, source) is None
+
+    with open(snapshot, "wb") as f:
+        f.write(b"not a pickle")
+    assert load_snapshot(snapshot, source) is None
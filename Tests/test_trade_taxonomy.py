@@ -0,0 +1,32 @@
+import os
+
+from trade_taxonomy import TaxonomyMatcher
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+TAXONOMY = {
+    "products": {"motor vehicle": ["car", "used car"], "coffee": ["coffee beans"]},
+    "document_types": {"certificate of origin": ["origin certificate"], "certificate": []},
+}
+
+
+def test_overlapping_aliases_are_all_found_in_one_pass():
+    matcher = TaxonomyMatcher(TAXONOMY)
+    assert matcher.match("Importing a used car and coffee beans") == [
+        ("products", "motor vehicle"), ("products", "coffee"),
+    ]
+    # Terms nested in a longer match are reported as well
+    assert matcher.match("Certificates of origin") == [
+        ("document_types", "certificate"), ("document_types", "certificate of origin"),
+    ]
+
+
+def test_matching_uses_normalized_tokens():
+    matcher = TaxonomyMatcher(TAXONOMY)
+    assert matcher.keywords("CARS, Origin certificates!") == ["motor vehicle", "certificate of origin", "certificate"]
+    assert matcher.match("carpets") == []
+
+
+def test_shipped_taxonomy_compiles():
+    matcher = TaxonomyMatcher.from_file(os.path.join(ROOT, "rwanda_trade_data", "taxonomy.json"))
+    assert set(matcher.terms()) >= set(matcher.keywords(" ".join(matcher.terms())))
@@ -0,0 +1,51 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+HEAVY = ("numpy", "tiktoken", "openai", "chromadb", "sentence_transformers", "faiss")
+
+
+def test_importing_the_vector_model_is_cheap_and_side_effect_free(tmp_path):
+    code = (
+        "import sys, rwanda_trade_bot_2\n"
+        f"loaded = [name for name in {HEAVY!r} if name in sys.modules]\n"
+        "sys.exit(', '.join(loaded) or None)\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True)
+    assert result.returncode == 0, f"import pulled in: {result.stderr.strip()}"
+
+
+def test_constructing_the_engine_loads_nothing():
+    import rwanda_trade_bot_2
+
+    bot = rwanda_trade_bot_2.VectorTradeBot(retrieval="hybrid")
+    assert not bot._loaded
+
+
+def test_retrieval_mode_is_validated():
+    import pytest
+    import rwanda_trade_bot_2
+
+    with pytest.raises(ValueError):
+        rwanda_trade_bot_2.VectorTradeBot(retrieval="semantic")
+
+
+def test_procedures_that_do_not_fit_the_context_get_the_no_information_answer():
+    import rwanda_trade_bot_2
+    from answer_cache import AnswerCache
+    from context_builder import ContextBuilder
+
+    bot = rwanda_trade_bot_2.VectorTradeBot()
+    bot._loaded = True
+    bot.answer_cache = AnswerCache()
+    bot.retriever = None
+    bot._embed = lambda question: [1.0, 0.0]
+    bot.facet_extractor = type("NoFacets", (), {"extract": lambda self, question: {}})()
+    bot._vector_search = lambda embedding, n_results, facets: [
+        {"title": "Export coffee", "url": "https://rwandatrade.rw/procedure/1", "description": "Steps", "chunks": 1},
+    ]
+    bot.context_builder = ContextBuilder(context_budget=0)
+
+    plan = bot._prepare_answer("How do I export coffee?", 3)
+    assert plan == {"answer": rwanda_trade_bot_2.NO_INFORMATION_ANSWER, "sources": []}
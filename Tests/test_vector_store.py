@@ -0,0 +1,93 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from conftest import FakeEmbedder, documents
+from vector_store import NumpyVectorStore, quantize
+
+
+def store(path, **options):
+    return NumpyVectorStore(str(path), FakeEmbedder(), index_type="flat", **options)
+
+
+def test_query_and_incremental_sync(tmp_path):
+    vectors = store(tmp_path)
+    assert vectors.sync(documents("coffee export", "car import")) == (["doc_0", "doc_1"], [])
+    assert [hit["id"] for hit in vectors.query([1.0, 0.1, 0.0], n_results=2)] == ["doc_0", "doc_1"]
+
+    reopened = store(tmp_path)
+    assert reopened.count() == 2
+    changed, removed = reopened.sync(documents("coffee export", "tea export"))
+    assert changed == ["doc_1"] and removed == []
+    assert reopened.embedder.encoded == ["tea export"]
+    assert [hit["id"] for hit in reopened.query([0.0, 1.0, 0.0], n_results=1)] == ["doc_1"]
+
+
+def test_each_write_is_a_new_generation(tmp_path):
+    vectors = store(tmp_path)
+    vectors.sync(documents("coffee export"))
+    vectors.sync(documents("coffee export", "tea export"))
+    with open(os.path.join(tmp_path, "documents.json"), encoding="utf-8") as f:
+        table = json.load(f)
+    assert table["generation"] == 2 and table["rows"] == 2
+    assert sorted(os.listdir(tmp_path)) == ["documents.json", "embeddings-2.npy"]
+
+
+def test_files_not_matching_the_manifest_are_ignored(tmp_path):
+    vectors = store(tmp_path)
+    vectors.sync(documents("coffee export", "tea export"))
+    # A crash between the two files: the matrix of a later write under the manifest's name
+    np.save(vectors.embeddings_file, np.ones((3, 3), dtype=np.float32))
+
+    reopened = store(tmp_path)
+    assert reopened.count() == 0
+    reopened.sync(documents("coffee export", "tea export"))
+    assert reopened.count() == 2
+    assert reopened.embeddings.shape == (2, 3)
+
+
+@pytest.mark.parametrize("quantization", ["float16", "int8"])
+def test_quantized_search_rescoring(tmp_path, quantization):
+    vectors = store(tmp_path, quantization=quantization, rescore_factor=2)
+    vectors.sync(documents("coffee export", "tea export", "car import"))
+    assert vectors.codes is not None
+    hits = vectors.query([0.8, 0.6, 0.0], n_results=1)
+    assert hits[0]["id"] == "doc_1"
+    assert hits[0]["score"] == pytest.approx(1.0, abs=1e-6)
+
+
+def test_faceted_query_scans_the_codes_of_the_allowed_rows(tmp_path, monkeypatch):
+    vectors = store(tmp_path, quantization="int8", rescore_factor=2)
+    vectors.sync(documents("coffee export", "tea export", "car import"))
+    scanned = []
+    scan_codes = vectors._scan_codes
+    monkeypatch.setattr(vectors, "_scan_codes", lambda query, rows=None: scanned.append(rows) or scan_codes(query, rows))
+
+    hits = vectors.query([0.0, 0.2, 1.0], n_results=2, facets={"direction": ["export"]})
+    assert [hit["id"] for hit in hits] == ["doc_1", "doc_0"]
+    assert [rows.tolist() for rows in scanned] == [[0, 1]]
+    assert vectors.query([0.0, 0.2, 1.0], facets={"direction": ["transit"]}) == []
+
+
+@pytest.mark.parametrize("index_type", ["ivf", "hnsw"])
+def test_faceted_query_searches_the_faiss_index(tmp_path, monkeypatch, index_type):
+    pytest.importorskip("faiss")
+    vectors = NumpyVectorStore(str(tmp_path), FakeEmbedder(), index_type=index_type, quantization="float16")
+    vectors.sync(documents("coffee export", "tea export", "car import"))
+    assert vectors.faiss_index is not None
+
+    def no_scan(*args):
+        raise AssertionError("the faceted query bypassed the FAISS index")
+
+    monkeypatch.setattr(vectors, "_scan", no_scan)
+    hits = vectors.query([0.0, 0.2, 1.0], n_results=2, facets={"direction": ["export"]})
+    assert [hit["id"] for hit in hits] == ["doc_1", "doc_0"]
+
+
+def test_int8_codes_approximate_the_vectors():
+    matrix = np.array([[1.0, -0.5], [0.25, 0.5]], dtype=np.float32)
+    codes, scales = quantize(matrix, "int8")
+    assert codes.dtype == np.int8
+    assert np.allclose(codes * scales, matrix, atol=scales.max())
@@ -0,0 +1,166 @@
+import math
+import hashlib
+import re
+import time
+import threading
+from collections import OrderedDict
+
+from trade_index import tokenize
+from trade_keywords import STOPWORDS
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_question(question):
+    """Lowercase a question and strip punctuation and redundant whitespace"""
+    question = _PUNCTUATION.sub(" ", question.lower())
+    return _WHITESPACE.sub(" ", question).strip()
+
+
+def conversation_key(history):
+    """Digest of the turns preceding a question; empty for a question asked without earlier turns"""
+    if not history:
+        return ""
+    digest = hashlib.sha256()
+    for turn in history:
+        digest.update(f"{turn['role']}\x00{normalize_question(turn['content'])}\x00".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def lexical_embedding(text, idf=None):
+    """Unit-length sparse vector of the content terms in text, weighted by IDF when available
+
+    A term the corpus has never seen weighs as much as its rarest term: it is
+    usually what tells two questions apart ("explosive" vs "radioactive").
+    """
+    unseen = max(idf.values(), default=1.0) if idf else 1.0
+    weights = {}
+    for token in tokenize(text):
+        if token in STOPWORDS:
+            continue
+        weights[token] = weights.get(token, 0.0) + (idf.get(token, unseen) if idf else 1.0)
+    norm = math.sqrt(sum(w * w for w in weights.values()))
+    if not norm:
+        return {}
+    return {token: w / norm for token, w in weights.items()}
+
+
+def cosine_similarity(a, b):
+    """Cosine similarity of two embeddings, either sparse dicts or dense vectors"""
+    if isinstance(a, dict):
+        if len(a) > len(b):
+            a, b = b, a
+        return sum(w * b.get(token, 0.0) for token, w in a.items())
+    # Dense vectors come from the embedding model, which already pulls in numpy
+    import numpy as np
+    a = np.asarray(a, dtype=np.float32)
+    b = np.asarray(b, dtype=np.float32)
+    denom = float(np.linalg.norm(a) * np.linalg.norm(b))
+    return float(a @ b) / denom if denom else 0.0
+
+
+class CachedAnswer:
+    """A cached answer with the procedures it was generated from"""
+
+    __slots__ = ("question", "answer", "sources", "procedure_ids", "embedding", "context", "created_at")
+
+    def __init__(self, question, answer, sources, procedure_ids, embedding, context, created_at):
+        self.question = question
+        self.answer = answer
+        self.sources = sources
+        self.procedure_ids = procedure_ids
+        self.embedding = embedding
+        self.context = context
+        self.created_at = created_at
+
+    @property
+    def key(self):
+        return (self.context, normalize_question(self.question))
+
+
+class AnswerCache:
+    """Two-tier answer cache with LRU and TTL eviction
+
+    The exact tier is keyed on the normalized question text. The similarity
+    tier reuses an answer when a new question's embedding is within
+    `similarity_threshold` of a cached one *and* retrieval selected the same
+    procedures, so paraphrases only hit when the grounding is identical.
+    Both tiers are also keyed on `context`, a conversation_key() of the turns
+    before the question, so a follow-up such as "What are the fees?" is only
+    answered from the cache within the same conversation.
+    The whole cache is dropped when the corpus version changes.
+    """
+
+    def __init__(self, max_entries=256, ttl=24 * 3600, similarity_threshold=0.9, corpus_version=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        self.corpus_version = corpus_version
+        self.hits = {"exact": 0, "similar": 0}
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _expired(self, entry, now):
+        return self.ttl is not None and now - entry.created_at > self.ttl
+
+    def set_corpus_version(self, corpus_version):
+        """Invalidate every entry if the procedure corpus has changed"""
+        with self._lock:
+            if corpus_version != self.corpus_version:
+                self._entries.clear()
+                self.corpus_version = corpus_version
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get(self, question, context=""):
+        """Exact tier: return the cached answer for the normalized question, if any"""
+        key = (context, normalize_question(question))
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry, now):
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            self.hits["exact"] += 1
+            return entry
+
+    def get_similar(self, embedding, procedure_ids, context=""):
+        """Similarity tier: return the closest cached answer grounded on the same procedures"""
+        procedure_ids = tuple(procedure_ids)
+        now = time.monotonic()
+        best, best_score = None, self.similarity_threshold
+        with self._lock:
+            for key, entry in list(self._entries.items()):
+                if self._expired(entry, now):
+                    del self._entries[key]
+                    continue
+                if entry.context != context or entry.procedure_ids != procedure_ids or entry.embedding is None:
+                    continue
+                score = cosine_similarity(embedding, entry.embedding)
+                if score >= best_score:
+                    best, best_score = entry, score
+            if best is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best.key)
+            self.hits["similar"] += 1
+            return best
+
+    def put(self, question, answer, sources=(), procedure_ids=(), embedding=None, context=""):
+        """Store an answer, evicting the least recently used entries beyond max_entries"""
+        entry = CachedAnswer(question, answer, list(sources), tuple(procedure_ids), embedding, context, time.monotonic())
+        with self._lock:
+            self._entries[entry.key] = entry
+            self._entries.move_to_end(entry.key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
@@ -0,0 +1,51 @@
+import json
+
+import requests
+
+
+class AnswerServiceClient:
+    """Thin client of answer_service, used by the Streamlit front-ends when ANSWER_SERVICE_URL is set"""
+
+    def __init__(self, base_url, timeout=120):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def _payload(self, question, model, session_id):
+        return {"question": question, "model": model, "session_id": session_id}
+
+    def ask(self, question, model="keyword", session_id="default"):
+        """Return the service's {"answer", "sources", "model"} response"""
+        response = self.session.post(
+            f"{self.base_url}/ask", json=self._payload(question, model, session_id), timeout=self.timeout
+        )
+        response.raise_for_status()
+        return response.json()
+
+    def stream(self, question, model="keyword", session_id="default"):
+        """Yield answer text deltas from the server-sent event stream"""
+        with self.session.post(
+            f"{self.base_url}/ask/stream",
+            json=self._payload(question, model, session_id),
+            timeout=self.timeout,
+            stream=True,
+        ) as response:
+            response.raise_for_status()
+            event = None
+            for line in response.iter_lines(decode_unicode=True):
+                if line.startswith("event:"):
+                    event = line[len("event:"):].strip()
+                elif line.startswith("data:"):
+                    data = json.loads(line[len("data:"):])
+                    if event == "delta":
+                        yield data["text"]
+                    elif event == "error":
+                        raise RuntimeError(data["error"])
+                    elif event == "done":
+                        return
+
+    def ready(self):
+        try:
+            return self.session.get(f"{self.base_url}/ready", timeout=5).status_code == 200
+        except requests.RequestException:
+            return False
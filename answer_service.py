@@ -0,0 +1,301 @@
+import os
+import json
+import time
+import uuid
+import asyncio
+import argparse
+import contextlib
+import multiprocessing
+from urllib.parse import urlsplit
+
+import engine_registry
+from session_store import SESSION_DB_FILE
+
+# Standalone answer service built on asyncio streams only (no web framework):
+#   POST /ask          {"question", "model": keyword|vector|hybrid, "session_id"} -> {"answer", "sources", "model", "session_id"}
+#                      (without a session_id the question starts a new session, whose id is returned)
+#   POST /ask/stream   same body, answered as server-sent events: "delta" events, then "done" (or "error")
+#   GET  /health       the process is up, with limiter counters
+#   GET  /ready        200 once the preloaded engines are warm, 503 before
+
+MAX_BODY_BYTES = 64 * 1024
+STATUS_TEXT = {
+    200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+    413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable",
+}
+
+
+class Overloaded(Exception):
+    """Raised when the request queue is full or a queued request waited too long"""
+
+
+class ConcurrencyLimiter:
+    """At most `max_concurrency` answers in flight, with up to `max_queue` requests waiting for a slot"""
+
+    def __init__(self, max_concurrency=8, max_queue=64, queue_timeout=30.0):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.waiting = 0
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    @contextlib.asynccontextmanager
+    async def slot(self):
+        # Counted synchronously: wait_for() only acquires the semaphore once its task runs,
+        # so semaphore.locked() alone lets a burst of requests past the check
+        if self.active + self.waiting >= self.max_concurrency + self.max_queue:
+            raise Overloaded("request queue is full")
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise Overloaded("timed out waiting in the request queue")
+        finally:
+            self.waiting -= 1
+
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._semaphore.release()
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class AnswerService:
+    """HTTP front of the chatbot engines for one worker process
+
+    Each engine is loaded once per process through engine_registry; the
+    engines named in `preload` are warmed at start-up and gate /ready.
+    """
+
+    def __init__(self, preload=("keyword",), max_concurrency=8, max_queue=64, queue_timeout=30.0):
+        self.preload = list(preload)
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.limiter = None
+        self.ready = False
+        self.started = time.time()
+
+    async def warmup(self):
+        try:
+            await asyncio.to_thread(engine_registry.warmup, self.preload)
+        except Exception as e:
+            # Stay up but not ready, so a load balancer keeps traffic away from this worker
+            print(f"❌ Failed to load engines {self.preload}: {e}")
+            return
+        self.ready = True
+        print(f"✅ Engines ready: {', '.join(self.preload) or 'none'}")
+
+    async def serve(self, host="127.0.0.1", port=8000, reuse_port=False):
+        # The limiter's semaphore must be created inside the running loop
+        self.limiter = ConcurrencyLimiter(self.max_concurrency, self.max_queue, self.queue_timeout)
+        server = await asyncio.start_server(self.handle, host, port, reuse_port=reuse_port)
+        print(f"🌐 Answer service (pid {os.getpid()}) listening on http://{host}:{port}")
+        warmup = asyncio.create_task(self.warmup())
+        async with server:
+            await server.serve_forever()
+        await warmup
+
+    # --- HTTP plumbing ---
+
+    async def _read_request(self, reader):
+        request_line = await reader.readline()
+        if not request_line:
+            return None
+        try:
+            method, target, _ = request_line.decode("latin-1").split(" ", 2)
+        except ValueError:
+            raise HTTPError(400, "malformed request line")
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers.get("content-length") or 0)
+        except ValueError:
+            raise HTTPError(400, "invalid Content-Length")
+        if length > MAX_BODY_BYTES:
+            raise HTTPError(413, "request body too large")
+        body = await reader.readexactly(length) if length else b""
+        return method.upper(), urlsplit(target).path, body
+
+    async def _send(self, writer, status, payload, extra_headers=()):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        head = [
+            f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}",
+            "Content-Type: application/json; charset=utf-8",
+            f"Content-Length: {len(body)}",
+            "Connection: close",
+            *extra_headers,
+        ]
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+    async def _send_event(self, writer, event, payload):
+        writer.write(f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n".encode("utf-8"))
+        await writer.drain()
+
+    async def handle(self, reader, writer):
+        try:
+            try:
+                request = await self._read_request(reader)
+                if request is None:
+                    return
+                await self.route(writer, *request)
+            except HTTPError as e:
+                await self._send(writer, e.status, {"error": str(e)})
+            except Overloaded as e:
+                await self._send(writer, 503, {"error": str(e)}, ["Retry-After: 1"])
+            except Exception as e:
+                print(f"Error handling request: {e}")
+                await self._send(writer, 500, {"error": str(e)})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+            with contextlib.suppress(Exception):
+                await writer.wait_closed()
+
+    # --- Endpoints ---
+
+    async def route(self, writer, method, path, body):
+        routes = {
+            "/health": ("GET", self.health),
+            "/ready": ("GET", self.readiness),
+            "/ask": ("POST", self.ask),
+            "/ask/stream": ("POST", self.ask_stream),
+        }
+        if path not in routes:
+            raise HTTPError(404, f"no route for {path}")
+        expected, handler = routes[path]
+        if method != expected:
+            raise HTTPError(405, f"{path} expects {expected}")
+        await handler(writer, body)
+
+    async def health(self, writer, body):
+        await self._send(writer, 200, {
+            "status": "ok",
+            "uptime": round(time.time() - self.started, 1),
+            "active": self.limiter.active,
+            "waiting": self.limiter.waiting,
+        })
+
+    async def readiness(self, writer, body):
+        status = 200 if self.ready else 503
+        await self._send(writer, status, {"ready": self.ready, "engines": self.preload})
+
+    def _parse_question(self, body):
+        try:
+            request = json.loads(body or b"{}")
+        except ValueError:
+            raise HTTPError(400, "body must be JSON")
+        question = (request.get("question") or "").strip()
+        if not question:
+            raise HTTPError(400, "question is required")
+        model = request.get("model") or "keyword"
+        if model not in engine_registry.ENGINES:
+            raise HTTPError(400, f"model must be one of {sorted(engine_registry.ENGINES)}")
+        # A shared fallback id would mix the histories of unrelated clients
+        return question, model, request.get("session_id") or uuid.uuid4().hex
+
+    async def _open_stream(self, question, model, session_id):
+        # Engines not preloaded are loaded on first use, off the event loop
+        engine = await asyncio.to_thread(lambda: engine_registry.get_engine(model).warmup())
+        if model == "keyword":
+            return await engine.astream_query(question, session_id)
+        return await engine.astream_trade_question(question)
+
+    async def ask(self, writer, body):
+        question, model, session_id = self._parse_question(body)
+        async with self.limiter.slot():
+            stream = await self._open_stream(question, model, session_id)
+            answer = await stream.read()
+        await self._send(writer, 200, {
+            "answer": answer.strip(), "sources": stream.sources, "model": model, "session_id": session_id,
+        })
+
+    async def ask_stream(self, writer, body):
+        question, model, session_id = self._parse_question(body)
+        async with self.limiter.slot():
+            stream = await self._open_stream(question, model, session_id)
+            writer.write(
+                b"HTTP/1.1 200 OK\r\n"
+                b"Content-Type: text/event-stream; charset=utf-8\r\n"
+                b"Cache-Control: no-cache\r\n"
+                b"Connection: close\r\n\r\n"
+            )
+            # Headers are sent, so failures from here on are reported as an "error" event
+            try:
+                async for delta in stream:
+                    await self._send_event(writer, "delta", {"text": delta})
+            except (ConnectionError, asyncio.CancelledError):
+                raise
+            except Exception as e:
+                await self._send_event(writer, "error", {"error": str(e)})
+                return
+            await self._send_event(writer, "done", {
+                "answer": stream.text.strip(), "sources": stream.sources, "model": model, "session_id": session_id,
+            })
+
+
+def run_worker(args):
+    service = AnswerService(
+        preload=args.preload,
+        max_concurrency=args.max_concurrency,
+        max_queue=args.max_queue,
+        queue_timeout=args.queue_timeout,
+    )
+    with contextlib.suppress(KeyboardInterrupt):
+        asyncio.run(service.serve(args.host, args.port, reuse_port=args.workers > 1))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the Rwanda trade chatbot engines over HTTP")
+    parser.add_argument("--host", default=os.getenv("ANSWER_SERVICE_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("ANSWER_SERVICE_PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes sharing the port (SO_REUSEPORT)")
+    parser.add_argument("--preload", nargs="*", default=["keyword"], choices=list(engine_registry.ENGINES),
+                        help="Engines loaded at start-up; /ready waits for them")
+    parser.add_argument("--max-concurrency", type=int, default=8, help="Answers generated at once per worker")
+    parser.add_argument("--max-queue", type=int, default=64, help="Requests allowed to wait for a slot per worker")
+    parser.add_argument("--queue-timeout", type=float, default=30.0, help="Seconds a request may wait for a slot")
+    args = parser.parse_args()
+
+    if args.workers <= 1:
+        run_worker(args)
+        return
+
+    # SO_REUSEPORT sends a session's follow-up questions to any worker, so in-memory
+    # sessions (local to one process) would lose their history; share them through SQLite
+    if not os.getenv("SESSION_DB"):
+        os.environ["SESSION_DB"] = SESSION_DB_FILE
+        print(f"ℹ️ {args.workers} workers share sessions through {SESSION_DB_FILE} (set SESSION_DB to change)")
+
+    # Every worker loads its own engines and accepts connections on the shared port
+    context = multiprocessing.get_context("spawn")
+    workers = [context.Process(target=run_worker, args=(args,)) for _ in range(args.workers)]
+    for worker in workers:
+        worker.start()
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        for worker in workers:
+            worker.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+def completion_deltas(completion):
+    """Yield the text deltas of a streamed chat completion"""
+    for chunk in completion:
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if delta:
+            yield delta
+
+
+async def async_completion_deltas(completion):
+    """Yield the text deltas of a streamed chat completion from the async client"""
+    async for chunk in completion:
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if delta:
+            yield delta
+
+
+class AnswerStream:
+    """Iterable of answer text deltas that carries the answer's sources
+
+    Iterating yields the text as it is generated. Once exhausted, `text`
+    holds the full answer (including any trailing citations produced by
+    `finalize`) and `on_complete` is called with it.
+    """
+
+    def __init__(self, deltas, sources=None, finalize=None, on_complete=None):
+        self._deltas = iter(deltas)
+        self._parts = []
+        self._finalize = finalize
+        self._on_complete = on_complete
+        self.sources = list(sources or [])
+        self.text = ""
+        self.done = False
+
+    @classmethod
+    def from_text(cls, text, sources=None, on_complete=None):
+        """Wrap an already complete answer, e.g. a fallback message"""
+        return cls([text], sources=sources, on_complete=on_complete)
+
+    def __iter__(self):
+        if self.done:
+            return
+
+        for delta in self._deltas:
+            if delta:
+                self._parts.append(delta)
+                yield delta
+
+        if self._finalize:
+            suffix = self._finalize("".join(self._parts))
+            if suffix:
+                self._parts.append(suffix)
+                yield suffix
+
+        self.text = "".join(self._parts)
+        self.done = True
+        if self._on_complete:
+            self._on_complete(self.text)
+
+    def read(self):
+        """Consume the rest of the stream and return the full answer"""
+        for _ in self:
+            pass
+        return self.text
+
+
+class AsyncAnswerStream(AnswerStream):
+    """Async iterable counterpart of AnswerStream for the AsyncOpenAI client"""
+
+    def __init__(self, deltas, sources=None, finalize=None, on_complete=None):
+        super().__init__((), sources=sources, finalize=finalize, on_complete=on_complete)
+        self._deltas = deltas
+
+    @classmethod
+    def from_text(cls, text, sources=None, on_complete=None):
+        """Wrap an already complete answer, e.g. a fallback message"""
+        async def deltas():
+            yield text
+        return cls(deltas(), sources=sources, on_complete=on_complete)
+
+    def __iter__(self):
+        raise TypeError("AsyncAnswerStream must be consumed with 'async for'")
+
+    async def __aiter__(self):
+        if self.done:
+            return
+
+        async for delta in self._deltas:
+            if delta:
+                self._parts.append(delta)
+                yield delta
+
+        if self._finalize:
+            suffix = self._finalize("".join(self._parts))
+            if suffix:
+                self._parts.append(suffix)
+                yield suffix
+
+        self.text = "".join(self._parts)
+        self.done = True
+        if self._on_complete:
+            self._on_complete(self.text)
+
+    async def read(self):
+        """Consume the rest of the stream and return the full answer"""
+        async for _ in self:
+            pass
+        return self.text
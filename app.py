@@ -1,6 +1,23 @@
 import streamlit as st
 import os
-from rwanda_trade_bot import RwandaTradeBot
+import uuid
+import engine_registry
+from answer_client import AnswerServiceClient
+
+# With ANSWER_SERVICE_URL set this UI is a thin client of answer_service; otherwise the bot runs in-process
+SERVICE_URL = os.environ.get("ANSWER_SERVICE_URL")
+
+
+@st.cache_resource(show_spinner="Loading the trade data...")
+def load_bot(openai_api_key):
+    # One keyword engine per server process, shared by every session
+    return engine_registry.get_engine("keyword", openai_api_key=openai_api_key)
+
+
+@st.cache_resource
+def load_client(url):
+    return AnswerServiceClient(url)
+
 
 # Set page configuration
 st.set_page_config(
@@ -13,7 +30,10 @@ st.set_page_config(
 if "messages" not in st.session_state:
     st.session_state.messages = []
 
-if "bot" not in st.session_state:
+if SERVICE_URL:
+    client = load_client(SERVICE_URL)
+    stream_answer = lambda prompt, session_id: client.stream(prompt, "keyword", session_id)
+else:
     # Get API key from environment variable or Streamlit secrets
     openai_api_key = os.environ.get("OPENAI_API_KEY") or st.secrets.get("OPENAI_API_KEY", None)
     
@@ -21,8 +41,11 @@ if "bot" not in st.session_state:
         st.error("OpenAI API key not found. Please set the OPENAI_API_KEY environment variable.")
         st.stop()
     
-    # Initialize the trade bot
-    st.session_state.bot = RwandaTradeBot(openai_api_key=openai_api_key)
+    stream_answer = load_bot(openai_api_key).stream_query
+
+# The bot (or the service) keeps each conversation in its session store; this session only holds its ID
+if "session_id" not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
 
 # Display header
 st.title("Rwanda Trade Portal Chatbot")
@@ -51,7 +74,11 @@ if prompt := st.chat_input("Ask about Rwanda trade requirements..."):
         message_placeholder.markdown("Thinking...")
         
         try:
-            response = st.session_state.bot.query(prompt)
+            # Render tokens as they arrive; citations are appended at the end of the stream
+            response = ""
+            for delta in stream_answer(prompt, st.session_state.session_id):
+                response += delta
+                message_placeholder.markdown(response + "▌")
             message_placeholder.markdown(response)
             
             # Add assistant response to chat history
@@ -82,4 +109,6 @@ with st.sidebar:
     # Add refresh button
     if st.button("Clear Chat"):
         st.session_state.messages = []
+        # Start a fresh conversation; the old one expires from the session store
+        st.session_state.session_id = uuid.uuid4().hex
         st.experimental_rerun()
\ No newline at end of file
@@ -0,0 +1,29 @@
+import os
+import tempfile
+
+# Read once: os.umask() can only be queried by setting it, which is not thread-safe
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def atomic_write(path, write, binary=True):
+    """Write path through write(f) on a temporary file moved into place, so readers never see a partial file
+
+    mkstemp creates the file readable by its owner only; it gets the
+    permissions open() would have given it before it replaces path.
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        os.chmod(tmp_path, 0o666 & ~_UMASK)
+        if binary:
+            f = os.fdopen(fd, 'wb')
+        else:
+            f = os.fdopen(fd, 'w', encoding='utf-8', newline='')
+        with f:
+            write(f)
+        os.replace(tmp_path, path)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
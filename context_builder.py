@@ -0,0 +1,115 @@
+import re
+
+import tiktoken
+
+# Trailing citation blocks added to previous answers; the links are useless as history
+_SOURCES_SECTION = re.compile(r"\n+(Sources?:|For more information, refer to).*\Z", re.DOTALL)
+
+
+class TokenCounter:
+    """Count and truncate text in model tokens using tiktoken"""
+
+    def __init__(self, model="gpt-3.5-turbo"):
+        try:
+            self.encoding = tiktoken.encoding_for_model(model)
+        except Exception:
+            try:
+                self.encoding = tiktoken.get_encoding("cl100k_base")
+            except Exception:
+                # No encoding available offline; fall back to ~4 characters per token
+                self.encoding = None
+
+    def count(self, text):
+        if self.encoding is None:
+            return (len(text) + 3) // 4
+        return len(self.encoding.encode(text, disallowed_special=()))
+
+    def truncate(self, text, max_tokens):
+        """Cut text down to at most max_tokens, marking the cut with an ellipsis"""
+        if max_tokens <= 0:
+            return ""
+        if self.encoding is None:
+            if len(text) <= max_tokens * 4:
+                return text
+            return text[:max_tokens * 4 - 4].rstrip() + " ..."
+        tokens = self.encoding.encode(text, disallowed_special=())
+        if len(tokens) <= max_tokens:
+            return text
+        return self.encoding.decode(tokens[:max_tokens - 1]).rstrip() + " ..."
+
+
+class ContextBuilder:
+    """Pack retrieved procedures and chat history into explicit token budgets
+
+    Procedures are added in rank order until the context budget is used up;
+    the last one that only partly fits is truncated rather than dropped if
+    at least `min_block_tokens` are left. History is packed newest first: the
+    latest turns are kept whole, older turns lose their citation lists and
+    are truncated, and packing stops once the history budget is exhausted.
+    """
+
+    def __init__(self, model="gpt-3.5-turbo", context_budget=1500, history_budget=600,
+                 older_turn_tokens=120, recent_turns=2, min_block_tokens=40):
+        self.counter = TokenCounter(model)
+        self.context_budget = context_budget
+        self.history_budget = history_budget
+        self.older_turn_tokens = older_turn_tokens
+        self.recent_turns = recent_turns
+        self.min_block_tokens = min_block_tokens
+
+    def format_procedure(self, procedure, description=None):
+        description = procedure['description'] if description is None else description
+        return (
+            f"PROCEDURE: {procedure['title']}\n"
+            f"URL: {procedure['url']}\n"
+            f"DESCRIPTION: {description}\n\n"
+        )
+
+    def pack_procedures(self, procedures):
+        """Return (context, sources) for as many procedures as fit in the context budget"""
+        context = ""
+        sources = []
+        remaining = self.context_budget
+
+        for proc in procedures:
+            block = self.format_procedure(proc)
+            cost = self.counter.count(block)
+            if cost > remaining:
+                # Keep the title and URL and as much of the description as still fits
+                header_cost = self.counter.count(self.format_procedure(proc, ""))
+                room = remaining - header_cost
+                if room < self.min_block_tokens:
+                    break
+                block = self.format_procedure(proc, self.counter.truncate(proc['description'], room))
+                cost = self.counter.count(block)
+            context += block
+            sources.append(proc['url'])
+            remaining -= cost
+
+        return context, sources
+
+    def pack_history(self, history):
+        """Format chat history newest-first into the history budget, returned in chronological order"""
+        lines = []
+        remaining = self.history_budget
+        messages = list(history)
+
+        for age, message in enumerate(reversed(messages)):
+            role = "Human" if message["role"] == "user" else "Assistant"
+            content = message["content"]
+            if age >= self.recent_turns:
+                content = _SOURCES_SECTION.sub("", content)
+                content = self.counter.truncate(content, self.older_turn_tokens)
+            line = f"{role}: {content}\n\n"
+            cost = self.counter.count(line)
+            if cost > remaining:
+                if remaining < self.min_block_tokens:
+                    break
+                line = f"{role}: {self.counter.truncate(content, remaining - 8)}\n\n"
+                cost = self.counter.count(line)
+            lines.append(line)
+            remaining -= cost
+            if remaining <= 0:
+                break
+
+        return "".join(reversed(lines))
@@ -0,0 +1,142 @@
+import os
+import csv
+import json
+import textwrap
+import threading
+
+from atomic_files import atomic_write
+
+
+class ProcedureLog:
+    """Append-only JSONL file of scraped procedures, one line written as each one completes
+
+    A line torn by a crash is dropped when the log is reopened, so the log
+    always holds whole records and a resumed crawl appends after them.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+        self._lock = threading.Lock()
+
+    def open(self, fresh=False):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        if fresh and os.path.exists(self.path):
+            os.unlink(self.path)
+        self._drop_torn_line()
+        self._file = open(self.path, 'a', encoding='utf-8')
+        return self
+
+    def _drop_torn_line(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb+') as f:
+            end = f.seek(0, os.SEEK_END)
+            if not end:
+                return
+            f.seek(end - 1)
+            if f.read(1) == b"\n":
+                return
+            # Scan back from the end for the last complete line
+            position = end
+            while position > 0:
+                start = max(0, position - 65536)
+                f.seek(start)
+                newline = f.read(position - start).rfind(b"\n")
+                if newline >= 0:
+                    f.truncate(start + newline + 1)
+                    return
+                position = start
+            f.truncate(0)
+
+    def append(self, procedure):
+        line = json.dumps(procedure, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def remove(self):
+        self.close()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    def records(self):
+        """Stream the logged procedures in the order they were written, skipping repeats of a URL"""
+        if not os.path.exists(self.path):
+            return
+        seen = set()
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    procedure = json.loads(line)
+                except ValueError:
+                    continue
+                if procedure.get('url') in seen:
+                    continue
+                seen.add(procedure.get('url'))
+                yield procedure
+
+    def completed_urls(self):
+        return {procedure.get('url') for procedure in self.records()}
+
+    def compact(self, json_filename, csv_filename):
+        """Write the final JSON and CSV from the log, one procedure at a time; returns the count"""
+        # First pass: the CSV header is the union of the fields, in order of appearance
+        fieldnames = {}
+        for procedure in self.records():
+            fieldnames.update(dict.fromkeys(procedure))
+
+        count = 0
+
+        def write_json(f):
+            nonlocal count
+            f.write("[")
+            for procedure in self.records():
+                f.write(",\n" if count else "\n")
+                # Same layout as json.dump(procedures, f, indent=4)
+                f.write(textwrap.indent(json.dumps(procedure, ensure_ascii=False, indent=4), "    "))
+                count += 1
+            f.write("\n]" if count else "]")
+
+        def write_csv(f):
+            writer = csv.DictWriter(f, fieldnames=list(fieldnames), restval="", lineterminator="\n")
+            writer.writeheader()
+            for procedure in self.records():
+                writer.writerow(procedure)
+
+        atomic_write(json_filename, write_json, binary=False)
+        atomic_write(csv_filename, write_csv, binary=False)
+        return count
+
+
+class Checkpoint:
+    """Progress of an interrupted crawl: its settings and the procedure links found on the listing pages"""
+
+    VERSION = 1
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except ValueError:
+            return None
+        return data if data.get("version") == self.VERSION else None
+
+    def save(self, **progress):
+        data = {"version": self.VERSION, **progress}
+        atomic_write(self.path, lambda f: json.dump(data, f, ensure_ascii=False), binary=False)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)
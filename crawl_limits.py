@@ -0,0 +1,101 @@
+import time
+import queue
+import threading
+import contextlib
+from urllib.parse import urlsplit
+
+
+class RateLimiter:
+    """Thread-safe request pacing with a global and a per-host rate (requests per second)
+
+    wait() reserves the next free slot for the URL's host under a lock and
+    sleeps outside it, so concurrent workers are spaced out evenly instead of
+    bursting. A rate of None or 0 disables that limit.
+    """
+
+    def __init__(self, global_rate=4.0, per_host_rate=2.0):
+        self.global_interval = 1.0 / global_rate if global_rate else 0.0
+        self.host_interval = 1.0 / per_host_rate if per_host_rate else 0.0
+        self._next_global = 0.0
+        self._next_host = {}
+        self._lock = threading.Lock()
+
+    def wait(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_global, self._next_host.get(host, 0.0))
+            self._next_global = slot + self.global_interval
+            self._next_host[host] = slot + self.host_interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+class WebDriverPool:
+    """Bounded pool of Selenium WebDrivers, created on first demand and reused across pages"""
+
+    def __init__(self, factory, size=2):
+        self.factory = factory
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._drivers = []
+        self._created = 0
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def acquire(self):
+        driver = self._checkout()
+        try:
+            yield driver
+        except Exception:
+            # A driver that failed mid-page may be wedged; replace it rather than reuse it
+            self._discard(driver)
+            raise
+        else:
+            self._idle.put(driver)
+
+    def _checkout(self):
+        while True:
+            try:
+                return self._idle.get_nowait()
+            except queue.Empty:
+                pass
+
+            with self._lock:
+                create = self._created < self.size
+                if create:
+                    self._created += 1
+            if create:
+                try:
+                    driver = self.factory()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+                with self._lock:
+                    self._drivers.append(driver)
+                return driver
+
+            # Poll so a slot freed by a discarded driver is noticed
+            try:
+                return self._idle.get(timeout=1.0)
+            except queue.Empty:
+                continue
+
+    def _discard(self, driver):
+        with self._lock:
+            if driver in self._drivers:
+                self._drivers.remove(driver)
+                self._created -= 1
+        with contextlib.suppress(Exception):
+            driver.quit()
+
+    def close(self):
+        with self._lock:
+            drivers, self._drivers = self._drivers, []
+            self._created = 0
+        for driver in drivers:
+            with contextlib.suppress(Exception):
+                driver.quit()
+        self._idle = queue.LifoQueue()
@@ -0,0 +1,167 @@
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+
+from atomic_files import atomic_write
+
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text):
+    """Collapse whitespace, line breaks included, to single spaces
+
+    Static HTML and a rendered page break the same text into lines
+    differently, so descriptions are normalized before they are stored
+    or hashed and a page moving between fetch tiers keeps its hash.
+    """
+    return _WHITESPACE.sub(" ", text or "").strip()
+
+
+def content_hash(procedure):
+    """Hash of the fields that make up a procedure's indexed text"""
+    text = f"{procedure.get('title', '')}\n{procedure.get('description', '')}"
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def response_validators(response):
+    """The cache validators a server sent with a page (absent ones are left out)"""
+    validators = {
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+    }
+    return {name: value for name, value in validators.items() if value}
+
+
+class CrawlState:
+    """What the previous crawl saw at each URL, for conditional and incremental re-crawls
+
+    Listing pages keep their validators and the procedure links found on them;
+    procedure pages keep their validators, content hash, last-seen time and
+    extracted fields, so a 304 Not Modified can be answered from the state.
+    """
+
+    VERSION = 1
+
+    def __init__(self, path):
+        self.path = path
+        self.pages = {}
+        self.procedures = {}
+        # Procedure hashes as of the previous crawl, for the change set
+        self.previous = {}
+        self._seen = set()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path):
+        state = cls(path)
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("version") == cls.VERSION:
+                state.pages = data.get("pages", {})
+                state.procedures = data.get("procedures", {})
+        state.previous = {url: entry["content_hash"] for url, entry in state.procedures.items()}
+        return state
+
+    def conditional_headers(self, url):
+        """If-None-Match / If-Modified-Since headers for a URL whose 304 can be answered from the state"""
+        entry = self.pages.get(url) or self.reusable_procedure(url)
+        if not entry:
+            return {}
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def cached_page(self, url):
+        """Procedure links found on a listing page by the previous crawl, or None"""
+        entry = self.pages.get(url)
+        if entry is None:
+            return None
+        return [dict(procedure) for procedure in entry["procedures"]]
+
+    def cached_procedure(self, url):
+        return self.procedures.get(url)
+
+    def reusable_procedure(self, url):
+        """The previous crawl's entry for a procedure page, if a 304 on its HTML can stand for it
+
+        Only non-empty descriptions parsed from the static HTML qualify: a 304
+        says nothing about text rendered by JavaScript, and a page that had no
+        description must go through the Selenium fallback again.
+        """
+        entry = self.procedures.get(url)
+        if entry and entry.get("fetch_tier") == "static" and entry.get("description"):
+            return entry
+        return None
+
+    def record_page(self, url, validators, procedures):
+        with self._lock:
+            previous = self.pages.get(url, {})
+            self.pages[url] = {
+                "etag": validators.get("etag", previous.get("etag")),
+                "last_modified": validators.get("last_modified", previous.get("last_modified")),
+                "last_seen": time.time(),
+                "procedures": procedures,
+            }
+
+    def record_procedure(self, url, validators, procedure):
+        """Store a procedure fetched (or confirmed unchanged) by this crawl"""
+        with self._lock:
+            previous = self.procedures.get(url, {})
+            self.procedures[url] = {
+                "etag": validators.get("etag", previous.get("etag")),
+                "last_modified": validators.get("last_modified", previous.get("last_modified")),
+                "content_hash": content_hash(procedure),
+                "last_seen": time.time(),
+                "procedure_id": procedure.get("procedure_id"),
+                "title": procedure.get("title", ""),
+                "description": procedure.get("description", ""),
+                # A page served from the state keeps the tier that originally extracted it
+                "fetch_tier": (
+                    previous.get("fetch_tier") if procedure.get("fetch_tier") == "cached" else procedure.get("fetch_tier")
+                ),
+            }
+            self._seen.add(url)
+
+    def change_set(self, complete=True):
+        """Procedures added, changed and removed since the previous crawl
+
+        Removals are only reported (and dropped from the state) for a complete
+        crawl; a crawl cut short by a limit has not seen every procedure.
+        """
+        def describe(url, entry):
+            return {"url": url, "procedure_id": entry.get("procedure_id"), "title": entry.get("title")}
+
+        with self._lock:
+            added, changed = [], []
+            for url in sorted(self._seen):
+                entry = self.procedures[url]
+                if url not in self.previous:
+                    added.append(describe(url, entry))
+                elif entry["content_hash"] != self.previous[url]:
+                    changed.append(describe(url, entry))
+
+            removed = []
+            if complete:
+                for url in sorted(set(self.procedures) - self._seen):
+                    removed.append(describe(url, self.procedures.pop(url)))
+
+            return {
+                "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "added": added,
+                "changed": changed,
+                "removed": removed,
+                "unchanged": len(self._seen) - len(added) - len(changed),
+            }
+
+    def save(self):
+        with self._lock:
+            data = {"version": self.VERSION, "pages": self.pages, "procedures": self.procedures}
+        atomic_write(self.path, lambda f: json.dump(data, f, ensure_ascii=False), binary=False)
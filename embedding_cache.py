@@ -0,0 +1,117 @@
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from answer_cache import normalize_question
+from atomic_files import atomic_write
+
+
+class QueryEmbeddingCache:
+    """LRU cache of question embeddings keyed on the normalized question text
+
+    Bounded both by entry count and by the total bytes of the stored vectors.
+    When `path` is given the cache is loaded from and saved to a .npz file,
+    so warm restarts keep it; a file written for a different embedding model
+    is ignored.
+    """
+
+    def __init__(self, max_entries=4096, max_bytes=16 * 2**20, path=None, model_name=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.path = path
+        self.model_name = model_name or ""
+        self.hits = 0
+        self.misses = 0
+        self.nbytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._dirty = False
+        if path:
+            self.load()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.nbytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def get(self, question):
+        key = normalize_question(question)
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return vector
+
+    def put(self, question, vector):
+        key = normalize_question(question)
+        vector = np.array(vector, dtype=np.float32)
+        vector.setflags(write=False)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.nbytes -= previous.nbytes
+            self._entries[key] = vector
+            self.nbytes += vector.nbytes
+            self._evict()
+            self._dirty = True
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_entries or self.nbytes > self.max_bytes):
+            _, vector = self._entries.popitem(last=False)
+            self.nbytes -= vector.nbytes
+
+    def get_or_compute(self, question, encode):
+        """Return the cached embedding for question, computing and storing it with encode() on a miss"""
+        vector = self.get(question)
+        if vector is None:
+            vector = encode(question)
+            self.put(question, vector)
+        return vector
+
+    def load(self):
+        """Load persisted entries, oldest first so recency order is preserved"""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with np.load(self.path, allow_pickle=False) as stored:
+                if str(stored["model_name"]) != self.model_name:
+                    return
+                keys, vectors = stored["keys"], stored["vectors"]
+        except Exception as e:
+            print(f"Ignoring unreadable query embedding cache {self.path}: {e}")
+            return
+
+        with self._lock:
+            for key, vector in zip(keys.tolist(), vectors):
+                vector = np.array(vector, dtype=np.float32)
+                vector.setflags(write=False)
+                self._entries[key] = vector
+                self.nbytes += vector.nbytes
+            self._evict()
+
+    def save(self):
+        """Write the cache to disk if it changed since the last save"""
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            keys = np.array(list(self._entries), dtype=str)
+            vectors = np.stack(list(self._entries.values())) if self._entries else np.empty((0, 0), dtype=np.float32)
+            self._dirty = False
+
+        atomic_write(self.path, lambda f: np.savez(f, keys=keys, vectors=vectors, model_name=np.array(self.model_name)))
@@ -0,0 +1,157 @@
+import os
+import time
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+# numpy is imported where vectors are built, so importing EMBEDDING_MODEL from here stays cheap
+
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+
+# Model instance of a pool worker process, loaded once by _init_worker
+_worker_model = None
+
+
+def _load_model(model_name):
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_name, device="cpu")
+
+
+def _encode(model, texts):
+    import numpy as np
+    vectors = model.encode(
+        texts,
+        batch_size=len(texts),
+        convert_to_numpy=True,
+        normalize_embeddings=True,
+        show_progress_bar=False,
+    )
+    return np.asarray(vectors, dtype=np.float32)
+
+
+def _init_worker(model_name):
+    global _worker_model
+    # Each worker gets one core's worth of threads so workers don't oversubscribe the CPU
+    try:
+        import torch
+        torch.set_num_threads(1)
+    except ImportError:
+        pass
+    _worker_model = _load_model(model_name)
+
+
+def _encode_in_worker(texts):
+    return _encode(_worker_model, texts)
+
+
+class EmbeddingPipeline:
+    """Batched sentence-transformer encoder for corpus ingestion and queries
+
+    Documents are encoded in `batch_size` chunks, either in-process or fanned
+    out over a pool of `workers` processes (each loading its own copy of the
+    model). embed_documents() reuses vectors whose content hash is already
+    known and reports throughput in documents per second.
+    """
+
+    def __init__(self, model_name=EMBEDDING_MODEL, batch_size=64, workers=1, verbose=True):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.workers = workers if workers and workers > 0 else (os.cpu_count() or 1)
+        self.verbose = verbose
+        self.last_stats = None
+        self._model = None
+        self._model_lock = threading.Lock()
+
+    @property
+    def model(self):
+        """In-process model, loaded on first use"""
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    self._model = _load_model(self.model_name)
+        return self._model
+
+    def __call__(self, input):
+        """Embedding-function interface: list of texts in, list of vectors out"""
+        return list(self.encode(input))
+
+    def encode_query(self, text):
+        """Encode a single question in-process"""
+        return _encode(self.model, [text])[0]
+
+    def encode(self, texts):
+        """Encode texts into an (N, dim) float32 array of unit vectors, preserving order"""
+        import numpy as np
+
+        texts = list(texts)
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        start = time.perf_counter()
+        done = 0
+        results = []
+
+        if self.workers > 1 and len(batches) > 1:
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(
+                max_workers=min(self.workers, len(batches)),
+                mp_context=context,
+                initializer=_init_worker,
+                initargs=(self.model_name,),
+            ) as pool:
+                for vectors in pool.map(_encode_in_worker, batches):
+                    results.append(vectors)
+                    done += len(vectors)
+                    self._report_progress(done, len(texts), start)
+        else:
+            for batch in batches:
+                results.append(_encode(self.model, batch))
+                done += len(batch)
+                self._report_progress(done, len(texts), start)
+
+        return np.vstack(results)
+
+    def _report_progress(self, done, total, start):
+        if not self.verbose or total <= self.batch_size:
+            return
+        elapsed = time.perf_counter() - start
+        rate = done / elapsed if elapsed else float("inf")
+        print(f"Embedded {done}/{total} documents ({rate:.1f} docs/sec)")
+
+    def embed_documents(self, documents, known_vectors=None):
+        """Return {doc_id: vector} for documents, skipping those whose content hash has a known vector
+
+        `documents` maps doc IDs to (text, metadata) pairs with a `content_hash`
+        in the metadata; `known_vectors` maps content hashes to stored vectors.
+        """
+        import numpy as np
+
+        known_vectors = known_vectors or {}
+        vectors = {}
+        pending = []
+        for doc_id, (text, metadata) in documents.items():
+            stored = known_vectors.get(metadata.get("content_hash"))
+            if stored is not None:
+                vectors[doc_id] = np.asarray(stored, dtype=np.float32)
+            else:
+                pending.append(doc_id)
+
+        start = time.perf_counter()
+        if pending:
+            encoded = self.encode([documents[doc_id][0] for doc_id in pending])
+            vectors.update(zip(pending, encoded))
+        elapsed = time.perf_counter() - start
+
+        self.last_stats = {
+            "documents": len(documents),
+            "embedded": len(pending),
+            "skipped": len(documents) - len(pending),
+            "seconds": elapsed,
+            "docs_per_sec": len(pending) / elapsed if elapsed else 0.0,
+        }
+        if self.verbose and pending:
+            stats = self.last_stats
+            print(f"Embedded {stats['embedded']} documents in {stats['seconds']:.1f}s "
+                  f"({stats['docs_per_sec']:.1f} docs/sec), reused {stats['skipped']} stored vectors")
+        return vectors
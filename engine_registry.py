@@ -0,0 +1,61 @@
+import os
+import threading
+
+# Engine name -> label shown in the UIs; engines are imported and built on first use
+ENGINES = {
+    "keyword": "Model 1 (Keyword Search)",
+    "vector": "Model 2 (Vector Search)",
+    "hybrid": "Model 3 (Hybrid Search)",
+}
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def _create_engine(name, **options):
+    if name == "keyword":
+        from rwanda_trade_bot_1 import RwandaTradeBot
+        return RwandaTradeBot(**options)
+    # Shares the instance behind rwanda_trade_bot_2's module-level functions
+    from rwanda_trade_bot_2 import VectorTradeBot, get_default_bot
+    return VectorTradeBot(retrieval=name, **options) if options else get_default_bot(name)
+
+
+def get_engine(name, **options):
+    """Return the process-wide engine for name, creating it on first call
+
+    Engines only hold read-only indexes and thread-safe caches, so one
+    instance serves every session and thread of the process; conversation
+    state is passed in per call. `options` only apply when the engine is
+    created.
+    """
+    if name not in ENGINES:
+        raise ValueError(f"Unknown engine {name!r}; expected one of {sorted(ENGINES)}")
+    engine = _engines.get(name)
+    if engine is None:
+        with _engines_lock:
+            engine = _engines.get(name)
+            if engine is None:
+                engine = _engines[name] = _create_engine(name, **options)
+    return engine
+
+
+def warmup(names=None):
+    """Load the given engines (default: those listed in WARMUP_ENGINES) so the first question is fast"""
+    if names is None:
+        names = [name.strip() for name in os.getenv("WARMUP_ENGINES", "").split(",") if name.strip()]
+    return [get_engine(name).warmup() for name in names]
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Load the chatbot engines once to build their snapshots and stores")
+    parser.add_argument("engines", nargs="*", default=list(ENGINES), help=f"Engines to warm up ({', '.join(ENGINES)})")
+    args = parser.parse_args()
+
+    for name in args.engines:
+        start = time.perf_counter()
+        warmup([name])
+        print(f"✅ {ENGINES[name]} ready in {time.perf_counter() - start:.1f}s")
@@ -0,0 +1,103 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from trade_facets import FacetExtractor
+
+
+def procedure_key(procedure):
+    """Identity of a procedure across retrievers: its procedure_id, else its URL"""
+    procedure_id = procedure.get("procedure_id")
+    if procedure_id and procedure_id != "N/A":
+        return f"proc_{procedure_id}"
+    return procedure.get("url")
+
+
+def reciprocal_rank_fusion(rankings, k=60, weights=None):
+    """Merge ranked lists of keys into [(key, score)], best first
+
+    Each list contributes weight / (k + rank) to every key it contains, so a
+    procedure ranked well by several retrievers beats one ranked first by a
+    single retriever. Keys repeated within a list only count once.
+    """
+    weights = weights or [1.0] * len(rankings)
+    scores = {}
+    for ranking, weight in zip(rankings, weights):
+        seen = set()
+        for rank, key in enumerate(ranking, start=1):
+            if key in seen:
+                continue
+            seen.add(key)
+            scores[key] = scores.get(key, 0.0) + weight / (k + rank)
+    return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+
+
+class LexicalRetriever:
+    """BM25F keyword retrieval over the corpus returned by trade_corpus.load_corpus
+
+    Keywords come from the local extractor only; there is no LLM fallback,
+    so a question without vocabulary matches simply returns nothing. The
+    facets named in the question prefilter the index, unless nothing passes.
+    """
+
+    def __init__(self, corpus):
+        self.index = corpus["index"]
+        self.keyword_extractor = corpus["keyword_extractor"]
+        self.facet_index = corpus["facet_index"]
+        self.facet_extractor = FacetExtractor(corpus["taxonomy"])
+
+    def __call__(self, question, n_results=5):
+        keywords = self.keyword_extractor.extract(question)
+        if not keywords:
+            return []
+        allowed = self.facet_index.mask(self.facet_extractor.extract(question))
+        results = self.index.search(keywords, limit=n_results, allowed=allowed)
+        if not results and allowed is not None:
+            results = self.index.search(keywords, limit=n_results)
+        return [proc for _, proc in results]
+
+
+class HybridRetriever:
+    """Run several retrievers concurrently and fuse their rankings with RRF
+
+    `retrievers` maps a name to a callable (question, n_results) returning
+    procedures best first. Each retriever is asked for `candidates` results;
+    the last one runs in the calling thread and the others in a shared pool
+    with room for `max_concurrency` requests at once, so retrieval takes as
+    long as the slowest retriever rather than their sum, even when requests
+    overlap. Results are deduplicated by procedure_key() and the first
+    retriever to return a procedure supplies its record.
+    """
+
+    def __init__(self, retrievers, k=60, candidates=20, weights=None, max_concurrency=8):
+        self.retrievers = dict(retrievers)
+        self.k = k
+        self.candidates = candidates
+        self.weights = weights
+        offloaded = max(len(self.retrievers) - 1, 1)
+        self._pool = ThreadPoolExecutor(max_workers=offloaded * max_concurrency, thread_name_prefix="retriever")
+
+    def retrieve(self, question, n_results=5):
+        """Return up to n_results fused procedures, each with a `retrieval` dict of per-retriever ranks"""
+        *offloaded, (inline_name, inline) = self.retrievers.items()
+        futures = {name: self._pool.submit(retrieve, question, self.candidates) for name, retrieve in offloaded}
+        inline_results = inline(question, self.candidates)
+        results = {name: future.result() for name, future in futures.items()}
+        results[inline_name] = inline_results
+
+        records = {}
+        ranks = {}
+        rankings = []
+        for name, procedures in results.items():
+            ranking = []
+            for rank, procedure in enumerate(procedures, start=1):
+                key = procedure_key(procedure)
+                records.setdefault(key, procedure)
+                ranks.setdefault(key, {}).setdefault(name, rank)
+                ranking.append(key)
+            rankings.append(ranking)
+
+        weights = [self.weights.get(name, 1.0) for name in results] if self.weights else None
+        fused = reciprocal_rank_fusion(rankings, self.k, weights)
+        return [
+            dict(records[key], retrieval={"score": score, "ranks": ranks[key]})
+            for key, score in fused[:n_results]
+        ]
@@ -1,21 +1,47 @@
 import os
-import json
+import asyncio
 import pandas as pd
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
+from answer_stream import AnswerStream, AsyncAnswerStream, completion_deltas, async_completion_deltas
+from answer_cache import AnswerCache, conversation_key, lexical_embedding
+from context_builder import ContextBuilder
+from trade_corpus import load_corpus
+from trade_facets import FacetExtractor
+from session_store import InMemorySessionStore, SQLiteSessionStore
 
 class RwandaTradeBot:
-    def __init__(self, data_dir="rwanda_trade_data", openai_api_key=None):
+    KEYWORD_MODES = ("local", "llm")
+    
+    def __init__(self, data_dir="rwanda_trade_data", openai_api_key=None, keyword_mode="local",
+                 taxonomy_file=None, answer_cache=None, context_builder=None, history_size=10, session_store=None):
         # Set up OpenAI API key
         if openai_api_key:
             os.environ["OPENAI_API_KEY"] = openai_api_key
         elif "OPENAI_API_KEY" not in os.environ:
             raise ValueError("OpenAI API key must be provided or set as OPENAI_API_KEY environment variable")
         
+        if keyword_mode not in self.KEYWORD_MODES:
+            raise ValueError(f"keyword_mode must be one of {self.KEYWORD_MODES}, got {keyword_mode!r}")
+        
         self.data_dir = data_dir
+        self.keyword_mode = keyword_mode
+        # Products, document types, border posts and agencies used to tag procedures and questions
+        self.taxonomy_file = taxonomy_file or f"{self.data_dir}/taxonomy.json"
         self.client = OpenAI(api_key=os.environ["OPENAI_API_KEY"])
+        self.async_client = AsyncOpenAI(api_key=os.environ["OPENAI_API_KEY"])
+        
+        # Conversations are kept per session ID outside the bot, each bounded to the last history_size turns,
+        # so one loaded corpus can serve many concurrent users; SESSION_DB switches to a SQLite file
+        if session_store is None:
+            session_db = os.getenv("SESSION_DB")
+            if session_db:
+                session_store = SQLiteSessionStore(session_db, max_turns=history_size)
+            else:
+                session_store = InMemorySessionStore(max_turns=history_size)
+        self.sessions = session_store
         
-        # Create simplified memory
-        self.chat_history = []
+        # Keep prompts within an explicit token budget
+        self.context_builder = context_builder or ContextBuilder(model="gpt-3.5-turbo")
         
         # Create data directory if it doesn't exist
         os.makedirs(self.data_dir, exist_ok=True)
@@ -23,81 +49,52 @@ class RwandaTradeBot:
         # Load the trade data
         self.trade_data = self._load_trade_data()
         print(f"Loaded {len(self.trade_data)} trade procedures")
+        
+        # Cache answers to repeated questions; cached entries are dropped when the corpus changes
+        self.answer_cache = answer_cache or AnswerCache()
+        self.answer_cache.set_corpus_version(self.corpus_version)
     
     def _load_trade_data(self):
-        """Load trade procedures data from JSON file"""
-        # Check different possible locations for the JSON file
-        json_file = f"{self.data_dir}/rwanda_trade_procedures.json"
-        
-        if not os.path.exists(json_file):
-            # Try alternate location
-            alternate_file = "rwanda_trade_procedures.json"
-            if os.path.exists(alternate_file):
-                json_file = alternate_file
-            else:
-                raise FileNotFoundError(f"Could not find rwanda_trade_procedures.json in either {self.data_dir} directory or current directory")
-        
-        print(f"Loading data from {json_file}")
-        with open(json_file, 'r') as f:
-            procedures = json.load(f)
-        
-        # Preprocess the procedures to create a more searchable format
-        processed_data = []
-        
-        for procedure in procedures:
-            processed_procedure = {
-                "title": procedure.get('title', 'N/A'),
-                "url": procedure.get('url', 'N/A'),
-                "procedure_id": procedure.get('procedure_id', 'N/A'),
-                "description": procedure.get('description', 'No description available'),
-                "keywords": self._extract_keywords(procedure)
-            }
-            processed_data.append(processed_procedure)
-        
-        # Save a CSV version for easier inspection
-        df = pd.DataFrame(processed_data)
-        df.to_csv(f"{self.data_dir}/processed_procedures.csv", index=False)
-        print(f"Saved processed data to {self.data_dir}/processed_procedures.csv")
-        
-        return processed_data
-    
-    def _extract_keywords(self, procedure):
-        """Extract relevant keywords from a procedure to improve searchability"""
-        title = procedure.get('title', '').lower()
-        desc = procedure.get('description', '').lower()
-        
-        # Extract common trade-related terms
-        keywords = []
-        
-        # Product types
-        product_types = ['coffee', 'tea', 'electronics', 'textile', 'animal', 'plant', 
-                        'food', 'medical', 'vehicle', 'cattle', 'fish', 'poultry']
-        
-        # Document types
-        document_types = ['certificate', 'license', 'permit', 'clearance', 'origin', 
-                          'export', 'import', 'documentation']
-        
-        # Borders and locations
-        locations = ['gatuna', 'rusumo', 'kagitumba', 'rusizi', 'cyanika', 'nemba', 
-                    'mombasa', 'dar es salaam', 'corniche']
+        """Load trade procedures data and the retrieval indexes built from it"""
+        payload = load_corpus(self.data_dir, self.taxonomy_file)
         
-        # Check for these terms in title and description
-        for term in product_types + document_types + locations:
-            if term in title or term in desc:
-                keywords.append(term)
+        self.corpus_version = payload["corpus_version"]
+        self.taxonomy = payload["taxonomy"]
+        self.index = payload["index"]
+        self.keyword_extractor = payload["keyword_extractor"]
+        self.passage_index = payload["passage_index"]
+        self.facet_index = payload["facet_index"]
+        self.facet_extractor = FacetExtractor(self.taxonomy)
         
-        return keywords
+        return payload["procedures"]
+    
+    def warmup(self):
+        """Indexes are loaded by the constructor; kept for parity with VectorTradeBot"""
+        return self
+    
+    def export_processed_csv(self, csv_file=None):
+        """Save a CSV version of the processed procedures for easier inspection"""
+        csv_file = csv_file or f"{self.data_dir}/processed_procedures.csv"
+        df = pd.DataFrame(self.trade_data)
+        df.to_csv(csv_file, index=False)
+        print(f"Saved processed data to {csv_file}")
+        return csv_file
     
-    def _format_chat_history(self):
-        """Format chat history for inclusion in the prompt"""
-        formatted_history = ""
-        for i, message in enumerate(self.chat_history[-5:]):  # Only include last 5 messages
-            role = "Human" if message["role"] == "user" else "Assistant"
-            formatted_history += f"{role}: {message['content']}\n\n"
-        return formatted_history
+    def _format_chat_history(self, history):
+        """Format chat history for inclusion in the prompt, within the history token budget"""
+        return self.context_builder.pack_history(history)
     
-    def _find_relevant_procedures(self, query):
-        """Find procedures relevant to the user's query using ChatGPT"""
+    def _extract_query_keywords(self, query):
+        """Extract search keywords from the query, locally first and with ChatGPT as a fallback"""
+        if self.keyword_mode == "local":
+            keywords = self.keyword_extractor.extract(query)
+            if keywords:
+                print(f"Extracted keywords (local): {keywords}")
+                return keywords
+        return self._extract_llm_keywords(query)
+    
+    def _extract_llm_keywords(self, query):
+        """Extract search keywords from the query using ChatGPT"""
         system_message = """You are a helpful assistant that helps find relevant trade procedures for Rwanda.
         Given a user's query about import/export requirements in Rwanda, your task is to:
         1. Identify 3-5 keywords from the query that are most relevant for searching trade procedures
@@ -123,109 +120,185 @@ class RwandaTradeBot:
         
         print(f"Extracted keywords: {keywords}")
         
-        # Find relevant procedures based on keywords
-        relevant_procedures = []
-        
-        for procedure in self.trade_data:
-            # Score each procedure based on keyword matches
-            score = 0
-            
-            # Check title (higher weight)
-            title = procedure['title'].lower()
-            for keyword in keywords:
-                if keyword in title:
-                    score += 3
-            
-            # Check description
-            desc = procedure['description'].lower()
-            for keyword in keywords:
-                if keyword in desc:
-                    score += 1
-            
-            # Check keywords
-            for keyword in keywords:
-                if keyword in procedure['keywords']:
-                    score += 2
-            
-            if score > 0:
-                relevant_procedures.append((score, procedure))
+        return keywords
+    
+    def _find_relevant_procedures(self, query, keywords=None):
+        """Find procedures relevant to the user's query"""
+        if keywords is None:
+            keywords = self._extract_query_keywords(query)
         
-        # Sort by relevance score
-        relevant_procedures.sort(reverse=True, key=lambda x: x[0])
+        # Only score procedures matching the direction, products, border posts and agencies the query names
+        allowed = self.facet_index.mask(self.facet_extractor.extract(query))
+        results = self.index.search(keywords, limit=5, allowed=allowed)
+        if not results and allowed is not None:
+            results = self.index.search(keywords, limit=5)
         
-        # Take top 5 most relevant procedures
-        top_procedures = [proc for _, proc in relevant_procedures[:5]]
+        # Find relevant procedures based on keywords using the inverted index
+        top_procedures = [proc for _, proc in results]
         
         return top_procedures
     
-    def query(self, question):
-        """Answer a user query about Rwanda trade requirements"""
+    def _build_messages(self, question, relevant_procedures, keywords, history):
+        """Build the ChatGPT messages and the list of source URLs for the relevant procedures"""
+        # Only send the passages of each description that match the query
+        excerpts = self.passage_index.excerpt_all(relevant_procedures, keywords)
+        
+        # Format as many of the relevant procedures as fit in the context budget
+        context, sources = self.context_builder.pack_procedures(excerpts)
+        
+        # Format chat history
+        chat_history = self._format_chat_history(history)
+        
+        # Create the prompt for ChatGPT
+        system_message = """You are an expert assistant specialized in Rwanda import and export requirements.
+        Answer the user's question about trade regulations, procedures, and requirements in Rwanda.
+        
+        Use ONLY the context provided to answer the question. If you don't know the answer based on the context,
+        say "I don't have enough information about that" and suggest the user visit the Rwanda Trade Portal
+        for more detailed information.
+        
+        Always cite your sources at the end of your response with direct links to the relevant procedures on Rwanda Trade Portal.
+        
+        When answering questions about specific products or procedures, provide:
+        1. Required documents
+        2. Fees (if available)
+        3. Step-by-step process (if available)
+        4. Any special requirements or restrictions
+        5. Where to apply/obtain the required permits or licenses
+        """
+        
+        messages = [
+            {"role": "system", "content": system_message},
+            {"role": "user", "content": f"Previous conversation:\n{chat_history}\n\nContext information:\n{context}\n\nQuestion: {question}"}
+        ]
+        
+        return messages, sources
+    
+    def _format_citations(self, answer, sources):
+        """Return the sources section to append if the answer doesn't already cite them"""
+        if not sources or "Source:" in answer or "Sources:" in answer:
+            return ""
+        
+        citations = "\n\nSources:\n"
+        for source in dict.fromkeys(sources):
+            citations += f"- {source}\n"
+        return citations
+    
+    def _remember_answer(self, session_id, answer):
+        """Add a completed response to chat history"""
+        self.sessions.append(session_id, "assistant", answer)
+    
+    def _prepare_answer(self, question, session_id):
+        """Run everything before the answer completion: caching, retrieval and prompt building
+        
+        Returns a dict holding either a complete "answer" (cache hit or fallback) or the
+        "messages" to send to ChatGPT along with the sources and cache key.
+        """
         # Add question to chat history
-        self.chat_history.append({"role": "user", "content": question})
+        self.sessions.append(session_id, "user", question)
+        history = self.sessions.get(session_id)
+        # Answers depend on the earlier turns, so the cache is keyed on them too
+        context = conversation_key(history[:-1])
+        
+        # Repeated questions are answered straight from the cache
+        cached = self.answer_cache.get(question, context)
+        if cached:
+            print(f"Answer cache hit for: {cached.question}")
+            return {"answer": cached.answer, "sources": cached.sources}
+        
+        # Find relevant procedures
+        keywords = self._extract_query_keywords(question)
+        relevant_procedures = self._find_relevant_procedures(question, keywords)
+        
+        if not relevant_procedures:
+            response = "I couldn't find specific information about that in the Rwanda Trade Portal data. Please try asking about specific import/export procedures, documents, or products."
+            return {"answer": response, "sources": []}
         
+        # Paraphrases of a cached question are reused only if they retrieved the same procedures
+        procedure_ids = [proc['procedure_id'] for proc in relevant_procedures]
+        embedding = lexical_embedding(question, self.index.idf)
+        cached = self.answer_cache.get_similar(embedding, procedure_ids, context)
+        if cached:
+            print(f"Answer cache hit for: {cached.question}")
+            return {"answer": cached.answer, "sources": cached.sources}
+        
+        messages, sources = self._build_messages(question, relevant_procedures, keywords, history)
+        return {
+            "messages": messages,
+            "sources": sources,
+            "procedure_ids": procedure_ids,
+            "embedding": embedding,
+            "context": context,
+        }
+    
+    def _stream_hooks(self, question, plan, session_id):
+        """Citation and completion callbacks shared by the sync and async answer streams"""
+        sources = plan["sources"]
+        
+        def on_complete(answer):
+            self._remember_answer(session_id, answer)
+            self.answer_cache.put(question, answer, sources, plan["procedure_ids"], plan["embedding"], plan["context"])
+        
+        # Citations are appended once the model has finished answering
+        return {
+            "sources": sources,
+            "finalize": lambda answer: self._format_citations(answer, sources),
+            "on_complete": on_complete,
+        }
+    
+    def stream_query(self, question, session_id="default"):
+        """Answer a user query, returning an AnswerStream that yields the response as it is generated
+        
+        `session_id` selects the conversation in the session store that the answer continues.
+        """
+        plan = self._prepare_answer(question, session_id)
+        if "answer" in plan:
+            return AnswerStream.from_text(plan["answer"], sources=plan["sources"],
+                                          on_complete=lambda answer: self._remember_answer(session_id, answer))
+        
+        completion = self.client.chat.completions.create(
+            model="gpt-3.5-turbo",
+            messages=plan["messages"],
+            temperature=0.2,
+            stream=True
+        )
+        
+        return AnswerStream(completion_deltas(completion), **self._stream_hooks(question, plan, session_id))
+    
+    def query(self, question, session_id="default"):
+        """Answer a user query about Rwanda trade requirements"""
         try:
-            # Find relevant procedures
-            relevant_procedures = self._find_relevant_procedures(question)
-            
-            if not relevant_procedures:
-                response = "I couldn't find specific information about that in the Rwanda Trade Portal data. Please try asking about specific import/export procedures, documents, or products."
-                self.chat_history.append({"role": "assistant", "content": response})
-                return response
-            
-            # Format the relevant procedures as context
-            context = ""
-            sources = []
-            
-            for proc in relevant_procedures:
-                context += f"PROCEDURE: {proc['title']}\n"
-                context += f"URL: {proc['url']}\n"
-                context += f"DESCRIPTION: {proc['description']}\n\n"
-                sources.append(proc['url'])
-            
-            # Format chat history
-            chat_history = self._format_chat_history()
-            
-            # Create the prompt for ChatGPT
-            system_message = """You are an expert assistant specialized in Rwanda import and export requirements.
-            Answer the user's question about trade regulations, procedures, and requirements in Rwanda.
-            
-            Use ONLY the context provided to answer the question. If you don't know the answer based on the context,
-            say "I don't have enough information about that" and suggest the user visit the Rwanda Trade Portal
-            for more detailed information.
-            
-            Always cite your sources at the end of your response with direct links to the relevant procedures on Rwanda Trade Portal.
-            
-            When answering questions about specific products or procedures, provide:
-            1. Required documents
-            2. Fees (if available)
-            3. Step-by-step process (if available)
-            4. Any special requirements or restrictions
-            5. Where to apply/obtain the required permits or licenses
-            """
-            
-            messages = [
-                {"role": "system", "content": system_message},
-                {"role": "user", "content": f"Previous conversation:\n{chat_history}\n\nContext information:\n{context}\n\nQuestion: {question}"}
-            ]
-            
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=messages,
-                temperature=0.2
-            )
-            
-            answer = response.choices[0].message.content
-            
-            # Add citations if not already included
-            if sources and "Source:" not in answer and "Sources:" not in answer:
-                answer += "\n\nSources:\n"
-                for source in set(sources):
-                    answer += f"- {source}\n"
-            
-            # Add response to chat history
-            self.chat_history.append({"role": "assistant", "content": answer})
-            
-            return answer
+            return self.stream_query(question, session_id).read()
+        except Exception as e:
+            error_msg = f"Error processing query: {str(e)}"
+            print(error_msg)
+            return error_msg
+    
+    async def astream_query(self, question, session_id="default"):
+        """Async version of stream_query built on AsyncOpenAI
+        
+        Retrieval is CPU-bound (and may fall back to a blocking keyword call), so it runs in a
+        worker thread to keep the event loop free for other requests.
+        """
+        plan = await asyncio.to_thread(self._prepare_answer, question, session_id)
+        if "answer" in plan:
+            return AsyncAnswerStream.from_text(plan["answer"], sources=plan["sources"],
+                                               on_complete=lambda answer: self._remember_answer(session_id, answer))
+        
+        completion = await self.async_client.chat.completions.create(
+            model="gpt-3.5-turbo",
+            messages=plan["messages"],
+            temperature=0.2,
+            stream=True
+        )
+        
+        return AsyncAnswerStream(async_completion_deltas(completion), **self._stream_hooks(question, plan, session_id))
+    
+    async def aquery(self, question, session_id="default"):
+        """Async version of query"""
+        try:
+            stream = await self.astream_query(question, session_id)
+            return await stream.read()
         except Exception as e:
             error_msg = f"Error processing query: {str(e)}"
             print(error_msg)
@@ -233,6 +306,12 @@ class RwandaTradeBot:
 
 # Example usage
 if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Rwanda Trade Bot (keyword search model)')
+    parser.add_argument('--export-csv', action='store_true', help='Export the processed procedures to CSV and exit')
+    args = parser.parse_args()
+    
     # Initialize the bot with your OpenAI API key
     openai_api_key = os.environ.get("OPENAI_API_KEY")
     if not openai_api_key:
@@ -241,6 +320,10 @@ if __name__ == "__main__":
     try:
         trade_bot = RwandaTradeBot(openai_api_key=openai_api_key)
         
+        if args.export_csv:
+            trade_bot.export_processed_csv()
+            raise SystemExit(0)
+        
         # Test query
         print("\nRwanda Trade Bot initialized. You can ask questions about trade procedures.")
         print("Type 'exit' to quit.\n")
@@ -251,10 +334,10 @@ if __name__ == "__main__":
                 break
             
             try:
-                response = trade_bot.query(query)
                 print("\nResponse:")
-                print(response)
-                print("\n" + "-"*80 + "\n")
+                for delta in trade_bot.stream_query(query):
+                    print(delta, end="", flush=True)
+                print("\n\n" + "-"*80 + "\n")
             except Exception as e:
                 print(f"Error processing query: {str(e)}")
     except Exception as e:
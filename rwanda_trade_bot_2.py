@@ -1,60 +1,75 @@
 import json
 import os
-from dotenv import load_dotenv
-import openai
-import chromadb
-from sentence_transformers import SentenceTransformer
-from chromadb.utils import embedding_functions
-from openai import OpenAI
+import atexit
+import hashlib
+import threading
 import logging
+from answer_stream import AnswerStream, AsyncAnswerStream, completion_deltas, async_completion_deltas
+from answer_cache import AnswerCache
+from trade_passages import PassageIndex
+from trade_snapshot import file_sha256
+from embedding_pipeline import EMBEDDING_MODEL
+from hybrid_retriever import HybridRetriever, LexicalRetriever, procedure_key
+from trade_chunks import CHUNK_SIZE, CHUNK_OVERLAP, aggregate_chunk_hits, split_chunks
+from trade_facets import FacetExtractor, facet_metadata
 logging.getLogger("chromadb").setLevel(logging.ERROR)
 logging.getLogger("sentence_transformers").setLevel(logging.ERROR)
 
+# Importing this module is side-effect free: data, embedding model, vector store and
+# OpenAI clients are loaded by VectorTradeBot on first use or by warmup().
 
-# 🔐 Load OpenAI Key
-load_dotenv()
-openai.api_key = os.getenv("OPENAI_API_KEY")
+DATA_FILE = "rwanda_trade_data/rwanda_trade_procedures.json"
+CHROMA_DIR = "rwanda_trade_data/chroma"
+VECTORS_DIR = "rwanda_trade_data/vectors"
+QUERY_CACHE_FILE = "rwanda_trade_data/query_embeddings.npz"
+NO_INFORMATION_ANSWER = "I don't have enough information about that. Please visit the Rwanda Trade Portal for more details."
 
-# 📥 Load Rwanda Trade Data
-with open("rwanda_trade_data/rwanda_trade_procedures.json", "r") as file:
-    data = json.load(file)
 
-# 🧱 Prepare Documents and Metadata
-documents = []
-metadatas = []
-for i, entry in enumerate(data):
-    if entry.get("description"):
-        content = f"{entry['title']}. {entry['description']}"
-        documents.append(content)
-        metadatas.append({"url": entry["url"]})
+# 🧱 Prepare Documents and Metadata, keyed by stable IDs derived from procedure_id
+def document_id(entry):
+    if entry.get("procedure_id"):
+        return f"proc_{entry['procedure_id']}"
+    return "url_" + hashlib.sha1(entry["url"].encode("utf-8")).hexdigest()[:16]
 
-# 🤖 Use Local Embedding Model
-sentence_transformer_fn = embedding_functions.SentenceTransformerEmbeddingFunction(
-    model_name="all-MiniLM-L6-v2"
-)
+def content_hash(content):
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
 
-client = chromadb.Client()
-collection = client.get_or_create_collection(
-    name="rwanda-trade-gpt",
-    embedding_function=sentence_transformer_fn
-)
+def build_documents(data, chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP, facet_extractor=None):
+    """Split each description into overlapping chunks, embedded as "<title>. <chunk>"
 
-# 🧠 Add to ChromaDB if not present
-if collection.count() == 0:
-    ids = [f"doc_{i}" for i in range(len(documents))]
-    collection.add(documents=documents, metadatas=metadatas, ids=ids)
-    print("✅ Documents embedded locally and stored.")
-
-
-# 🤝 Ask GPT-4o for a full answer
-
-clientai = OpenAI(api_key=openai.api_key) 
-
-def ask_trade_question(question, n_results=5):
-    results = collection.query(query_texts=[question], n_results=n_results)
-    top_doc = results["documents"][0][0]
-    top_url = results["metadatas"][0][0]["url"]
+    Chunk IDs are "<parent id>#<n>" and their metadata carries the parent ID
+    and chunk number, so hits can be mapped back to the procedure. With
+    chunk_size=None every procedure is a single document. Given a
+    facet_extractor, every chunk also carries its procedure's facet flags;
+    `revision` changes whenever any metadata does, while `content_hash` only
+    follows the embedded text.
+    """
+    documents = {}
+    for entry in data:
+        if entry.get("description"):
+            parent_id = document_id(entry)
+            facets = {}
+            if facet_extractor is not None:
+                facets = facet_metadata(facet_extractor.extract(f"{entry['title']}\n{entry['description']}"))
+            if chunk_size:
+                chunks = split_chunks(entry["description"], chunk_size, chunk_overlap)
+            else:
+                chunks = [entry["description"]]
+            for number, chunk in enumerate(chunks):
+                content = f"{entry['title']}. {chunk}"
+                metadata = {
+                    "url": entry["url"],
+                    "procedure_id": entry.get("procedure_id") or "",
+                    "parent_id": parent_id,
+                    "chunk": number,
+                    "content_hash": content_hash(content),
+                    **facets,
+                }
+                metadata["revision"] = content_hash(json.dumps(metadata, sort_keys=True))
+                documents[f"{parent_id}#{number}"] = (content, metadata)
+    return documents
 
+def _build_prompt(question, context, top_url):
     prompt = f"""
 You are an expert assistant specialized in Rwanda import and export requirements.
 Answer the user's question about trade regulations, procedures, and requirements in Rwanda.
@@ -81,27 +96,300 @@ User Question:
 "{question}"
 
 Context (from Rwanda Trade Portal):
-{top_doc}
+{context}
 
 ---
 Answer:
 """
+    return prompt
+
+
+class VectorTradeBot:
+    """Vector-search model: Chroma + MiniLM retrieval with a GPT-4o answer
+
+    Construction is cheap; everything heavy is loaded once, on first use or
+    by an explicit warmup(). A single instance holds only read-only indexes
+    and thread-safe caches, so it can be shared across sessions and threads.
+    With retrieval="hybrid" the BM25F keyword index of model 1 is searched
+    alongside the vector store and the two rankings are fused.
+    """
+
+    RETRIEVAL_MODES = ("vector", "hybrid")
+
+    def __init__(self, data_file=DATA_FILE, vector_backend=None, vector_dir=None, openai_api_key=None,
+                 embedding_batch_size=64, embedding_workers=None, query_cache_file=QUERY_CACHE_FILE,
+                 retrieval=None, chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP, chunk_aggregation="max",
+                 taxonomy_file=None, **store_options):
+        self.retrieval = retrieval or os.getenv("RETRIEVAL_MODE", "vector")
+        if self.retrieval not in self.RETRIEVAL_MODES:
+            raise ValueError(f"retrieval must be one of {self.RETRIEVAL_MODES}, got {self.retrieval!r}")
+        self.data_file = data_file
+        # Taxonomy used to tag procedures and questions with direction, products, border posts and agency
+        self.taxonomy_file = taxonomy_file or os.path.join(os.path.dirname(data_file), "taxonomy.json")
+        # Descriptions are embedded as overlapping chunks; hits are scored per procedure by "max" or "sum"
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.chunk_aggregation = chunk_aggregation
+        # Question embeddings are cached (and persisted here, unless None) so repeated questions skip the model
+        self.query_cache_file = query_cache_file
+        # Corpus embedding can fan out over several processes; queries are always encoded in-process
+        self.embedding_batch_size = embedding_batch_size
+        self.embedding_workers = embedding_workers or int(os.getenv("EMBEDDING_WORKERS", "1"))
+        # "chroma" (default) or "numpy" (memory-mapped embeddings, optionally FAISS-indexed)
+        self.vector_backend = vector_backend or os.getenv("VECTOR_BACKEND", "chroma")
+        self.vector_dir = vector_dir or (CHROMA_DIR if self.vector_backend == "chroma" else VECTORS_DIR)
+        self.store_options = store_options
+        self.openai_api_key = openai_api_key
+        self._loaded = False
+        self._load_lock = threading.Lock()
+
+    def warmup(self):
+        """Load the data, embedding model and vector store now instead of on the first question"""
+        self._ensure_loaded()
+        return self
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        with self._load_lock:
+            if not self._loaded:
+                self._load()
+                self._loaded = True
+
+    def _load(self):
+        # Heavy imports are deferred so importing this module stays fast
+        from embedding_pipeline import EmbeddingPipeline
+        from embedding_cache import QueryEmbeddingCache
+        from context_builder import ContextBuilder
+        from vector_store import create_vector_store
+        from trade_corpus import load_corpus
+        from trade_taxonomy import TaxonomyMatcher
+        from dotenv import load_dotenv
+        from openai import OpenAI, AsyncOpenAI
+
+        # 🔐 Load OpenAI Key
+        load_dotenv()
+        api_key = self.openai_api_key or os.getenv("OPENAI_API_KEY")
+
+        # 📥 Load Rwanda Trade Data
+        with open(self.data_file, "r") as file:
+            data = json.load(file)
+        self.facet_extractor = FacetExtractor(TaxonomyMatcher.from_file(self.taxonomy_file))
+        documents = build_documents(data, self.chunk_size, self.chunk_overlap, self.facet_extractor)
+
+        # ✂️ Sentence-level index used to send only the query-relevant parts of a description
+        self.passage_index = PassageIndex(data)
+        self.entries_by_url = {entry["url"]: entry for entry in data}
+
+        # 🤖 Use Local Embedding Model
+        self.embedder = EmbeddingPipeline(
+            model_name=EMBEDDING_MODEL,
+            batch_size=self.embedding_batch_size,
+            workers=self.embedding_workers,
+        )
+
+        # 🧠 Reuse embeddings of questions seen before, including across restarts
+        self.query_cache = QueryEmbeddingCache(path=self.query_cache_file, model_name=EMBEDDING_MODEL)
+        if self.query_cache_file:
+            atexit.register(self.query_cache.save)
+
+        self.store = create_vector_store(
+            self.vector_backend, self.vector_dir, self.embedder, **self.store_options
+        )
+
+        changed, removed = self.store.sync(documents)
+        if changed or removed:
+            print(f"✅ Synced vector store: {len(changed)} embedded, {len(removed)} removed.")
+
+        # 🔀 Hybrid mode also searches the keyword index (shared snapshot with model 1) and fuses the rankings
+        self.retriever = None
+        if self.retrieval == "hybrid":
+            corpus = load_corpus(os.path.dirname(self.data_file) or ".", self.taxonomy_file)
+            self.retriever = HybridRetriever({
+                "vector": lambda question, n: self._vector_search(
+                    self._embed(question), n, self.facet_extractor.extract(question)
+                ),
+                "lexical": LexicalRetriever(corpus),
+            })
+
+        # 🤝 Ask GPT-4o for a full answer
+        self.client = OpenAI(api_key=api_key)
+        self.aclient = AsyncOpenAI(api_key=api_key)
+
+        # ♻️ Cache answers to repeated questions; entries are dropped when the data or taxonomy changes
+        self.answer_cache = AnswerCache(
+            corpus_version=f"{file_sha256(self.data_file)}:{file_sha256(self.taxonomy_file)}"
+        )
+
+        # 📏 Keep the retrieved context within an explicit token budget
+        self.context_builder = ContextBuilder(model="gpt-4o")
+
+    def _embed(self, question):
+        return self.query_cache.get_or_compute(question, self.embedder.encode_query)
+
+    def _vector_search(self, embedding, n_results, facets=None):
+        """Return the n_results procedures with the best matching chunks, best first
+
+        Each procedure's description is replaced by its matching chunks, so
+        the prompt cites the procedure's URL but only carries those chunks.
+        `facets` found in the question prefilter the store, unless nothing passes.
+        """
+        # Several chunks of one procedure can match, so fetch more chunks than procedures
+        hits = self.store.query(embedding, n_results=n_results * 4, facets=facets)
+        if not hits and facets:
+            hits = self.store.query(embedding, n_results=n_results * 4)
+        procedures = []
+        for _, score, chunk_hits in aggregate_chunk_hits(hits, self.chunk_aggregation)[:n_results]:
+            metadata = chunk_hits[0]["metadata"]
+            entry = self.entries_by_url.get(metadata["url"]) or {
+                "title": "",
+                "url": metadata["url"],
+                "procedure_id": metadata.get("procedure_id"),
+            }
+            prefix = f"{entry['title']}. "
+            chunks = [hit["document"][len(prefix):] if hit["document"].startswith(prefix) else hit["document"]
+                      for hit in chunk_hits]
+            procedures.append(dict(entry, description=" ... ".join(chunks), chunks=len(chunks), score=score))
+        return procedures
+
+    def _prepare_answer(self, question, n_results):
+        """Cache lookup, retrieval and prompt building; returns a complete "answer" or the "prompt" to send"""
+        self._ensure_loaded()
+
+        # This model keeps no conversation, so every question is cached as standalone (empty context)
+        cached = self.answer_cache.get(question)
+        if cached:
+            return {"answer": cached.answer, "sources": cached.sources}
+
+        # Embed the question once and reuse it for both retrieval and the similarity cache
+        if self.retriever is not None:
+            procedures = self.retriever.retrieve(question, n_results)
+            embedding = self._embed(question)
+        else:
+            embedding = self._embed(question)
+            procedures = self._vector_search(embedding, n_results, self.facet_extractor.extract(question))
+        if not procedures:
+            return {"answer": NO_INFORMATION_ANSWER, "sources": []}
+
+        # Paraphrases reuse a cached answer only when they are grounded on the same documents
+        doc_ids = [procedure_key(proc) for proc in procedures]
+        cached = self.answer_cache.get_similar(embedding, doc_ids)
+        if cached:
+            return {"answer": cached.answer, "sources": cached.sources}
+
+        # Keep the titles and only the matching chunks (or, for keyword hits, passages) of each
+        # description, packing the top-k procedures in rank order into the context budget
+        excerpts = [
+            proc if "chunks" in proc else dict(proc, description=self.passage_index.excerpt(proc, [question], max_passages=3))
+            for proc in procedures
+        ]
+        context, sources = self.context_builder.pack_procedures(excerpts)
+        if not sources:
+            # Not even the top procedure's title fitted the context budget
+            return {"answer": NO_INFORMATION_ANSWER, "sources": []}
+
+        return {
+            "prompt": _build_prompt(question, context, sources[0]),
+            "sources": sources,
+            "doc_ids": doc_ids,
+            "embedding": embedding,
+        }
+
+    def _stream_hooks(self, question, plan):
+        top_url = plan["sources"][0]
+
+        # Make sure the portal link is cited even if the model left it out
+        def cite_source(answer):
+            if top_url in answer:
+                return ""
+            return f"\n\nFor more information, refer to the official Rwanda Trade Portal: {top_url}"
+
+        def on_complete(answer):
+            self.answer_cache.put(question, answer.strip(), plan["sources"], plan["doc_ids"], plan["embedding"])
+
+        return {"sources": plan["sources"], "finalize": cite_source, "on_complete": on_complete}
+
+    def stream_trade_question(self, question, n_results=5):
+        """Answer a question, returning an AnswerStream that yields the response as it is generated"""
+        plan = self._prepare_answer(question, n_results)
+        if "answer" in plan:
+            return AnswerStream.from_text(plan["answer"], sources=plan["sources"])
+
+        completion = self.client.chat.completions.create(
+            model="gpt-4o",
+            messages=[{"role": "user", "content": plan["prompt"]}],
+            temperature=0.3,
+            stream=True
+        )
+
+        return AnswerStream(completion_deltas(completion), **self._stream_hooks(question, plan))
+
+    def ask_trade_question(self, question, n_results=5):
+        return self.stream_trade_question(question, n_results).read().strip()
+
+    # ⚡ Async API: loading, embedding and the Chroma query run in a worker thread so the event loop stays free
+    async def astream_trade_question(self, question, n_results=5):
+        """Async version of stream_trade_question built on AsyncOpenAI"""
+        # Any caller already runs an event loop, so this import is free here and kept off module import
+        import asyncio
+        plan = await asyncio.to_thread(self._prepare_answer, question, n_results)
+        if "answer" in plan:
+            return AsyncAnswerStream.from_text(plan["answer"], sources=plan["sources"])
+
+        completion = await self.aclient.chat.completions.create(
+            model="gpt-4o",
+            messages=[{"role": "user", "content": plan["prompt"]}],
+            temperature=0.3,
+            stream=True
+        )
+
+        return AsyncAnswerStream(async_completion_deltas(completion), **self._stream_hooks(question, plan))
+
+    async def aask_trade_question(self, question, n_results=5):
+        stream = await self.astream_trade_question(question, n_results)
+        return (await stream.read()).strip()
+
+
+# 🌐 Shared instance used by the module-level API
+_default_bots = {}
+_default_bot_lock = threading.Lock()
+
+def get_default_bot(retrieval=None):
+    """Return the process-wide VectorTradeBot for a retrieval mode, creating it (but not loading it) on first call"""
+    retrieval = retrieval or os.getenv("RETRIEVAL_MODE", "vector")
+    bot = _default_bots.get(retrieval)
+    if bot is None:
+        with _default_bot_lock:
+            bot = _default_bots.get(retrieval)
+            if bot is None:
+                bot = _default_bots[retrieval] = VectorTradeBot(retrieval=retrieval)
+    return bot
+
+def warmup():
+    return get_default_bot().warmup()
+
+def stream_trade_question(question, n_results=5):
+    return get_default_bot().stream_trade_question(question, n_results)
+
+def ask_trade_question(question, n_results=5):
+    return get_default_bot().ask_trade_question(question, n_results)
 
-    response = clientai.chat.completions.create(
-        model="gpt-4o",
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0.3
-    )
+async def astream_trade_question(question, n_results=5):
+    return await get_default_bot().astream_trade_question(question, n_results)
 
-    return response.choices[0].message.content.strip()
+async def aask_trade_question(question, n_results=5):
+    return await get_default_bot().aask_trade_question(question, n_results)
 
 # 🔁 CLI Interface
 if __name__ == "__main__":
     print("🇷🇼 Rwanda Trade Chatbot (Local Search + GPT-4o Response)")
+    warmup()
     print("Type 'exit' to quit.")
     while True:
         q = input("\nAsk your question: ")
         if q.lower() in ["exit", "quit"]:
             break
-        response = ask_trade_question(q)
-        print("\n💬", response)
+        print("\n💬", end=" ", flush=True)
+        for delta in stream_trade_question(q):
+            print(delta, end="", flush=True)
+        print()
@@ -6,25 +6,43 @@ import json
 import os
 import logging
 import re
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
 from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
+from crawl_limits import RateLimiter, WebDriverPool
+from crawl_state import CrawlState, normalize_text, response_validators
+from crawl_checkpoint import ProcedureLog, Checkpoint
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# The element holding a procedure's description on its detail page
+DESCRIPTION_SELECTOR = 'div[class*="context-msg"]'
+
 class RwandaTradePortalScraper:
-    def __init__(self):
+    def __init__(self, workers=4, rate_limit=4.0, host_rate_limit=2.0, page_timeout=10):
         self.base_url = "https://rwandatrade.rw"
         self.procedures_base_url = f"{self.base_url}/procedures"
+        self.workers = workers
         self.session = requests.Session()
+        # One pooled connection per worker, so concurrent fetches reuse keep-alive connections
+        adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
         self.procedures_data = []
         
+        # Every fetch, from any worker, waits for a slot under both limits (requests per second)
+        self.rate_limiter = RateLimiter(global_rate=rate_limit, per_host_rate=host_rate_limit)
+        
         # Create headers to mimic a browser
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
@@ -34,11 +52,21 @@ class RwandaTradePortalScraper:
             'Upgrade-Insecure-Requests': '1',
         }
         
-        # Setup Selenium
-        self._setup_selenium()
+        # Selenium drivers are started on demand, at most one per worker
+        self.drivers = WebDriverPool(self._create_driver, size=workers)
+        # Seconds Selenium waits for the description element to appear
+        self.page_timeout = page_timeout
+        
+        # Pages served by each fetch tier ("static", "selenium", or "none" when both came back empty)
+        self.fetch_stats = Counter()
+        self._stats_lock = threading.Lock()
+        
+        # Set by run(incremental=True): validators and content of the previous crawl
+        self.crawl_state = None
+        self.listing_failed = False
     
-    def _setup_selenium(self):
-        """Set up Selenium WebDriver"""
+    def _create_driver(self):
+        """Start a headless Selenium WebDriver for the pool"""
         try:
             chrome_options = Options()
             chrome_options.add_argument("--headless")  # Run in headless mode
@@ -46,41 +74,53 @@ class RwandaTradePortalScraper:
             chrome_options.add_argument("--disable-dev-shm-usage")
             
             service = Service(ChromeDriverManager().install())
-            self.driver = webdriver.Chrome(service=service, options=chrome_options)
+            driver = webdriver.Chrome(service=service, options=chrome_options)
             logger.info("Selenium WebDriver initialized successfully")
+            return driver
         except Exception as e:
             logger.error(f"Failed to initialize Selenium: {e}")
             raise e
     
-    def get_page_content(self, url, use_selenium=False):
+    def get_page_content(self, url):
         """Get page content with error handling and retries"""
-        if use_selenium:
+        response = self._request(url)
+        return response.text if response is not None else None
+    
+    def _request(self, url, extra_headers=None):
+        """GET a page through the pooled session with retries; returns the 200/304 response or None"""
+        headers = {**self.headers, **(extra_headers or {})}
+        max_retries = 3
+        for attempt in range(max_retries):
             try:
-                logger.info(f"Fetching with Selenium: {url}")
-                self.driver.get(url)
-                # Wait for the page to load
-                time.sleep(3)
-                return self.driver.page_source
-            except Exception as e:
-                logger.error(f"Selenium error: {e}")
-                return None
-        else:
-            max_retries = 3
-            for attempt in range(max_retries):
-                try:
-                    logger.info(f"Fetching with requests: {url}")
-                    response = self.session.get(url, headers=self.headers, timeout=30)
-                    if response.status_code == 200:
-                        return response.text
-                    else:
-                        logger.warning(f"Failed to retrieve {url}, status code: {response.status_code}")
-                        time.sleep(2)  # Wait before retrying
-                except Exception as e:
-                    logger.error(f"Error retrieving {url}: {e}")
+                logger.info(f"Fetching with requests: {url}")
+                self.rate_limiter.wait(url)
+                response = self.session.get(url, headers=headers, timeout=30)
+                if response.status_code in (200, 304):
+                    return response
+                else:
+                    logger.warning(f"Failed to retrieve {url}, status code: {response.status_code}")
                     time.sleep(2)  # Wait before retrying
-            
-            logger.error(f"Failed to retrieve {url} after {max_retries} attempts")
-            return None
+            except Exception as e:
+                logger.error(f"Error retrieving {url}: {e}")
+                time.sleep(2)  # Wait before retrying
+        
+        logger.error(f"Failed to retrieve {url} after {max_retries} attempts")
+        return None
+    
+    def get_page_conditional(self, url):
+        """Fetch a page with If-None-Match/If-Modified-Since from the crawl state
+        
+        Returns (html, validators, not_modified); html is None when the page is
+        unchanged since the previous crawl or could not be fetched.
+        """
+        response = self._request(url, self.crawl_state.conditional_headers(url))
+        if response is None:
+            return None, {}, False
+        validators = response_validators(response)
+        if response.status_code == 304:
+            logger.info(f"Not modified since the previous crawl: {url}")
+            return None, validators, True
+        return response.text, validators, False
     
     def extract_procedures_from_page(self, page_number):
         """Extract procedure links from a specific page"""
@@ -88,9 +128,18 @@ class RwandaTradePortalScraper:
         logger.info(f"Accessing procedures page {page_number}: {page_url}")
         
         # For the procedures listing page, requests is sufficient
-        html_content = self.get_page_content(page_url, use_selenium=False)
+        validators = {}
+        if self.crawl_state is not None:
+            html_content, validators, not_modified = self.get_page_conditional(page_url)
+            cached = self.crawl_state.cached_page(page_url) if not_modified else None
+            if cached is not None:
+                self.crawl_state.record_page(page_url, validators, cached)
+                return cached
+        else:
+            html_content = self.get_page_content(page_url)
         if not html_content:
             logger.error(f"Could not retrieve content for page {page_number}")
+            self.listing_failed = True
             return []
         
         soup = BeautifulSoup(html_content, 'html.parser')
@@ -124,48 +173,114 @@ class RwandaTradePortalScraper:
             procedures.append(procedure)
             logger.info(f"Found procedure: {title}")
         
+        if self.crawl_state is not None:
+            self.crawl_state.record_page(page_url, validators, [dict(procedure) for procedure in procedures])
         return procedures
     
+    def _static_description(self, url):
+        """Parse the description from the page's static HTML, without running its JavaScript"""
+        return self._parse_description(self.get_page_content(url))
+    
+    def _parse_description(self, html_content):
+        if not html_content:
+            return ""
+        
+        soup = BeautifulSoup(html_content, 'html.parser')
+        context_div = soup.select_one(DESCRIPTION_SELECTOR)
+        if not context_div:
+            return ""
+        return context_div.get_text(" ", strip=True)
+    
+    def _selenium_description(self, url):
+        """Render the page in a pooled WebDriver and read the description once JavaScript has filled it in"""
+        def description_text(driver):
+            context_elements = driver.find_elements(By.CSS_SELECTOR, DESCRIPTION_SELECTOR)
+            return context_elements[0].text.strip() if context_elements else ""
+        
+        with self.drivers.acquire() as driver:
+            self.rate_limiter.wait(url)
+            driver.get(url)
+            
+            # The div is usually in the static HTML already, so wait for its text rather than its presence
+            try:
+                return WebDriverWait(driver, self.page_timeout).until(description_text)
+            except TimeoutException:
+                pass
+            
+            # The text can be filled in but not visible; read its text content directly
+            description = driver.execute_script("""
+                var contextDivs = document.querySelectorAll('div[class*="context-msg"]');
+                if (contextDivs.length > 0) {
+                    return contextDivs[0].textContent.trim();
+                }
+                return "";
+            """) or ""
+            if not description:
+                logger.warning(f"Timed out waiting for the description on {url}")
+            return description
+    
     def extract_procedure_details(self, procedure):
-        """Extract detailed information for a single procedure"""
+        """Extract detailed information for a single procedure
+        
+        The page is first fetched with requests and parsed as static HTML; Selenium is
+        only used when that yields no description. The tier that served the page is
+        recorded in procedure['fetch_tier']. In an incremental crawl, pages whose
+        description was parsed from static HTML are requested conditionally, and
+        one not modified since the previous crawl is served from the crawl state
+        ("cached"); descriptions that needed Selenium or came back empty are
+        always extracted again.
+        """
         url = procedure['url']
         logger.info(f"Processing procedure: {procedure['title']}")
         
-        # Use Selenium to fetch the procedure page to handle dynamic content
+        description = ""
+        tier = "none"
+        validators = {}
+        cached = None
         try:
-            # Navigate to the procedure page
-            self.driver.get(url)
-            
-            # Wait for the page to load
-            time.sleep(3)
-            
-            # Find the context-msg div
-            context_elements = self.driver.find_elements(By.CSS_SELECTOR, 'div[class*="context-msg"]')
-            
-            if context_elements:
-                description = context_elements[0].text.strip()
-                logger.info(f"Extracted description: {description[:100]}...")
+            if self.crawl_state is not None:
+                cached = self.crawl_state.cached_procedure(url)
+                # Only a static, non-empty description is requested conditionally and reused on a 304
+                reusable = self.crawl_state.reusable_procedure(url)
+                html_content, validators, not_modified = self.get_page_conditional(url)
+                if not_modified and reusable is not None:
+                    description, tier = reusable["description"], "cached"
+                elif not_modified:
+                    description = self._static_description(url)
+                else:
+                    description = self._parse_description(html_content)
             else:
-                # Try using JavaScript as a fallback
-                description = self.driver.execute_script("""
-                    var contextDivs = document.querySelectorAll('div[class*="context-msg"]');
-                    if (contextDivs.length > 0) {
-                        return contextDivs[0].textContent.trim();
-                    }
-                    return "";
-                """)
-                
+                description = self._static_description(url)
+            
+            if tier == "none":
                 if description:
-                    logger.info(f"Extracted description using JavaScript: {description[:100]}...")
+                    tier = "static"
                 else:
-                    logger.warning(f"No description found for {procedure['title']}")
-                    description = ""
-            
-            procedure['description'] = description
-            
+                    logger.info(f"No static description for {procedure['title']}, falling back to Selenium")
+                    description = self._selenium_description(url)
+                    if description:
+                        tier = "selenium"
         except Exception as e:
             logger.error(f"Error extracting details for {url}: {e}")
-            procedure['description'] = ""
+        
+        if tier == "none" and cached is not None and cached["description"]:
+            # A failed fetch should not wipe a procedure from the corpus; keep what the previous crawl found
+            logger.warning(f"Keeping the previous description of {procedure['title']}")
+            description, tier = cached["description"], "cached"
+        
+        # Both tiers break lines differently; normalize before the description is stored or hashed
+        description = normalize_text(description)
+        if description:
+            logger.info(f"Extracted description ({tier}): {description[:100]}...")
+        else:
+            logger.warning(f"No description found for {procedure['title']}")
+        
+        procedure['description'] = description
+        procedure['fetch_tier'] = tier
+        with self._stats_lock:
+            self.fetch_stats[tier] += 1
+        if self.crawl_state is not None:
+            self.crawl_state.record_procedure(url, validators, procedure)
         
         return procedure
     
@@ -192,87 +307,171 @@ class RwandaTradePortalScraper:
                 all_procedures = all_procedures[:limit]
                 logger.info(f"Reached procedure limit of {limit}")
                 break
-                
-            if not test_mode:
-                time.sleep(2)  # Respectful delay between page requests
         
         self.procedures_data = all_procedures
         logger.info(f"Total procedures extracted: {len(all_procedures)}")
         return all_procedures
     
-    def process_procedures(self):
-        """Process all extracted procedures to get detailed information"""
+    def process_procedures(self, procedure_log=None, completed=()):
+        """Process all extracted procedures to get detailed information
+        
+        With a procedure_log, each procedure is appended to it as soon as it is done
+        and is not kept in memory, and procedures whose URL is in `completed` (done
+        by an interrupted run) are skipped. Otherwise the results replace
+        self.procedures_data.
+        """
         logger.info("Beginning extraction of procedure details")
         
+        total = len(self.procedures_data)
+        pending = [procedure for procedure in self.procedures_data if procedure['url'] not in completed]
+        done = total - len(pending)
         updated_procedures = []
         
-        for i, procedure in enumerate(self.procedures_data):
-            # Add delay between requests
-            if i > 0:
-                time.sleep(1)
+        # Workers fetch pages concurrently, paced by the rate limiter; map() keeps the listing order
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            # Copies, so the listing stubs do not accumulate descriptions when streaming to the log
+            details = executor.map(self.extract_procedure_details, (dict(procedure) for procedure in pending))
+            for i, updated_procedure in enumerate(details, start=done + 1):
+                if procedure_log is not None:
+                    procedure_log.append(updated_procedure)
+                else:
+                    updated_procedures.append(updated_procedure)
                 
-            updated_procedure = self.extract_procedure_details(procedure)
-            updated_procedures.append(updated_procedure)
-            
-            # Log progress
-            if (i + 1) % 5 == 0 or (i + 1) == len(self.procedures_data):
-                logger.info(f"Processed {i + 1}/{len(self.procedures_data)} procedures")
+                # Log progress
+                if i % 5 == 0 or i == total:
+                    logger.info(f"Processed {i}/{total} procedures")
         
-        self.procedures_data = updated_procedures
+        if procedure_log is None:
+            self.procedures_data = updated_procedures
         logger.info("Completed extraction of procedure details")
+        self.log_fetch_stats()
+    
+    def log_fetch_stats(self):
+        """Log how many pages each fetch tier served"""
+        total = sum(self.fetch_stats.values())
+        if not total:
+            return
+        summary = ", ".join(
+            f"{tier}: {count} ({count / total:.0%})" for tier, count in self.fetch_stats.most_common()
+        )
+        logger.info(f"Fetch tiers over {total} pages - {summary}")
     
-    def save_data(self, filename_prefix="rwanda_trade"):
-        """Save the extracted data to files"""
+    def save_data(self, filename_prefix="rwanda_trade", procedure_log=None):
+        """Save the extracted data to files, compacted from procedure_log when given"""
         if not self.procedures_data:
             logger.warning("No data to save")
             return
         
         # Create output directory if it doesn't exist
         os.makedirs("rwanda_trade_data", exist_ok=True)
-        
-        # Save as JSON
         json_filename = f"rwanda_trade_data/{filename_prefix}_procedures.json"
-        with open(json_filename, 'w', encoding='utf-8') as f:
-            json.dump(self.procedures_data, f, ensure_ascii=False, indent=4)
-        
-        # Save as CSV
         csv_filename = f"rwanda_trade_data/{filename_prefix}_procedures.csv"
-        df = pd.DataFrame(self.procedures_data)
-        df.to_csv(csv_filename, index=False, encoding='utf-8')
         
-        logger.info(f"Saved {len(self.procedures_data)} procedures to {json_filename} and {csv_filename}")
+        if procedure_log is not None:
+            # Streamed from the JSONL log, one procedure at a time
+            count = procedure_log.compact(json_filename, csv_filename)
+        else:
+            # Save as JSON
+            with open(json_filename, 'w', encoding='utf-8') as f:
+                json.dump(self.procedures_data, f, ensure_ascii=False, indent=4)
+            
+            # Save as CSV
+            df = pd.DataFrame(self.procedures_data)
+            df.to_csv(csv_filename, index=False, encoding='utf-8')
+            count = len(self.procedures_data)
+        
+        logger.info(f"Saved {count} procedures to {json_filename} and {csv_filename}")
         return json_filename
     
-    def run(self, test_mode=False, limit=None):
-        """Run the full scraping process"""
+    def save_changes(self, changes, filename_prefix="rwanda_trade"):
+        """Save the change set of an incremental crawl next to the corpus"""
+        os.makedirs("rwanda_trade_data", exist_ok=True)
+        changes_filename = f"rwanda_trade_data/{filename_prefix}_changes.json"
+        with open(changes_filename, 'w', encoding='utf-8') as f:
+            json.dump(changes, f, ensure_ascii=False, indent=4)
+        
+        logger.info(
+            f"Changes since the previous crawl: {len(changes['added'])} added, {len(changes['changed'])} changed, "
+            f"{len(changes['removed'])} removed, {changes['unchanged']} unchanged (saved to {changes_filename})"
+        )
+        return changes_filename
+    
+    def run(self, test_mode=False, limit=None, incremental=False, resume=True):
+        """Run the full scraping process
+        
+        Procedures are streamed to rwanda_trade_data/<prefix>_procedures.jsonl as they
+        complete, and the final JSON and CSV are compacted from it. If a previous run
+        with the same settings was interrupted, its checkpoint is picked up and only
+        the procedures missing from the JSONL are scraped (unless resume=False).
+        
+        With incremental=True, pages are requested conditionally against the crawl
+        state of the previous incremental run, and a change set (added, changed and
+        removed procedures) is saved alongside the corpus.
+        """
         logger.info(f"Starting Rwanda Trade Portal scraping process {'(TEST MODE)' if test_mode else ''}")
+        filename_prefix = "test_rwanda_trade" if test_mode else "rwanda_trade"
+        procedure_log = ProcedureLog(f"rwanda_trade_data/{filename_prefix}_procedures.jsonl")
+        checkpoint = Checkpoint(f"rwanda_trade_data/{filename_prefix}_checkpoint.json")
+        settings = {"test_mode": test_mode, "limit": limit, "incremental": incremental}
         
         try:
-            # Extract basic procedure information
-            if test_mode:
-                logger.info("Running in test mode - will only extract a few procedures")
-                self.extract_all_procedures(test_mode=True, limit=limit or 10)
-                filename_prefix = "test_rwanda_trade"
+            if incremental:
+                self.crawl_state = CrawlState.load(f"rwanda_trade_data/{filename_prefix}_crawl_state.json")
+                logger.info(f"Incremental crawl against {len(self.crawl_state.procedures)} known procedures")
+            
+            progress = checkpoint.load() if resume else None
+            if progress is not None and progress["settings"] != settings:
+                logger.warning("Found a checkpoint from a run with different settings, starting over")
+                progress = None
+            
+            if progress is not None:
+                # Resume: the listing is known and the JSONL holds every procedure finished so far
+                self.procedures_data = progress["procedures"]
+                self.listing_failed = progress["listing_failed"]
+                procedure_log.open()
+                completed = procedure_log.completed_urls()
+                logger.info(f"Resuming from checkpoint: {len(completed)}/{len(self.procedures_data)} procedures already scraped")
+                if self.crawl_state is not None:
+                    for procedure in procedure_log.records():
+                        self.crawl_state.record_procedure(procedure['url'], {}, procedure)
             else:
-                self.extract_all_procedures(limit=limit)
-                filename_prefix = "rwanda_trade"
+                # Extract basic procedure information
+                if test_mode:
+                    logger.info("Running in test mode - will only extract a few procedures")
+                    self.extract_all_procedures(test_mode=True, limit=limit or 10)
+                else:
+                    self.extract_all_procedures(limit=limit)
+                
+                checkpoint.save(settings=settings, procedures=self.procedures_data, listing_failed=self.listing_failed)
+                procedure_log.open(fresh=True)
+                completed = set()
             
             # Extract detailed information for each procedure
-            self.process_procedures()
+            self.process_procedures(procedure_log, completed)
+            procedure_log.close()
             
             # Save the data
-            json_filename = self.save_data(filename_prefix)
+            json_filename = self.save_data(filename_prefix, procedure_log)
+            
+            if self.crawl_state is not None:
+                # Removals can only be told apart from unvisited pages when the whole listing was crawled
+                complete = not (test_mode or limit or self.listing_failed)
+                changes = self.crawl_state.change_set(complete=complete)
+                self.crawl_state.save()
+                self.save_changes(changes, filename_prefix)
+            
+            # The run is complete; the next one starts from scratch
+            checkpoint.clear()
+            procedure_log.remove()
             
             logger.info("Scraping process completed")
             return json_filename
             
         finally:
-            # Always close the Selenium driver
-            try:
-                self.driver.quit()
-                logger.info("Selenium WebDriver closed")
-            except:
-                pass
+            procedure_log.close()
+            # Always close the Selenium drivers
+            self.drivers.close()
+            logger.info("Selenium WebDrivers closed")
 
 
 # Test function to verify a single procedure extraction works
@@ -337,14 +536,19 @@ if __name__ == "__main__":
     parser.add_argument('--test', action='store_true', help='Run in test mode with only 10 procedures')
     parser.add_argument('--test-single', action='store_true', help='Test extraction of a single procedure')
     parser.add_argument('--limit', type=int, help='Limit the number of procedures to extract')
+    parser.add_argument('--incremental', action='store_true', help='Only refetch pages changed since the previous incremental run')
+    parser.add_argument('--fresh', action='store_true', help='Ignore the checkpoint of an interrupted run and start over')
+    parser.add_argument('--workers', type=int, default=4, help='Procedure pages fetched concurrently')
+    parser.add_argument('--rate', type=float, default=4.0, help='Maximum requests per second overall')
+    parser.add_argument('--host-rate', type=float, default=2.0, help='Maximum requests per second to one host')
     
     args = parser.parse_args()
     
     if args.test_single:
         test_single_procedure()
     else:
-        scraper = RwandaTradePortalScraper()
-        json_filename = scraper.run(test_mode=args.test, limit=args.limit)
+        scraper = RwandaTradePortalScraper(workers=args.workers, rate_limit=args.rate, host_rate_limit=args.host_rate)
+        json_filename = scraper.run(test_mode=args.test, limit=args.limit, incremental=args.incremental, resume=not args.fresh)
         
         print(f"\nScraping completed. Data saved to {json_filename}")
         print("You can now test the chatbot with this data.")
\ No newline at end of file
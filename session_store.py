@@ -0,0 +1,159 @@
+import time
+import sqlite3
+import threading
+from collections import OrderedDict, deque
+
+# Default SQLite file, shared by every process that sets SESSION_DB to it
+SESSION_DB_FILE = "rwanda_trade_data/sessions.sqlite3"
+
+
+class SessionStore:
+    """Recent conversation turns per session ID, kept apart from the shared model
+
+    Turns are {"role", "content"} dicts. Each session keeps at most
+    `max_turns` of them and expires `ttl` seconds after its last use.
+    """
+
+    def get(self, session_id):
+        """Return the session's turns, oldest first (empty for unknown or expired sessions)"""
+        raise NotImplementedError
+
+    def append(self, session_id, role, content):
+        raise NotImplementedError
+
+    def clear(self, session_id):
+        raise NotImplementedError
+
+
+class InMemorySessionStore(SessionStore):
+    """LRU of bounded turn deques, capped at `max_sessions` sessions"""
+
+    def __init__(self, max_sessions=10000, ttl=3600, max_turns=10):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.max_turns = max_turns
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def _expired(self, last_used, now):
+        return self.ttl is not None and now - last_used > self.ttl
+
+    def get(self, session_id):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return []
+            turns, last_used = entry
+            if self._expired(last_used, now):
+                del self._sessions[session_id]
+                return []
+            return list(turns)
+
+    def append(self, session_id, role, content):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._sessions.pop(session_id, None)
+            if entry is None or self._expired(entry[1], now):
+                turns = deque(maxlen=self.max_turns)
+            else:
+                turns = entry[0]
+            turns.append({"role": role, "content": content})
+            self._sessions[session_id] = (turns, now)
+
+            # Expired sessions sit at the old end of the LRU order, followed by the least recently used
+            while self._sessions:
+                oldest_id, (_, last_used) = next(iter(self._sessions.items()))
+                if len(self._sessions) <= self.max_sessions and not self._expired(last_used, now):
+                    break
+                del self._sessions[oldest_id]
+
+    def clear(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+
+class SQLiteSessionStore(SessionStore):
+    """Turns in a SQLite table, so conversations survive restarts and can be shared by workers"""
+
+    # Seconds between sweeps for expired sessions
+    PURGE_INTERVAL = 60
+
+    def __init__(self, path=SESSION_DB_FILE, ttl=24 * 3600, max_turns=10):
+        self.path = path
+        self.ttl = ttl
+        self.max_turns = max_turns
+        self._last_purge = 0.0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS turns ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " session_id TEXT NOT NULL,"
+            " role TEXT NOT NULL,"
+            " content TEXT NOT NULL,"
+            " created REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS turns_session ON turns (session_id, id)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS turns_created ON turns (created)")
+
+    def _cutoff(self):
+        return time.time() - self.ttl if self.ttl is not None else float("-inf")
+
+    def get(self, session_id):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT role, content, created FROM turns WHERE session_id = ? ORDER BY id DESC LIMIT ?",
+                (session_id, self.max_turns),
+            ).fetchall()
+        # A session expires with its most recent turn
+        if not rows or rows[0][2] < self._cutoff():
+            return []
+        return [{"role": role, "content": content} for role, content, _ in reversed(rows)]
+
+    def append(self, session_id, role, content):
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                # An expired session starts over instead of bringing its old turns back
+                if self.ttl is not None:
+                    self._conn.execute(
+                        "DELETE FROM turns WHERE session_id = ? AND "
+                        "(SELECT MAX(created) FROM turns WHERE session_id = ?) < ?",
+                        (session_id, session_id, self._cutoff()),
+                    )
+                self._conn.execute(
+                    "INSERT INTO turns (session_id, role, content, created) VALUES (?, ?, ?, ?)",
+                    (session_id, role, content, now),
+                )
+                # Keep only the newest max_turns turns of this session
+                self._conn.execute(
+                    "DELETE FROM turns WHERE session_id = ? AND id NOT IN "
+                    "(SELECT id FROM turns WHERE session_id = ? ORDER BY id DESC LIMIT ?)",
+                    (session_id, session_id, self.max_turns),
+                )
+                # Now and then, drop sessions whose last turn is older than the TTL
+                if self.ttl is not None and now - self._last_purge > self.PURGE_INTERVAL:
+                    self._conn.execute(
+                        "DELETE FROM turns WHERE session_id IN "
+                        "(SELECT session_id FROM turns GROUP BY session_id HAVING MAX(created) < ?)",
+                        (self._cutoff(),),
+                    )
+                    self._last_purge = now
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def clear(self, session_id):
+        with self._lock:
+            self._conn.execute("DELETE FROM turns WHERE session_id = ?", (session_id,))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
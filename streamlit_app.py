@@ -1,69 +1,110 @@
 # streamlit_app.py
 import streamlit as st
-from importlib import import_module
 import pandas as pd
 import datetime
 import os
+import uuid
+import engine_registry
+from answer_client import AnswerServiceClient
+
+# With ANSWER_SERVICE_URL set the UI is a thin client of answer_service; otherwise engines run in-process
+SERVICE_URL = os.getenv("ANSWER_SERVICE_URL")
+
+# --- Shared engines: loaded once per server process, never on a rerun ---
+@st.cache_resource(show_spinner="Loading the trade data...")
+def load_engine(name):
+    return engine_registry.get_engine(name).warmup()
+
+@st.cache_resource
+def load_client(url):
+    return AnswerServiceClient(url)
+
+@st.cache_resource(show_spinner="Warming up the models...")
+def warm_engines():
+    # Engines listed in WARMUP_ENGINES are loaded as soon as the first session starts
+    return engine_registry.warmup()
 
 # --- UI Setup ---
 st.set_page_config(page_title="🇷🇼 Rwanda Trade Chatbot", layout="centered")
+if not SERVICE_URL:
+    warm_engines()
 st.title("💬 Rwanda Trade Chatbot")
 st.markdown("Ask about import/export requirements and get reliable answers from official data sources.")
 
 # --- Model Selection ---
 st.sidebar.header("⚙️ Settings")
-model_choice = st.sidebar.selectbox("Choose a model version:", ["Model 1 (Keyword Search)", "Model 2 (Vector Search)"])
-
-# --- Load selected model ---
-if model_choice == "Model 1 (Keyword Search)":
-    model = import_module("rwanda_trade_bot_1").RwandaTradeBot()
-    model_version = "Model 1"
-    is_model_1 = True
-else:
-    model = import_module("rwanda_trade_bot_2")
-    model_version = "Model 2"
-    is_model_1 = False
+engine_name = st.sidebar.selectbox(
+    "Choose a model version:", list(engine_registry.ENGINES), format_func=engine_registry.ENGINES.get
+)
+
+# --- Load selected model (shared by all sessions) ---
+# Model 3 runs keyword and vector retrieval in parallel and merges them with reciprocal-rank fusion
+model = None if SERVICE_URL else load_engine(engine_name)
+model_version = engine_registry.ENGINES[engine_name].split(" (")[0]
+is_model_1 = engine_name == "keyword"
+
+# Conversation state lives in the engine's session store under this browser session's ID
+if "session_id" not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
 
 # --- Chat Input ---
 st.markdown("### 🤖 Ask your question")
 user_input = st.text_input("", placeholder="e.g. What are the requirements to export coffee?", label_visibility="collapsed")
 
 if user_input:
-    with st.spinner("Thinking..."):
-        try:
-            if is_model_1:
-                response = model.query(user_input)
+    try:
+        st.markdown("### 📘 Answer")
+        answer_placeholder = st.empty()
+
+        # Rating or changing a setting reruns the script; asking again would add the turn to the session twice
+        asked = (user_input, engine_name)
+        if st.session_state.get("last_asked") == asked:
+            response = st.session_state.last_answer
+        else:
+            answer_placeholder.info("Thinking...")
+
+            if SERVICE_URL:
+                stream = load_client(SERVICE_URL).stream(user_input, engine_name, st.session_state.session_id)
+            elif is_model_1:
+                stream = model.stream_query(user_input, st.session_state.session_id)
             else:
-                response = model.ask_trade_question(user_input)
-
-            st.markdown("### 📘 Answer")
-            st.success(response)
-
-            # Rating widget
-            st.markdown("### 📝 How helpful was this answer?")
-            rating = st.radio("Rate the answer:", ["⭐️⭐️⭐️⭐️⭐️ Excellent", "⭐️⭐️⭐️⭐️ Good", "⭐️⭐️⭐️ Okay", "⭐️⭐️ Poor", "⭐️ Terrible"], index=None)
-
-            if rating:
-                st.success(f"✅ Thanks for rating: {rating}")
-
-                # Save rating
-                log_data = {
-                    "timestamp": datetime.datetime.now().isoformat(),
-                    "model_version": model_version,
-                    "question": user_input,
-                    "response": response,
-                    "rating": rating
-                }
-                df = pd.DataFrame([log_data])
-                os.makedirs("logs", exist_ok=True)
-                log_path = "logs/ratings.csv"
-                if os.path.exists(log_path):
-                    df.to_csv(log_path, mode='a', header=False, index=False)
-                else:
-                    df.to_csv(log_path, index=False)
-
-        except Exception as e:
-            st.error(f"❌ Error: {str(e)}")
+                stream = model.stream_trade_question(user_input)
+
+            # Render tokens as they arrive; citations are appended at the end of the stream
+            response = ""
+            for delta in stream:
+                response += delta
+                answer_placeholder.success(response + "▌")
+            response = response.strip()
+            st.session_state.last_asked = asked
+            st.session_state.last_answer = response
+        answer_placeholder.success(response)
+
+        # Rating widget
+        st.markdown("### 📝 How helpful was this answer?")
+        rating = st.radio("Rate the answer:", ["⭐️⭐️⭐️⭐️⭐️ Excellent", "⭐️⭐️⭐️⭐️ Good", "⭐️⭐️⭐️ Okay", "⭐️⭐️ Poor", "⭐️ Terrible"], index=None)
+
+        if rating:
+            st.success(f"✅ Thanks for rating: {rating}")
+
+            # Save rating
+            log_data = {
+                "timestamp": datetime.datetime.now().isoformat(),
+                "model_version": model_version,
+                "question": user_input,
+                "response": response,
+                "rating": rating
+            }
+            df = pd.DataFrame([log_data])
+            os.makedirs("logs", exist_ok=True)
+            log_path = "logs/ratings.csv"
+            if os.path.exists(log_path):
+                df.to_csv(log_path, mode='a', header=False, index=False)
+            else:
+                df.to_csv(log_path, index=False)
+
+    except Exception as e:
+        st.error(f"❌ Error: {str(e)}")
 
 # --- Feedback Viewer ---
 with st.expander("🗃 View Previous Feedback"):
@@ -0,0 +1,47 @@
+from collections import defaultdict
+
+# all-MiniLM-L6-v2 reads at most 256 word pieces, roughly 1000 characters of English text;
+# chunks stay below that with room for the title that is prepended to each one
+CHUNK_SIZE = 800
+CHUNK_OVERLAP = 120
+AGGREGATIONS = ("max", "sum")
+
+
+def split_chunks(text, chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP):
+    """Split text into overlapping chunks on paragraph, line and sentence boundaries"""
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        separators=["\n\n", "\n", ". ", " ", ""],
+        keep_separator="end",
+    )
+    return [chunk.strip() for chunk in splitter.split_text(text) if chunk.strip()]
+
+
+def aggregate_chunk_hits(hits, aggregation="max"):
+    """Group chunk hits by their parent document and score each parent
+
+    `hits` are vector store hits whose metadata carries `parent_id` and
+    `chunk`. "max" ranks a parent by its best chunk; "sum" adds up all of its
+    matching chunks, favouring procedures that match in several places.
+    Returns [(parent_id, score, hits)] best first, each parent's hits in
+    document order.
+    """
+    if aggregation not in AGGREGATIONS:
+        raise ValueError(f"aggregation must be one of {AGGREGATIONS}, got {aggregation!r}")
+
+    grouped = defaultdict(list)
+    for hit in hits:
+        metadata = hit["metadata"]
+        grouped[metadata.get("parent_id") or hit["id"]].append(hit)
+
+    parents = []
+    for parent_id, parent_hits in grouped.items():
+        scores = [hit["score"] for hit in parent_hits]
+        score = max(scores) if aggregation == "max" else sum(scores)
+        parent_hits.sort(key=lambda hit: hit["metadata"].get("chunk", 0))
+        parents.append((parent_id, score, parent_hits))
+    parents.sort(key=lambda parent: -parent[1])
+    return parents
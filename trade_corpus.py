@@ -0,0 +1,81 @@
+import os
+import json
+
+from trade_facets import FacetExtractor, FacetIndex
+from trade_index import TradeIndex
+from trade_keywords import LocalKeywordExtractor
+from trade_passages import PassageIndex
+from trade_snapshot import load_snapshot, save_snapshot, sources_sha256
+from trade_taxonomy import TaxonomyMatcher
+
+
+def find_procedures_file(data_dir):
+    """Locate rwanda_trade_procedures.json in data_dir or the current directory"""
+    json_file = f"{data_dir}/rwanda_trade_procedures.json"
+    if os.path.exists(json_file):
+        return json_file
+    # Try alternate location
+    alternate_file = "rwanda_trade_procedures.json"
+    if os.path.exists(alternate_file):
+        return alternate_file
+    raise FileNotFoundError(f"Could not find rwanda_trade_procedures.json in either {data_dir} directory or current directory")
+
+
+def build_corpus(json_file, taxonomy):
+    """Preprocess the procedures and build the retrieval indexes"""
+    with open(json_file, 'r') as f:
+        procedures = json.load(f)
+
+    # Preprocess the procedures to create a more searchable format
+    processed_data = []
+    facet_extractor = FacetExtractor(taxonomy)
+
+    for procedure in procedures:
+        # Tag products, document types, border posts and agencies in a single pass
+        text = f"{procedure.get('title', '')}\n{procedure.get('description', '')}"
+        processed_procedure = {
+            "title": procedure.get('title', 'N/A'),
+            "url": procedure.get('url', 'N/A'),
+            "procedure_id": procedure.get('procedure_id', 'N/A'),
+            "description": procedure.get('description', 'No description available'),
+            "keywords": taxonomy.keywords(text),
+            # Direction, product categories, border posts and agency used as retrieval prefilters
+            "facets": facet_extractor.extract(text),
+        }
+        processed_data.append(processed_procedure)
+
+    # Build the retrieval index once so queries only touch the postings for their terms
+    return {
+        "procedures": processed_data,
+        "taxonomy": taxonomy,
+        "index": TradeIndex(processed_data),
+        "keyword_extractor": LocalKeywordExtractor(processed_data, taxonomy),
+        "passage_index": PassageIndex(processed_data),
+        "facet_index": FacetIndex(processed_data),
+    }
+
+
+def load_corpus(data_dir="rwanda_trade_data", taxonomy_file=None):
+    """Return the processed procedures and lexical indexes, from the snapshot when it is current
+
+    The payload holds procedures, taxonomy, index, keyword_extractor,
+    passage_index, facet_index and corpus_version. It is shared by the
+    keyword model and the lexical half of hybrid retrieval.
+    """
+    json_file = find_procedures_file(data_dir)
+    taxonomy_file = taxonomy_file or f"{data_dir}/taxonomy.json"
+
+    # Reuse the preprocessed corpus and indexes while the source data and taxonomy are unchanged
+    snapshot_file = f"{data_dir}/processed_procedures.pkl"
+    sources = [json_file, taxonomy_file]
+    payload = load_snapshot(snapshot_file, sources)
+
+    if payload is None:
+        print(f"Loading data from {json_file}")
+        # Compile the taxonomy once and reuse it for every procedure
+        payload = build_corpus(json_file, TaxonomyMatcher.from_file(taxonomy_file))
+        payload["corpus_version"] = ":".join(sources_sha256(sources))
+        save_snapshot(snapshot_file, sources, payload)
+        print(f"Saved processed snapshot to {snapshot_file}")
+
+    return payload
@@ -0,0 +1,113 @@
+import re
+
+# Document-type terms of the taxonomy that state the direction of a trade flow
+DIRECTIONS = ("import", "export", "transit")
+
+# Facet name -> taxonomy facets it is built from
+FACET_SOURCES = {
+    "direction": ("document_types",),
+    "product_categories": ("products", "hs_categories"),
+    "border_posts": ("border_posts",),
+    "agency": ("agencies",),
+}
+
+
+class FacetExtractor:
+    """Detect trade direction, product categories, border posts and agencies in text
+
+    Used at ingest to tag each procedure and at query time to analyze the
+    question, so both sides share the taxonomy matcher and its vocabulary.
+    """
+
+    def __init__(self, taxonomy):
+        self.taxonomy = taxonomy
+
+    def extract(self, text):
+        """Return {facet: [canonical values]} for every facet found in text"""
+        facets = {}
+        for source, canonical in self.taxonomy.match(text):
+            for facet, sources in FACET_SOURCES.items():
+                if source not in sources:
+                    continue
+                if facet == "direction" and canonical not in DIRECTIONS:
+                    continue
+                values = facets.setdefault(facet, [])
+                if canonical not in values:
+                    values.append(canonical)
+        return facets
+
+
+def facet_flag(facet, value):
+    """Metadata key marking a document tagged with value, e.g. "direction_export" """
+    return f"{facet}_" + re.sub(r"\W+", "_", value).strip("_")
+
+
+def facet_metadata(facets):
+    """Flatten facets into scalar metadata flags that vector stores can filter on
+
+    Every document gets a `has_<facet>` flag so a filter can let through
+    documents that are not tagged for a facet at all.
+    """
+    metadata = {}
+    for facet in FACET_SOURCES:
+        values = facets.get(facet, [])
+        metadata[f"has_{facet}"] = bool(values)
+        for value in values:
+            metadata[facet_flag(facet, value)] = True
+    return metadata
+
+
+def facet_conditions(query_facets):
+    """Yield (has_<facet> flag, value flags) for every facet of the question
+
+    A document passes a facet if it carries one of the value flags or is not
+    tagged for that facet at all.
+    """
+    for facet, values in query_facets.items():
+        if values:
+            yield f"has_{facet}", [facet_flag(facet, value) for value in values]
+
+
+def chroma_where(query_facets):
+    """Translate the question's facets into a Chroma `where` clause, or None"""
+    clauses = [
+        {"$or": [{tagged: False}] + [{flag: True} for flag in flags]}
+        for tagged, flags in facet_conditions(query_facets)
+    ]
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+class FacetIndex:
+    """Bitmaps of the procedures carrying each facet value, for prefiltering the keyword index
+
+    Bitmaps are Python ints with bit i set for procedure i, so combining
+    facets is a handful of big-integer ANDs and ORs.
+    """
+
+    def __init__(self, procedures):
+        self.size = len(procedures)
+        self.bitmaps = {}
+        self.tagged = {}
+        for doc_id, procedure in enumerate(procedures):
+            bit = 1 << doc_id
+            for facet, values in (procedure.get("facets") or {}).items():
+                if values:
+                    self.tagged[facet] = self.tagged.get(facet, 0) | bit
+                for value in values:
+                    key = (facet, value)
+                    self.bitmaps[key] = self.bitmaps.get(key, 0) | bit
+
+    def mask(self, query_facets):
+        """Bitmap of the procedures passing the question's facets, or None when nothing is filtered"""
+        everything = (1 << self.size) - 1
+        mask = None
+        for facet, values in query_facets.items():
+            if not values:
+                continue
+            allowed = everything & ~self.tagged.get(facet, 0)
+            for value in values:
+                allowed |= self.bitmaps.get((facet, value), 0)
+            mask = allowed if mask is None else mask & allowed
+        return mask
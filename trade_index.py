@@ -0,0 +1,120 @@
+import math
+import re
+import heapq
+from collections import defaultdict
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def normalize_token(token):
+    """Reduce a lowercased token to a simple singular form so 'fertilizers' matches 'fertilizer'"""
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 3 and token.endswith("s") and not token.endswith(("ss", "us", "is")):
+        return token[:-1]
+    return token
+
+
+def tokenize(text):
+    """Split text into lowercased, normalized tokens"""
+    return [normalize_token(token) for token in TOKEN_PATTERN.findall(text.lower())]
+
+
+class TradeIndex:
+    """Inverted index over trade procedures scored with BM25F
+
+    Each procedure is indexed over three fields (title, description and the
+    extracted keywords). The field weights keep the original 3/1/2 weighting
+    of the linear keyword scan, and term frequencies are length-normalized per
+    field before being combined, as in BM25F.
+    """
+
+    FIELD_WEIGHTS = {"title": 3.0, "description": 1.0, "keywords": 2.0}
+
+    def __init__(self, procedures, field_weights=None, k1=1.2, b=0.75):
+        self.procedures = procedures
+        self.field_weights = field_weights or dict(self.FIELD_WEIGHTS)
+        self.k1 = k1
+        self.b = b
+        self.postings = {}
+        self.idf = {}
+        self._build()
+
+    def _field_tokens(self, procedure, field):
+        value = procedure.get(field) or ""
+        if isinstance(value, (list, tuple)):
+            value = " ".join(value)
+        return tokenize(value)
+
+    def _build(self):
+        """Build the postings lists and IDF table for the whole corpus"""
+        doc_count = len(self.procedures)
+        field_tokens = {field: [] for field in self.field_weights}
+        avg_length = {}
+
+        for field in self.field_weights:
+            for procedure in self.procedures:
+                field_tokens[field].append(self._field_tokens(procedure, field))
+            total = sum(len(tokens) for tokens in field_tokens[field])
+            avg_length[field] = (total / doc_count) if doc_count else 0.0
+
+        # Accumulate the length-normalized, field-weighted term frequency of
+        # every (term, document) pair
+        weighted_tf = defaultdict(lambda: defaultdict(float))
+        for field, weight in self.field_weights.items():
+            for doc_id, tokens in enumerate(field_tokens[field]):
+                if not tokens:
+                    continue
+                norm = 1.0
+                if avg_length[field]:
+                    norm = 1 - self.b + self.b * len(tokens) / avg_length[field]
+                counts = defaultdict(int)
+                for token in tokens:
+                    counts[token] += 1
+                for token, count in counts.items():
+                    weighted_tf[token][doc_id] += weight * count / norm
+
+        # Store the saturated term weight directly in the postings so a query
+        # only has to sum precomputed values
+        for term, docs in weighted_tf.items():
+            df = len(docs)
+            self.idf[term] = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+            self.postings[term] = [
+                (doc_id, tf / (self.k1 + tf)) for doc_id, tf in docs.items()
+            ]
+
+    def query_terms(self, keywords):
+        """Turn a list of keywords or phrases into the distinct index terms they contain"""
+        terms = []
+        for keyword in keywords:
+            for token in tokenize(keyword):
+                if token not in terms:
+                    terms.append(token)
+        return terms
+
+    def score(self, keywords, allowed=None):
+        """Return a mapping of document id to BM25F score for the given keywords
+
+        `allowed` is an optional bitmap (bit i set for document i, see
+        trade_facets.FacetIndex); documents outside it are never scored.
+        """
+        if allowed is not None:
+            # Unpack the bitmap once per query; shifting the big int per posting costs O(N) each time
+            allowed = allowed.to_bytes((len(self.procedures) + 7) // 8 or 1, "little")
+        scores = defaultdict(float)
+        for term in self.query_terms(keywords):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = self.idf[term]
+            for doc_id, weight in postings:
+                if allowed is not None and not allowed[doc_id >> 3] >> (doc_id & 7) & 1:
+                    continue
+                scores[doc_id] += idf * (self.k1 + 1) * weight
+        return scores
+
+    def search(self, keywords, limit=5, allowed=None):
+        """Return the top (score, procedure) pairs for the given keywords"""
+        scores = self.score(keywords, allowed)
+        top = heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], -item[0]))
+        return [(score, self.procedures[doc_id]) for doc_id, score in top]
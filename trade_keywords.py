@@ -0,0 +1,75 @@
+from trade_index import normalize_token, tokenize
+
+# Common English words plus words that appear in almost every trade question
+STOPWORDS = frozenset(normalize_token(word) for word in """
+a about above after again all am an and any are as at be been before being below between both but by can
+could did do does doing down during each few for from further had has have having he her here hers him his
+how i if in into is it its itself just me more most my myself no nor not now of off on once only or other
+our ours out over own same she should so some such than that the their theirs them then there these they
+this those through to too under until up very was we were what when where which while who whom why will
+with would you your yours yourself
+rwanda rwandan need needed require required requirement get want like please tell know go goods thing
+""".split())
+
+MAX_NGRAM = 3
+
+
+class LocalKeywordExtractor:
+    """Deterministic keyword extractor that replaces the LLM keyword round trip
+
+    The vocabulary is mined from the procedure titles and descriptions
+    (unigrams from both, multi-word phrases from titles) and extended with
+    the taxonomy terms. Questions are first tagged with the taxonomy matcher,
+    which maps aliases such as "car" to canonical terms, then matched greedily
+    against the vocabulary, longest phrase first, after stopword removal.
+    """
+
+    def __init__(self, procedures, taxonomy=None):
+        self.taxonomy = taxonomy
+        self.unigrams = set()
+        self.phrases = set()
+        self._build_vocabulary(procedures, taxonomy.terms() if taxonomy else ())
+
+    def _content_tokens(self, text):
+        return [token for token in tokenize(text) if token not in STOPWORDS]
+
+    def _build_vocabulary(self, procedures, extra_terms):
+        """Collect the unigrams and title phrases the extractor can match"""
+        for procedure in procedures:
+            title_tokens = self._content_tokens(procedure.get('title') or '')
+            desc_tokens = self._content_tokens(procedure.get('description') or '')
+            self.unigrams.update(title_tokens)
+            self.unigrams.update(desc_tokens)
+            for size in range(2, MAX_NGRAM + 1):
+                for i in range(len(title_tokens) - size + 1):
+                    self.phrases.add(" ".join(title_tokens[i:i + size]))
+
+        for term in extra_terms:
+            tokens = tokenize(term)
+            if len(tokens) > 1:
+                self.phrases.add(" ".join(tokens))
+            self.unigrams.update(tokens)
+
+    def extract(self, question):
+        """Return the vocabulary terms found in the question, longest phrases first"""
+        tokens = self._content_tokens(question)
+        keywords = self.taxonomy.keywords(question) if self.taxonomy else []
+        i = 0
+        while i < len(tokens):
+            match = None
+            for size in range(min(MAX_NGRAM, len(tokens) - i), 1, -1):
+                phrase = " ".join(tokens[i:i + size])
+                if phrase in self.phrases:
+                    match = (phrase, size)
+                    break
+            if match:
+                phrase, size = match
+            elif tokens[i] in self.unigrams:
+                phrase, size = tokens[i], 1
+            else:
+                i += 1
+                continue
+            if phrase not in keywords:
+                keywords.append(phrase)
+            i += size
+        return keywords
@@ -0,0 +1,70 @@
+import re
+from collections import defaultdict
+
+from trade_index import TradeIndex
+
+# Sentence ends, or line breaks separating sections of a scraped description
+_PASSAGE_BOUNDARY = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9(\"'])|\s*\n+\s*")
+
+
+def split_passages(text, min_chars=60):
+    """Split a description into sentence-level passages, merging fragments shorter than min_chars"""
+    passages = []
+    for piece in _PASSAGE_BOUNDARY.split(text or ""):
+        piece = piece.strip()
+        if not piece:
+            continue
+        if passages and len(passages[-1]) < min_chars:
+            passages[-1] = f"{passages[-1]} {piece}"
+        else:
+            passages.append(piece)
+    return passages
+
+
+class PassageIndex:
+    """Sentence-level index over procedure descriptions for query-focused excerpts
+
+    Descriptions are split into passages at ingest time and indexed with
+    BM25. At query time only the best scoring passages of each selected
+    procedure are sent to the model, in their original order.
+    """
+
+    def __init__(self, procedures, key="url"):
+        self.key = key
+        self.passages = []
+        self._by_procedure = defaultdict(list)
+        for procedure in procedures:
+            for passage in split_passages(procedure.get('description')):
+                self._by_procedure[procedure.get(key)].append(len(self.passages))
+                self.passages.append({"text": passage})
+        self.index = TradeIndex(self.passages, field_weights={"text": 1.0})
+
+    def excerpt(self, procedure, keywords, max_passages=2, scores=None):
+        """Return the top passages of a procedure's description for the given keywords
+
+        Falls back to the leading passages when none of them match. `scores`
+        can be passed in to reuse one index lookup across several procedures.
+        """
+        passage_ids = self._by_procedure.get(procedure.get(self.key))
+        if not passage_ids:
+            return procedure.get('description') or ""
+        if len(passage_ids) <= max_passages:
+            return " ".join(self.passages[i]["text"] for i in passage_ids)
+
+        if scores is None:
+            scores = self.index.score(keywords)
+        ranked = sorted(passage_ids, key=lambda i: (-scores.get(i, 0.0), i))
+        selected = sorted(ranked[:max_passages])
+        if not any(scores.get(i) for i in selected):
+            selected = passage_ids[:max_passages]
+
+        # Mark that parts of the description were left out
+        return " ".join(self.passages[i]["text"] for i in selected) + " ..."
+
+    def excerpt_all(self, procedures, keywords, max_passages=2):
+        """Return copies of the procedures with their descriptions replaced by excerpts"""
+        scores = self.index.score(keywords)
+        return [
+            dict(procedure, description=self.excerpt(procedure, keywords, max_passages, scores))
+            for procedure in procedures
+        ]
@@ -0,0 +1,87 @@
+import os
+import pickle
+import hashlib
+
+from atomic_files import atomic_write
+
+# Bump whenever the layout of the processed corpus or its indexes changes
+SNAPSHOT_VERSION = 5
+
+
+def file_sha256(path):
+    """Compute the SHA-256 digest of a file"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _source_list(source_paths):
+    if isinstance(source_paths, (str, os.PathLike)):
+        return [source_paths]
+    return list(source_paths)
+
+
+def source_fingerprint(source_paths):
+    """Cheap size/mtime fingerprint of the source files used to skip hashing in the common case"""
+    fingerprint = []
+    for path in _source_list(source_paths):
+        stat = os.stat(path)
+        fingerprint.append((os.fspath(path), stat.st_size, stat.st_mtime_ns))
+    return fingerprint
+
+
+def sources_sha256(source_paths):
+    """Content hashes of the source files"""
+    return [file_sha256(path) for path in _source_list(source_paths)]
+
+
+def load_snapshot(snapshot_path, source_paths):
+    """Return the cached payload built from source_paths, or None if the snapshot is missing or stale
+
+    The size/mtime fingerprint is checked first; only when it differs are the
+    sources re-hashed, so a touched but unchanged file still hits the cache.
+    The snapshot then takes the new fingerprint, so later loads skip hashing.
+    """
+    if not os.path.exists(snapshot_path):
+        return None
+
+    try:
+        with open(snapshot_path, 'rb') as f:
+            snapshot = pickle.loads(f.read())
+    except Exception as e:
+        print(f"Ignoring unreadable snapshot {snapshot_path}: {e}")
+        return None
+
+    if not isinstance(snapshot, dict) or snapshot.get("version") != SNAPSHOT_VERSION:
+        return None
+
+    fingerprint = source_fingerprint(source_paths)
+    if snapshot.get("fingerprint") == fingerprint:
+        return snapshot["payload"]
+
+    if snapshot.get("sha256") == sources_sha256(source_paths):
+        snapshot["fingerprint"] = fingerprint
+        try:
+            _write_snapshot(snapshot_path, snapshot)
+        except OSError as e:
+            print(f"Could not refresh the fingerprint of snapshot {snapshot_path}: {e}")
+        return snapshot["payload"]
+
+    return None
+
+
+def save_snapshot(snapshot_path, source_paths, payload):
+    """Atomically write payload as the snapshot built from source_paths"""
+    snapshot = {
+        "version": SNAPSHOT_VERSION,
+        "fingerprint": source_fingerprint(source_paths),
+        "sha256": sources_sha256(source_paths),
+        "payload": payload,
+    }
+    _write_snapshot(snapshot_path, snapshot)
+
+
+def _write_snapshot(snapshot_path, snapshot):
+    atomic_write(snapshot_path, lambda f: pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL))
@@ -0,0 +1,96 @@
+import json
+from collections import deque
+
+from trade_index import tokenize
+
+
+class TaxonomyMatcher:
+    """Single-pass multi-pattern matcher over a trade taxonomy
+
+    The taxonomy maps facets (products, document types, border posts, ...) to
+    canonical terms and their aliases. All aliases are compiled once into an
+    Aho-Corasick automaton over normalized tokens, so tagging a text costs one
+    pass over its tokens no matter how many terms the vocabulary holds.
+    """
+
+    def __init__(self, taxonomy):
+        self.taxonomy = taxonomy
+        # Trie state: token -> next state, plus failure links and outputs
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+        self._compile()
+
+    @classmethod
+    def from_file(cls, path):
+        """Load a taxonomy JSON file of the form {facet: {canonical: [aliases]}}"""
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def terms(self):
+        """Return every canonical term and alias in the taxonomy"""
+        terms = []
+        for entries in self.taxonomy.values():
+            for canonical, aliases in entries.items():
+                terms.append(canonical)
+                terms.extend(aliases)
+        return terms
+
+    def _add_pattern(self, tokens, match):
+        state = 0
+        for token in tokens:
+            next_state = self._goto[state].get(token)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][token] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        if match not in self._output[state]:
+            self._output[state].append(match)
+
+    def _compile(self):
+        """Build the trie of all aliases and its failure links"""
+        for facet, entries in self.taxonomy.items():
+            for canonical, aliases in entries.items():
+                for alias in [canonical] + list(aliases):
+                    tokens = tokenize(alias)
+                    if tokens:
+                        self._add_pattern(tokens, (facet, canonical))
+
+        # Breadth-first pass to link each state to its longest proper suffix state
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for token, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and token not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                candidate = self._goto[fallback].get(token, 0)
+                self._fail[next_state] = candidate if candidate != next_state else 0
+                self._output[next_state].extend(
+                    m for m in self._output[self._fail[next_state]] if m not in self._output[next_state]
+                )
+
+    def match(self, text):
+        """Return the (facet, canonical term) pairs found in text, in order of first occurrence"""
+        matches = []
+        state = 0
+        for token in tokenize(text):
+            while state and token not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(token, 0)
+            for match in self._output[state]:
+                if match not in matches:
+                    matches.append(match)
+        return matches
+
+    def keywords(self, text):
+        """Return the distinct canonical terms found in text"""
+        keywords = []
+        for _, canonical in self.match(text):
+            if canonical not in keywords:
+                keywords.append(canonical)
+        return keywords
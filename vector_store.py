@@ -0,0 +1,497 @@
+import json
+import os
+import re
+
+import numpy as np
+
+from atomic_files import atomic_write
+from trade_facets import chroma_where, facet_conditions
+
+try:
+    import faiss
+except ImportError:  # faiss-cpu is optional; the flat NumPy scan works without it
+    faiss = None
+
+
+def normalize_rows(vectors):
+    """Scale each row to unit length so inner product equals cosine similarity"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def quantize(vectors, quantization):
+    """Return (codes, scales) storing vectors as float16, or as int8 with a per-dimension scale
+
+    int8 codes are round(x / scale) with scale = max |x| / 127 per dimension,
+    so code @ (query * scale) approximates the float32 inner product.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if quantization == "float16":
+        return vectors.astype(np.float16), None
+    if quantization == "int8":
+        scales = np.abs(vectors).max(axis=0) / 127.0 if len(vectors) else np.ones(vectors.shape[1:], np.float32)
+        scales[scales == 0] = 1.0
+        codes = np.clip(np.rint(vectors / scales), -127, 127).astype(np.int8)
+        return codes, scales.astype(np.float32)
+    raise ValueError(f"Unknown quantization {quantization!r}")
+
+
+def _top_rows(scores, k):
+    """Indices of the k highest scores, best first"""
+    if k < len(scores):
+        rows = np.argpartition(-scores, k - 1)[:k]
+    else:
+        rows = np.arange(len(scores))
+    return rows[np.argsort(-scores[rows])]
+
+
+# Data files of a NumpyVectorStore, unversioned (older stores) or suffixed with their generation
+_DATA_FILE = re.compile(r"(embeddings|codes|scales|index)(-\d+)?\.(npy|faiss)$")
+
+
+def _revision(metadata):
+    """Change marker of a document: its metadata revision, or the content hash for older stores"""
+    metadata = metadata or {}
+    return metadata.get("revision") or metadata.get("content_hash")
+
+
+class VectorStore:
+    """Interface shared by the vector backends of the vector-search model
+
+    `documents` passed to sync() map a stable document ID to a
+    (text, metadata) pair whose metadata carries a `content_hash` (and
+    optionally a `revision` covering the rest of the metadata); new vectors
+    are produced by the store's `embedder` (an EmbeddingPipeline) and reused
+    by content hash. query() takes a question embedding and optional
+    question facets (see trade_facets) to prefilter on, and returns hits as
+    dicts with id, document, metadata and a cosine score, best first.
+    """
+
+    def sync(self, documents):
+        """Bring the store in line with documents; return (changed_ids, removed_ids)"""
+        raise NotImplementedError
+
+    def query(self, embedding, n_results=5, facets=None):
+        raise NotImplementedError
+
+    def count(self):
+        raise NotImplementedError
+
+
+class ChromaVectorStore(VectorStore):
+    """Persistent Chroma collection"""
+
+    def __init__(self, path, embedder, collection_name="rwanda-trade-gpt"):
+        import chromadb
+
+        self.embedder = embedder
+        self.client = chromadb.PersistentClient(path=path)
+        # Embeddings are always computed by the pipeline and passed in explicitly
+        self.collection = self.client.get_or_create_collection(
+            name=collection_name,
+            embedding_function=None
+        )
+
+    def sync(self, documents, batch_size=256):
+        """Only embed documents that are new or whose content changed, and drop removed ones"""
+        stored = self.collection.get(include=["metadatas"])
+        stored_revisions = {
+            doc_id: _revision(meta)
+            for doc_id, meta in zip(stored["ids"], stored["metadatas"])
+        }
+
+        changed = [
+            doc_id for doc_id, (_, meta) in documents.items()
+            if stored_revisions.get(doc_id) != _revision(meta)
+        ]
+        removed = [doc_id for doc_id in stored_revisions if doc_id not in documents]
+
+        vectors = {}
+        if changed:
+            # Reuse stored vectors for content that is already embedded under another ID
+            known_vectors = {}
+            if stored["ids"]:
+                stored = self.collection.get(include=["metadatas", "embeddings"])
+                for meta, embedding in zip(stored["metadatas"], stored["embeddings"]):
+                    if meta and meta.get("content_hash"):
+                        known_vectors[meta["content_hash"]] = embedding
+            vectors = self.embedder.embed_documents(
+                {doc_id: documents[doc_id] for doc_id in changed}, known_vectors
+            )
+
+        # Upserts merge metadata, so replaced documents are deleted first to drop stale facet flags
+        replaced = [doc_id for doc_id in changed if doc_id in stored_revisions]
+        if replaced:
+            self.collection.delete(ids=replaced)
+
+        for start in range(0, len(changed), batch_size):
+            batch = changed[start:start + batch_size]
+            self.collection.upsert(
+                ids=batch,
+                embeddings=[[float(x) for x in vectors[doc_id]] for doc_id in batch],
+                documents=[documents[doc_id][0] for doc_id in batch],
+                metadatas=[documents[doc_id][1] for doc_id in batch],
+            )
+        if removed:
+            self.collection.delete(ids=removed)
+
+        return changed, removed
+
+    def query(self, embedding, n_results=5, facets=None):
+        n_results = min(n_results, self.count())
+        if n_results <= 0:
+            return []
+        results = self.collection.query(
+            query_embeddings=[list(map(float, embedding))],
+            n_results=n_results,
+            where=chroma_where(facets or {}),
+        )
+        hits = []
+        for doc_id, document, metadata, distance in zip(
+            results["ids"][0], results["documents"][0], results["metadatas"][0], results["distances"][0]
+        ):
+            # Chroma's default space is squared L2, which for unit vectors is 2 - 2 * cosine
+            hits.append({"id": doc_id, "document": document, "metadata": metadata, "score": 1.0 - distance / 2})
+        return hits
+
+    def count(self):
+        return self.collection.count()
+
+
+class NumpyVectorStore(VectorStore):
+    """Normalized embeddings in a memory-mapped .npy file, optionally indexed with FAISS
+
+    The embedding matrix is opened with mmap_mode="r", so worker processes
+    on the same host share its pages through the OS page cache instead of
+    each holding a private copy. `index_type` selects the search structure:
+    "flat" scans the matrix with NumPy, "ivf" and "hnsw" build an
+    approximate FAISS index (requires faiss-cpu), and "auto" picks flat for
+    small corpora and HNSW above `auto_threshold` documents.
+
+    With `quantization` set to "float16" or "int8" the search runs over a
+    compact copy of the embeddings (a scalar-quantized FAISS index, or a
+    blockwise NumPy scan of the codes) for `rescore_factor` times as many
+    candidates as requested, which are then re-scored exactly against the
+    memory-mapped float32 rows. Only the compact codes and the few re-scored
+    rows have to be paged in.
+
+    Every write puts the matrix, codes and index in new files suffixed with
+    a generation number and then replaces documents.json, the manifest that
+    names the generation and its row count. A crash mid-write therefore
+    leaves the previous generation in use, and a manifest whose files do not
+    match its row count is discarded on load.
+    """
+
+    INDEX_TYPES = ("auto", "flat", "ivf", "hnsw")
+    QUANTIZATIONS = ("float32", "float16", "int8")
+    # Rows converted to float32 at a time by the quantized NumPy scan
+    SCAN_BLOCK = 16384
+
+    def __init__(self, path, embedder, index_type="auto", auto_threshold=20000,
+                 quantization="float32", rescore_factor=4):
+        if index_type not in self.INDEX_TYPES:
+            raise ValueError(f"index_type must be one of {self.INDEX_TYPES}, got {index_type!r}")
+        if quantization not in self.QUANTIZATIONS:
+            raise ValueError(f"quantization must be one of {self.QUANTIZATIONS}, got {quantization!r}")
+        if index_type in ("ivf", "hnsw") and faiss is None:
+            raise ImportError(f"index_type={index_type!r} requires faiss-cpu")
+
+        self.path = path
+        self.embedder = embedder
+        self.index_type = index_type
+        self.auto_threshold = auto_threshold
+        self.quantization = quantization
+        self.rescore_factor = max(1, rescore_factor)
+        self.documents_file = os.path.join(path, "documents.json")
+
+        os.makedirs(path, exist_ok=True)
+        self._open()
+
+    def _data_file(self, name, generation):
+        """Path of a data file of a generation; generation 0 is the unversioned layout of older stores"""
+        if generation:
+            stem, extension = os.path.splitext(name)
+            name = f"{stem}-{generation}{extension}"
+        return os.path.join(self.path, name)
+
+    def _set_generation(self, generation):
+        self.generation = generation
+        self.embeddings_file = self._data_file("embeddings.npy", generation)
+        self.codes_file = self._data_file("codes.npy", generation)
+        self.scales_file = self._data_file("scales.npy", generation)
+        self.index_file = self._data_file("index.faiss", generation)
+
+    def _open(self):
+        """Map the stored embeddings and load the document table and FAISS index, if any"""
+        self.ids, self.documents, self.metadatas = [], [], []
+        self._set_generation(0)
+        self.embeddings = None
+        self.codes = None
+        self.scales = None
+        self.faiss_index = None
+        self._flag_rows = {}
+        self.stored_quantization = None
+        self.stored_index_type = None
+
+        if not os.path.exists(self.documents_file):
+            return
+        with open(self.documents_file, 'r', encoding='utf-8') as f:
+            table = json.load(f)
+        self._set_generation(table.get("generation", 0))
+        if not os.path.exists(self.embeddings_file):
+            return
+
+        self.ids = table["ids"]
+        self.documents = table["documents"]
+        self.metadatas = table["metadatas"]
+        self.stored_quantization = table.get("quantization", "float32")
+        self.stored_index_type = table.get("index_type", self.index_type)
+        self.embeddings = np.load(self.embeddings_file, mmap_mode="r")
+        if self.stored_quantization != "float32" and os.path.exists(self.codes_file):
+            self.codes = np.load(self.codes_file, mmap_mode="r")
+            if self.stored_quantization == "int8":
+                self.scales = np.load(self.scales_file)
+
+        rows = table.get("rows", len(self.ids))
+        if not (len(self.ids) == rows == len(self.embeddings) and (self.codes is None or len(self.codes) == rows)):
+            print(f"Ignoring vector store {self.path}: its files do not match the manifest's {rows} rows")
+            self.ids, self.documents, self.metadatas = [], [], []
+            self.embeddings = self.codes = self.scales = None
+            return
+
+        if faiss is not None and os.path.exists(self.index_file):
+            try:
+                self.faiss_index = faiss.read_index(self.index_file, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+            except RuntimeError:
+                # Not every index type can be memory-mapped
+                self.faiss_index = faiss.read_index(self.index_file)
+            if hasattr(self.faiss_index, "nprobe"):
+                self.faiss_index.nprobe = max(1, self.faiss_index.nlist // 8)
+
+    def _resolved_index_type(self, count):
+        if self.index_type != "auto":
+            return self.index_type
+        if faiss is not None and count >= self.auto_threshold:
+            return "hnsw"
+        return "flat"
+
+    def _build_faiss_index(self, vectors):
+        index_type = self._resolved_index_type(len(vectors))
+        if index_type == "flat" or not len(vectors):
+            return None
+
+        dim = vectors.shape[1]
+        qtype = {
+            "float16": faiss.ScalarQuantizer.QT_fp16,
+            "int8": faiss.ScalarQuantizer.QT_8bit,
+        }.get(self.quantization)
+        if index_type == "hnsw":
+            if qtype is None:
+                index = faiss.IndexHNSWFlat(dim, 32, faiss.METRIC_INNER_PRODUCT)
+            else:
+                index = faiss.IndexHNSWSQ(dim, qtype, 32, faiss.METRIC_INNER_PRODUCT)
+        else:
+            nlist = max(1, int(np.sqrt(len(vectors))))
+            quantizer = faiss.IndexFlatIP(dim)
+            if qtype is None:
+                index = faiss.IndexIVFFlat(quantizer, dim, nlist, faiss.METRIC_INNER_PRODUCT)
+            else:
+                index = faiss.IndexIVFScalarQuantizer(quantizer, dim, nlist, qtype, faiss.METRIC_INNER_PRODUCT)
+        if not index.is_trained:
+            index.train(vectors)
+        index.add(vectors)
+        return index
+
+    def sync(self, documents):
+        """Re-embed only new or changed documents, reusing stored vectors for the rest"""
+        stored_rows = {
+            doc_id: (row, (meta or {}).get("content_hash"), _revision(meta))
+            for row, (doc_id, meta) in enumerate(zip(self.ids, self.metadatas))
+        }
+        ids = list(documents)
+        changed = [
+            doc_id for doc_id in ids
+            if doc_id not in stored_rows or stored_rows[doc_id][2] != _revision(documents[doc_id][1])
+        ]
+        removed = [doc_id for doc_id in stored_rows if doc_id not in documents]
+        layout_current = self.stored_quantization == self.quantization and self.stored_index_type == self.index_type
+        if not changed and not removed and self.embeddings is not None and layout_current:
+            return changed, removed
+
+        if not ids:
+            self._write(ids, documents, np.empty((0, 0), dtype=np.float32))
+            return changed, removed
+
+        # Vectors of unchanged content are looked up by hash, so only new text is encoded
+        known_vectors = {content: self.embeddings[row] for row, content, _ in stored_rows.values() if content}
+        vectors = self.embedder.embed_documents(documents, known_vectors)
+        matrix = normalize_rows(np.stack([vectors[doc_id] for doc_id in ids]))
+
+        self._write(ids, documents, matrix)
+        return changed, removed
+
+    def _write(self, ids, documents, vectors):
+        table = {
+            "ids": ids,
+            "documents": [documents[doc_id][0] for doc_id in ids],
+            "metadatas": [documents[doc_id][1] for doc_id in ids],
+            "quantization": self.quantization,
+            "index_type": self.index_type,
+            "rows": len(ids),
+        }
+        # New files go under the next generation; the current ones stay valid until the manifest is replaced
+        self._set_generation(self.generation + 1)
+        table["generation"] = self.generation
+
+        atomic_write(self.embeddings_file, lambda f: np.save(f, vectors))
+        if self.quantization != "float32" and len(vectors):
+            codes, scales = quantize(vectors, self.quantization)
+            atomic_write(self.codes_file, lambda f: np.save(f, codes))
+            if scales is not None:
+                atomic_write(self.scales_file, lambda f: np.save(f, scales))
+        index = self._build_faiss_index(vectors)
+        if index is not None:
+            faiss.write_index(index, self.index_file)
+        # The manifest goes last: replacing it switches readers to the new generation as a whole
+        atomic_write(self.documents_file, lambda f: f.write(json.dumps(table, ensure_ascii=False).encode("utf-8")))
+
+        self._open()
+        self._remove_stale_files()
+
+    def _remove_stale_files(self):
+        """Delete the data files of earlier or abandoned generations"""
+        current = {self.embeddings_file, self.codes_file, self.scales_file, self.index_file}
+        for name in os.listdir(self.path):
+            path = os.path.join(self.path, name)
+            if _DATA_FILE.match(name) and path not in current:
+                os.unlink(path)
+
+    def _scan_codes(self, query, rows=None):
+        """Approximate scores of every row (or of `rows`) from the quantized codes, converted block by block"""
+        if self.scales is not None:
+            # code * scale @ query == code @ (scale * query)
+            query = query * self.scales
+        count = len(self.codes) if rows is None else len(rows)
+        scores = np.empty(count, dtype=np.float32)
+        for start in range(0, count, self.SCAN_BLOCK):
+            if rows is None:
+                block = self.codes[start:start + self.SCAN_BLOCK]
+            else:
+                block = self.codes[rows[start:start + self.SCAN_BLOCK]]
+            scores[start:start + len(block)] = block.astype(np.float32) @ query
+        return scores
+
+    def _faiss_parameters(self, selector):
+        """Search parameters of the stored index type that restrict it to the ids of selector"""
+        if isinstance(self.faiss_index, faiss.IndexIVF):
+            return faiss.SearchParametersIVF(sel=selector, nprobe=self.faiss_index.nprobe)
+        if isinstance(self.faiss_index, faiss.IndexHNSW):
+            return faiss.SearchParametersHNSW(sel=selector, efSearch=self.faiss_index.hnsw.efSearch)
+        return faiss.SearchParameters(sel=selector)
+
+    def _flag_mask(self, flag):
+        """Boolean row mask of a metadata flag, computed once per flag"""
+        mask = self._flag_rows.get(flag)
+        if mask is None:
+            mask = np.fromiter((bool((meta or {}).get(flag)) for meta in self.metadatas), dtype=bool,
+                               count=len(self.metadatas))
+            self._flag_rows[flag] = mask
+        return mask
+
+    def _facet_rows(self, facets):
+        """Rows passing the question's facets, or None when nothing is filtered"""
+        mask = None
+        for tagged, flags in facet_conditions(facets or {}):
+            allowed = ~self._flag_mask(tagged)
+            for flag in flags:
+                allowed = allowed | self._flag_mask(flag)
+            mask = allowed if mask is None else mask & allowed
+        return None if mask is None else np.flatnonzero(mask)
+
+    def _scan(self, query, k, allowed=None):
+        """Top k (rows, scores) of a NumPy scan of the codes, or of the float32 matrix when there are none"""
+        if self.codes is not None:
+            scores = self._scan_codes(query, allowed)
+        elif allowed is None:
+            scores = self.embeddings @ query
+        else:
+            scores = self.embeddings[allowed] @ query
+        top = _top_rows(scores, k)
+        return (top if allowed is None else allowed[top]), scores[top]
+
+    def _search(self, query, n_results, allowed=None):
+        """Return (rows, scores) of the n_results nearest embeddings, among the `allowed` rows if given
+
+        A facet prefilter restricts the same search structure as an unfiltered
+        query: the FAISS index through an ID selector, or the code scan to the
+        allowed rows, before the candidates are re-scored.
+        """
+        quantized = self.stored_quantization != "float32"
+        candidates = len(self.ids) if allowed is None else len(allowed)
+        k = min(candidates, n_results * self.rescore_factor if quantized else n_results)
+
+        rows = None
+        if self.faiss_index is not None:
+            params = None
+            if allowed is not None:
+                # FAISS ids are row numbers; the parameters only borrow the selector, which stays referenced here
+                ids = np.ascontiguousarray(allowed, dtype=np.int64)
+                selector = faiss.IDSelectorBatch(len(ids), faiss.swig_ptr(ids))
+                params = self._faiss_parameters(selector)
+            scores, rows = self.faiss_index.search(query[None, :], k, params=params)
+            keep = rows[0] >= 0
+            rows, scores = rows[0][keep], scores[0][keep]
+            if allowed is not None and len(rows) < k:
+                # A graph search confined to a small subset can stop short; scan the subset instead
+                rows = None
+        if rows is None:
+            rows, scores = self._scan(query, k, allowed)
+
+        if quantized and len(rows):
+            # Re-score the candidates exactly; reading sorted rows keeps the memory-mapped access sequential
+            rows = np.sort(rows)
+            exact = self.embeddings[rows] @ query
+            best = _top_rows(exact, n_results)
+            rows, scores = rows[best], exact[best]
+        return rows, scores
+
+    def query(self, embedding, n_results=5, facets=None):
+        n_results = min(n_results, self.count())
+        if n_results <= 0:
+            return []
+        query = normalize_rows(embedding)[0]
+        allowed = self._facet_rows(facets)
+        if allowed is not None and not len(allowed):
+            return []
+        rows, scores = self._search(query, n_results, allowed)
+        return [
+            {
+                "id": self.ids[row],
+                "document": self.documents[row],
+                "metadata": self.metadatas[row],
+                "score": float(score),
+            }
+            for row, score in zip(rows, scores)
+        ]
+
+    def count(self):
+        return len(self.ids)
+
+
+VECTOR_BACKENDS = {
+    "chroma": ChromaVectorStore,
+    "numpy": NumpyVectorStore,
+}
+
+
+def create_vector_store(backend, path, embedder, **kwargs):
+    """Instantiate a vector store backend by name ("chroma" or "numpy")"""
+    try:
+        store_class = VECTOR_BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"Unknown vector backend {backend!r}; expected one of {sorted(VECTOR_BACKENDS)}")
+    return store_class(path, embedder, **kwargs)